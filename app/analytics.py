@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.cache import cache
+from app.models import db, Room, Booking, Payment
+from app.pagination import serialize_value
+from app.tasks import task_queue
+
+# Срок жизни отчетов за текущий (незакрытый) период, секунды
+ANALYTICS_CURRENT_TTL = int(os.getenv('ANALYTICS_CURRENT_TTL', '30'))
+# Срок жизни отчетов за закрытые периоды, секунды. В общем кэше (Redis) они хранятся бессрочно:
+# сброс пространства имен виден всем воркерам. В кэше процесса (memory) сброс доходит только
+# до воркера, который выполнил запись, поэтому остальные обновляют отчеты по этому сроку
+ANALYTICS_CLOSED_TTL = int(os.getenv('ANALYTICS_CLOSED_TTL', '600'))
+
+# Все отчеты лежат в одном пространстве имен кэша. Оно сбрасывается не при любой записи
+# в bookings / payments, а только при изменениях, которые задевают закрытые периоды
+# (см. _collect_analytics_changes): текущий период обновляется по ANALYTICS_CURRENT_TTL
+ANALYTICS_NAMESPACE = 'analytics'
+
+# Журнал occupancy_changes переносится в occupancy_daily фоновой задачей после commit, изменившего
+# бронирования или номера, — не чаще раза в OCCUPANCY_FOLD_INTERVAL секунд в процессе
+OCCUPANCY_FOLD_INTERVAL = float(os.getenv('OCCUPANCY_FOLD_INTERVAL', '60'))
+_fold_lock = threading.Lock()
+_last_fold = None  # time.monotonic() последней поставленной задачи
+
+SEGMENTS = ('VIP', 'Loyal', 'New', 'Dormant', 'Regular', 'No Bookings')
+
+
+class AnalyticsError(ValueError):
+    """
+    Некорректные параметры отчета (даты, период, сегмент).
+    """
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise AnalyticsError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def parse_month(value, name):
+    try:
+        year, month = value.split('-')
+        return date(int(year), int(month), 1)
+    except (AttributeError, ValueError):
+        raise AnalyticsError(f"{name} must be a month in YYYY-MM format")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def closed_ttl():
+    """
+    Срок жизни отчета за закрытый период для текущего бэкенда кэша (0 — бессрочно).
+    """
+    return 0 if cache.backend is not None and cache.backend.name == 'redis' else ANALYTICS_CLOSED_TTL
+
+
+def _rows(sql, **params):
+    result = db.session.execute(text(sql), params).mappings()
+    return [{name: serialize_value(value) for name, value in row.items()} for row in result]
+
+
+def _occupancy_rows(start_date, end_date):
+    # Только чтение: get_occupancy_rate учитывает и строки журнала, еще не перенесенные в occupancy_daily
+    return _rows(
+        "SELECT * FROM hotel.get_occupancy_rate(:start_date, :end_date)",
+        start_date=start_date, end_date=end_date
+    )
+
+
+def occupancy_report(start_date, end_date):
+    """
+    Загрузка номеров по типам за ночи с start_date по end_date - 1 (hotel.get_occupancy_rate).
+    Период закрыт, если его последняя ночь уже прошла: такой отчет кэшируется на closed_ttl().
+    """
+    if end_date <= start_date:
+        raise AnalyticsError("end_date must be after start_date")
+    closed = end_date <= date.today()
+    return cache.get_or_set(
+        ANALYTICS_NAMESPACE,
+        f"occupancy:{start_date.isoformat()}:{end_date.isoformat()}",
+        lambda: _occupancy_rows(start_date, end_date),
+        ttl=closed_ttl() if closed else ANALYTICS_CURRENT_TTL
+    )
+
+
+def _revenue_months(current_month, closed):
+    condition = "<" if closed else ">="
+    return _rows(
+        f"SELECT * FROM hotel.get_revenue_report() WHERE make_date(year, month, 1) {condition} :current_month",
+        current_month=current_month
+    )
+
+
+def revenue_report(from_month=None, to_month=None):
+    """
+    Помесячный отчет о доходах (hotel.get_revenue_report), по желанию ограниченный
+    месяцами from_month..to_month включительно. Отчет хранится в кэше двумя частями:
+    закрытые месяцы (до текущего) — на closed_ttl(), текущий и будущие — на ANALYTICS_CURRENT_TTL.
+    Ключ закрытой части содержит текущий месяц, поэтому с началом месяца она пересчитывается.
+    """
+    if from_month and to_month and to_month < from_month:
+        raise AnalyticsError("to must not be earlier than from")
+    current_month = month_start(date.today())
+    months = cache.get_or_set(
+        ANALYTICS_NAMESPACE, f"revenue:closed:{current_month.isoformat()}",
+        lambda: _revenue_months(current_month, closed=True), ttl=closed_ttl()
+    )
+    if to_month is None or to_month >= current_month:
+        months = months + cache.get_or_set(
+            ANALYTICS_NAMESPACE, f"revenue:current:{current_month.isoformat()}",
+            lambda: _revenue_months(current_month, closed=False), ttl=ANALYTICS_CURRENT_TTL
+        )
+    return [
+        row for row in months
+        if (from_month is None or (row['year'], row['month']) >= (from_month.year, from_month.month))
+        and (to_month is None or (row['year'], row['month']) <= (to_month.year, to_month.month))
+    ]
+
+
+def guest_segments(segment=None, limit=None):
+    """
+    Сегментация гостей (hotel.get_guest_segmentation), отсортированная по убыванию расходов.
+    Сегмент Dormant зависит от текущей даты, поэтому отчет всегда относится к текущему
+    периоду: ключ содержит дату, срок жизни — ANALYTICS_CURRENT_TTL.
+    """
+    if segment is not None and segment not in SEGMENTS:
+        raise AnalyticsError(f"segment must be one of: {', '.join(SEGMENTS)}")
+    today = date.today()
+    guests = cache.get_or_set(
+        ANALYTICS_NAMESPACE, f"segments:{today.isoformat()}",
+        lambda: _rows("SELECT * FROM hotel.get_guest_segmentation()"),
+        ttl=ANALYTICS_CURRENT_TTL
+    )
+    if segment is not None:
+        guests = [guest for guest in guests if guest['segment'] == segment]
+    return guests[:limit] if limit is not None else guests
+
+
+def refresh_rollups():
+    """
+    Полный пересчет агрегированных таблиц (hotel.refresh_analytics_rollups) и сброс
+    кэша отчетов — после изменений данных в обход приложения.
+    С кэшем процесса (CACHE_BACKEND=memory) кэш сбрасывается только в обработавшем запрос
+    воркере; остальные отдают прежние отчеты до истечения ANALYTICS_CLOSED_TTL.
+    """
+    db.session.execute(text("SELECT hotel.refresh_analytics_rollups()"))
+    db.session.commit()
+    cache.invalidate(ANALYTICS_NAMESPACE)
+
+
+def fold_occupancy_changes():
+    """
+    Переносит журнал occupancy_changes в occupancy_daily (hotel.fold_occupancy_changes).
+    Задача очереди (см. tasks.py); перенос, уже идущий в другом воркере, функция пропускает.
+    """
+    db.session.execute(text("SELECT hotel.fold_occupancy_changes()"))
+    db.session.commit()
+
+
+def _history_values(obj, name):
+    """
+    Текущее и прежние (до изменения в этой транзакции) значения атрибута.
+    """
+    history = inspect(obj).attrs[name].history
+    values = [getattr(obj, name)] + list(history.deleted or ())
+    return [value for value in values if value is not None]
+
+
+def _touches_closed_period(session, obj, today):
+    if isinstance(obj, Room):
+        # Число номеров, их типы и тарифы входят во все периоды; смена статуса номера — нет
+        if obj in session.dirty:
+            state = inspect(obj)
+            return state.attrs.type.history.has_changes() or state.attrs.daily_rate.history.has_changes()
+        return True
+    if isinstance(obj, Booking):
+        # Ночи до сегодняшней уже входят в закрытые периоды загрузки
+        return any(value < today for value in _history_values(obj, 'check_in_date'))
+    if isinstance(obj, Payment):
+        current_month = month_start(today)
+        return any(value.date() < current_month for value in _history_values(obj, 'transaction_date'))
+    return False
+
+
+def _collect_analytics_changes(session, flush_context):
+    """
+    После flush добавляет пространство имен отчетов к изменениям кэша сессии
+    (cache._collect_cache_changes), если записи задевают закрытые периоды.
+    Версия увеличивается после успешного commit вместе с остальными.
+    """
+    today = date.today()
+    for obj in session.new | session.dirty | session.deleted:
+        if _touches_closed_period(session, obj, today):
+            session.info.setdefault('cache_namespaces', set()).add(ANALYTICS_NAMESPACE)
+            return
+
+
+def _collect_occupancy_changes(session, flush_context):
+    """
+    После flush отмечает, что записи изменили журнал occupancy_changes (бронирования, номера);
+    задача переноса ставится только после успешного commit.
+    """
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, (Booking, Room)):
+            session.info['occupancy_changed'] = True
+            return
+
+
+def _schedule_fold(session):
+    global _last_fold
+    if not session.info.pop('occupancy_changed', False):
+        return
+    with _fold_lock:
+        now = time.monotonic()
+        if _last_fold is not None and now - _last_fold < OCCUPANCY_FOLD_INTERVAL:
+            return
+        _last_fold = now
+    task_queue.submit(fold_occupancy_changes)
+
+
+def _discard_occupancy_changes(session, previous_transaction):
+    session.info.pop('occupancy_changed', None)
+
+
+def init_analytics(app):
+    """
+    Регистрирует обработчики событий сессии: сброс кэша отчетов и перенос журнала занятости.
+    """
+    if not event.contains(Session, 'after_flush', _collect_analytics_changes):
+        event.listen(Session, 'after_flush', _collect_analytics_changes)
+        event.listen(Session, 'after_flush', _collect_occupancy_changes)
+        event.listen(Session, 'after_commit', _schedule_fold)
+        event.listen(Session, 'after_soft_rollback', _discard_occupancy_changes)
@@ -0,0 +1,382 @@
+import bisect
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import db, Room, Booking
+
+logger = logging.getLogger(__name__)
+
+
+class RoomIntervals:
+    """
+    Отсортированный по дате заезда массив интервалов бронирований одного номера.
+    Даты хранятся как порядковые номера дней (date.toordinal()), границы включительные —
+    так же, как в booking_overlap_filter.
+    """
+    __slots__ = ('starts', 'ends', 'ids', 'max_ends')
+
+    def __init__(self):
+        self.starts = []    # Даты заезда (отсортированы)
+        self.ends = []      # Даты выезда в том же порядке
+        self.ids = []       # booking_id в том же порядке
+        self.max_ends = []  # Префиксный максимум дат выезда
+
+    def _rebuild_max_ends(self, start_index):
+        """
+        Пересчитывает префиксный максимум, начиная с позиции start_index.
+        """
+        del self.max_ends[start_index:]
+        current = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[start_index:]:
+            current = end if current is None or end > current else current
+            self.max_ends.append(current)
+
+    def add(self, booking_id, start, end):
+        index = bisect.bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.ids.insert(index, booking_id)
+        self._rebuild_max_ends(index)
+
+    def remove(self, booking_id):
+        try:
+            index = self.ids.index(booking_id)
+        except ValueError:
+            return False
+        del self.starts[index]
+        del self.ends[index]
+        del self.ids[index]
+        self._rebuild_max_ends(index)
+        return True
+
+    def overlaps(self, start, end):
+        """
+        Есть ли бронирование, пересекающее период [start, end].
+        Кандидаты — интервалы с заездом не позже end; среди них достаточно
+        проверить максимальную дату выезда.
+        """
+        index = bisect.bisect_right(self.starts, end)
+        return index > 0 and self.max_ends[index - 1] >= start
+
+
+class AvailabilityIndex:
+    """
+    Внутрипроцессный индекс занятости номеров.
+    Строится по неотмененным бронированиям и обновляется после каждого commit,
+    в котором создавались, менялись или удалялись бронирования.
+
+    Пока индекс перестраивается из БД, зафиксированные изменения копятся в _pending
+    и после загрузки применяются к новой версии: commit, не попавший в прочитанный
+    снимок, не теряется при замене. Повторное применение уже прочитанных изменений безопасно.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.ttl = None
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()  # Одновременно выполняется одна перестройка
+        self._rooms = {}          # room_id -> RoomIntervals
+        self._capacities = []     # Отсортированные пары (capacity, room_id)
+        self._room_capacity = {}  # room_id -> capacity (чтобы убрать прежнюю пару при изменении)
+        self._booking_rooms = {}  # booking_id -> room_id
+        self._built_at = None
+        self._rebuilding = False
+        self._pending = None      # Изменения, зафиксированные во время перестройки
+
+    def init_app(self, app):
+        """
+        Подключает индекс к приложению: читает настройки и регистрирует
+        обработчики событий сессии.
+        """
+        self.app = app
+        self.enabled = os.getenv('AVAILABILITY_INDEX_ENABLED', '0') == '1'
+        ttl = os.getenv('AVAILABILITY_INDEX_TTL', '300')
+        self.ttl = int(ttl) if ttl else None  # Через сколько секунд перестраивать индекс из БД
+        if not event.contains(Session, 'after_flush', _collect_booking_changes):
+            event.listen(Session, 'after_flush', _collect_booking_changes)
+            event.listen(Session, 'after_commit', _apply_booking_changes)
+            event.listen(Session, 'after_soft_rollback', _discard_booking_changes)
+
+        @app.cli.command('availability-check')
+        def availability_check():
+            """Сверяет индекс занятости с базой данных."""
+            self.rebuild()
+            mismatched = self.verify()
+            print(f"Rooms mismatched: {len(mismatched)}")
+            for room_id in mismatched:
+                print(f"  room_id={room_id}")
+
+    # --- Построение ---
+
+    def build(self, rooms, bookings):
+        """
+        Строит индекс из итераторов (room_id, capacity) и
+        (booking_id, room_id, check_in_date, check_out_date) и подменяет им текущий,
+        применив изменения, накопленные за время перестройки.
+        """
+        room_map = {}
+        room_capacity = {}
+        for room_id, capacity in rooms:
+            room_map[room_id] = RoomIntervals()
+            room_capacity[room_id] = capacity
+        capacities = sorted((capacity, room_id) for room_id, capacity in room_capacity.items())
+        grouped = {}
+        booking_rooms = {}
+        for booking_id, room_id, check_in_date, check_out_date in bookings:
+            grouped.setdefault(room_id, []).append(
+                (check_in_date.toordinal(), check_out_date.toordinal(), booking_id)
+            )
+            booking_rooms[booking_id] = room_id
+        for room_id, intervals in grouped.items():
+            intervals.sort()
+            room = room_map.setdefault(room_id, RoomIntervals())
+            room.starts = [start for start, _, _ in intervals]
+            room.ends = [end for _, end, _ in intervals]
+            room.ids = [booking_id for _, _, booking_id in intervals]
+            room._rebuild_max_ends(0)
+        with self._lock:
+            self._rooms = room_map
+            self._capacities = capacities
+            self._room_capacity = room_capacity
+            self._booking_rooms = booking_rooms
+            self._built_at = time.monotonic()
+            pending, self._pending = self._pending, None
+            if pending:
+                self._apply_locked(pending)
+
+    def _load_from_db(self):
+        """
+        Загружает номера и неотмененные бронирования (только нужные столбцы).
+        """
+        rooms = db.session.query(Room.room_id, Room.capacity).all()
+        bookings = (
+            db.session.query(Booking.booking_id, Booking.room_id, Booking.check_in_date, Booking.check_out_date)
+            .filter(Booking.status != 'cancelled')
+            .yield_per(10000)
+        )
+        return rooms, bookings
+
+    def rebuild(self):
+        """
+        Полностью перестраивает индекс из базы данных (требует контекст приложения).
+        """
+        with self._build_lock:
+            self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        # Накопление начинается до чтения: изменения, не попавшие в снимок, будут применены
+        with self._lock:
+            self._pending = []
+        try:
+            rooms, bookings = self._load_from_db()
+            self.build(rooms, bookings)
+        finally:
+            with self._lock:
+                self._pending = None
+        logger.info("Availability index rebuilt: %s rooms, %s bookings", len(self._rooms), len(self._booking_rooms))
+
+    def _rebuild_in_background(self):
+        try:
+            with self.app.app_context():
+                self.rebuild()
+        except Exception as e:
+            logger.error("Availability index rebuild failed: %s", e, exc_info=True)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def ensure_fresh(self):
+        """
+        Строит индекс при первом обращении; устаревший индекс (старше TTL)
+        перестраивается в фоне, а запросы пока обслуживаются текущей версией.
+        Нужен, когда приложение работает в нескольких процессах.
+        """
+        if self._built_at is None:
+            with self._build_lock:
+                if self._built_at is None:
+                    self._rebuild_locked()
+            return
+        with self._lock:
+            if not self.ttl or time.monotonic() - self._built_at <= self.ttl or self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    # --- Обновления ---
+
+    def add_booking(self, booking_id, room_id, check_in_date, check_out_date):
+        with self._lock:
+            self._remove_locked(booking_id)
+            self._rooms.setdefault(room_id, RoomIntervals()).add(
+                booking_id, check_in_date.toordinal(), check_out_date.toordinal()
+            )
+            self._booking_rooms[booking_id] = room_id
+
+    def remove_booking(self, booking_id):
+        with self._lock:
+            self._remove_locked(booking_id)
+
+    def _remove_locked(self, booking_id):
+        room_id = self._booking_rooms.pop(booking_id, None)
+        if room_id is not None and room_id in self._rooms:
+            self._rooms[room_id].remove(booking_id)
+
+    def add_room(self, room_id, capacity):
+        """
+        Добавляет номер или меняет его вместимость (прежняя пара (capacity, room_id) удаляется).
+        """
+        with self._lock:
+            self._remove_capacity_locked(room_id)
+            self._rooms.setdefault(room_id, RoomIntervals())
+            bisect.insort(self._capacities, (capacity, room_id))
+            self._room_capacity[room_id] = capacity
+
+    def remove_room(self, room_id):
+        with self._lock:
+            self._remove_capacity_locked(room_id)
+            self._rooms.pop(room_id, None)
+
+    def _remove_capacity_locked(self, room_id):
+        capacity = self._room_capacity.pop(room_id, None)
+        if capacity is None:
+            return
+        index = bisect.bisect_left(self._capacities, (capacity, room_id))
+        if index < len(self._capacities) and self._capacities[index] == (capacity, room_id):
+            del self._capacities[index]
+
+    def apply_changes(self, changes):
+        """
+        Применяет зафиксированные изменения: ('room', room_id, capacity) (capacity None —
+        номер удален) и
+        ('booking', booking_id, room_id, check_in_date, check_out_date, status).
+        Во время перестройки изменения также запоминаются для новой версии индекса;
+        пока индекс не построен, только запоминаются.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)
+            if self._built_at is not None:
+                self._apply_locked(changes)
+
+    def _apply_locked(self, changes):
+        for change in changes:
+            if change[0] == 'room':
+                if change[2] is None:
+                    self.remove_room(change[1])
+                else:
+                    self.add_room(change[1], change[2])
+                continue
+            _, booking_id, room_id, check_in_date, check_out_date, status = change
+            if status == 'cancelled':
+                self.remove_booking(booking_id)
+            else:
+                self.add_booking(booking_id, room_id, check_in_date, check_out_date)
+
+    # --- Запросы ---
+
+    def is_booked(self, room_id, check_in_date, check_out_date):
+        """
+        Есть ли у номера неотмененное бронирование, пересекающее период.
+        """
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return room is not None and room.overlaps(check_in_date.toordinal(), check_out_date.toordinal())
+
+    def booked_rooms(self, check_in_date, check_out_date, min_capacity=None, max_capacity=None):
+        """
+        Номера вместимостью от min_capacity до max_capacity, у которых есть неотмененное
+        бронирование, пересекающее период [check_in_date, check_out_date]. Возвращает список room_id.
+        """
+        return self._scan(check_in_date, check_out_date, min_capacity, max_capacity, booked=True)
+
+    def free_rooms(self, check_in_date, check_out_date, min_capacity=None, max_capacity=None):
+        """
+        Номера вместимостью от min_capacity до max_capacity, свободные в период
+        [check_in_date, check_out_date]. Возвращает список room_id.
+        """
+        return self._scan(check_in_date, check_out_date, min_capacity, max_capacity, booked=False)
+
+    def _scan(self, check_in_date, check_out_date, min_capacity, max_capacity, booked):
+        """
+        Просматривает только номера из диапазона вместимости (бинарный поиск по _capacities).
+        """
+        start = check_in_date.toordinal()
+        end = check_out_date.toordinal()
+        with self._lock:
+            capacities = self._capacities
+            rooms = self._rooms
+            first = bisect.bisect_left(capacities, (min_capacity, -1)) if min_capacity else 0
+            last = (
+                bisect.bisect_right(capacities, (max_capacity, float('inf')))
+                if max_capacity is not None else len(capacities)
+            )
+            bisect_right = bisect.bisect_right
+            result = []
+            for index in range(first, last):
+                room_id = capacities[index][1]
+                room = rooms.get(room_id)
+                # То же, что room.overlaps(), но без вызова метода в горячем цикле
+                overlaps = False
+                if room is not None:
+                    position = bisect_right(room.starts, end)
+                    overlaps = position > 0 and room.max_ends[position - 1] >= start
+                if overlaps == booked:
+                    result.append(room_id)
+            return result
+
+    # --- Сверка ---
+
+    def verify(self):
+        """
+        Сверяет индекс с базой данных (требует контекст приложения).
+        Возвращает список room_id, для которых множества бронирований различаются.
+        """
+        expected = {}
+        for booking_id, room_id, _, _ in self._load_from_db()[1]:
+            expected.setdefault(room_id, set()).add(booking_id)
+        with self._lock:
+            actual = {room_id: set(room.ids) for room_id, room in self._rooms.items() if room.ids}
+        return sorted(
+            room_id for room_id in expected.keys() | actual.keys()
+            if expected.get(room_id, set()) != actual.get(room_id, set())
+        )
+
+
+availability_index = AvailabilityIndex()
+
+
+def _collect_booking_changes(session, flush_context):
+    """
+    После flush запоминает измененные бронирования и номера (новые, удаленные, со сменой
+    вместимости); в индекс они попадут
+    только после успешного commit.
+    """
+    changes = session.info.setdefault('availability_changes', [])
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Room):
+            if obj in session.new or inspect(obj).attrs.capacity.history.has_changes():
+                changes.append(('room', obj.room_id, obj.capacity))
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Booking):
+            changes.append(('booking', obj.booking_id, obj.room_id, obj.check_in_date, obj.check_out_date, obj.status))
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            changes.append(('booking', obj.booking_id, None, None, None, 'cancelled'))
+        elif isinstance(obj, Room):
+            changes.append(('room', obj.room_id, None))
+
+
+def _apply_booking_changes(session):
+    changes = session.info.pop('availability_changes', None)
+    if changes:
+        availability_index.apply_changes(changes)
+
+
+def _discard_booking_changes(session, previous_transaction):
+    session.info.pop('availability_changes', None)
@@ -0,0 +1,362 @@
+import codecs
+import csv
+import json
+import os
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import request
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.availability_index import availability_index
+from app.cache import cache
+from app.input_validator import InputValidator
+from app.models import (
+    db, Guest, Room, CleaningSchedule, Booking, Payment,
+    room_type, room_status, booking_status, payment_method, payment_status
+)
+
+# Размер пачки: строки одной пачки вставляются одним executemany и фиксируются одной транзакцией
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '1000'))
+# Сколько ошибок по строкам возвращать в ответе (остальные только считаются)
+BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', '1000'))
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+
+# Те же проверки, что и ограничения таблиц (schema/03_tables.sql), чтобы не доводить
+# заведомо неверные строки до БД и не переключать пачку в построчный режим
+PASSPORT_RE = re.compile(r'^[A-Z0-9]{6,20}$')
+EMAIL_RE = re.compile(r'^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}$', re.IGNORECASE)
+
+
+class BulkError(ValueError):
+    """
+    Тело запроса не удалось прочитать целиком (формат, кодировка, не массив).
+    """
+
+
+class RowError(ValueError):
+    """
+    Ошибка в отдельной строке; строка пропускается, остальные вставляются.
+    """
+
+
+def _value(row, name, required=False):
+    value = row.get(name)
+    if value == '':  # В CSV пустая ячейка означает отсутствие значения
+        value = None
+    if value is None and required:
+        raise RowError(f"Missing required field: {name}")
+    return value
+
+
+def _int(row, name, required=False, default=None):
+    value = _value(row, name, required)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be an integer")
+
+
+def _decimal(row, name, required=False):
+    value = _value(row, name, required)
+    if value is None:
+        return None
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"{name} must be a number")
+    if not value.is_finite():
+        raise RowError(f"{name} must be a number")
+    return value
+
+
+def _date(row, name, required=False):
+    value = _value(row, name, required)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def _datetime(row, name):
+    value = _value(row, name)
+    if value is None:
+        return datetime.utcnow()
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be an ISO 8601 timestamp")
+
+
+def _enum(row, name, enum, required=False, default=None):
+    value = _value(row, name, required)
+    if value is None:
+        return default
+    if value not in enum.enums:
+        raise RowError(f"{name} must be one of: {', '.join(enum.enums)}")
+    return value
+
+
+def convert_guest(row):
+    passport_number = str(_value(row, 'passport_number', required=True)).upper()
+    if not PASSPORT_RE.match(passport_number):
+        raise RowError("passport_number must be 6-20 letters or digits")
+    email = _value(row, 'email')
+    if email is not None and not (isinstance(email, str) and EMAIL_RE.match(email)):
+        raise RowError("Invalid email")
+    return {
+        'passport_number': passport_number,
+        'first_name': _value(row, 'first_name', required=True),
+        'last_name': _value(row, 'last_name', required=True),
+        'phone': _value(row, 'phone', required=True),
+        'email': email,
+        'address': _value(row, 'address')
+    }
+
+
+def convert_room(row):
+    capacity = _int(row, 'capacity', required=True)
+    if not 1 <= capacity <= 6:
+        raise RowError("capacity must be between 1 and 6")
+    daily_rate = _decimal(row, 'daily_rate', required=True)
+    if daily_rate <= 0:
+        raise RowError("daily_rate must be positive")
+    return {
+        'room_number': str(_value(row, 'room_number', required=True)),
+        'type': _enum(row, 'type', room_type, required=True),
+        'capacity': capacity,
+        'daily_rate': daily_rate,
+        'status': _enum(row, 'status', room_status, default='available'),
+        'description': _value(row, 'description')
+    }
+
+
+def convert_booking(row):
+    check_in_date = _date(row, 'check_in_date', required=True)
+    check_out_date = _date(row, 'check_out_date', required=True)
+    if check_out_date <= check_in_date:
+        raise RowError("check_out_date must be after check_in_date")
+    adults = _int(row, 'adults', required=True)
+    children = _int(row, 'children', default=0)
+    if adults + children <= 0:
+        raise RowError("Booking must have at least one guest")
+    return {
+        'guest_id': _int(row, 'guest_id', required=True),
+        'room_id': _int(row, 'room_id', required=True),
+        'check_in_date': check_in_date,
+        'check_out_date': check_out_date,
+        'status': _enum(row, 'status', booking_status, default='confirmed'),
+        'adults': adults,
+        'children': children
+    }
+
+
+def convert_payment(row):
+    return {
+        'booking_id': _int(row, 'booking_id', required=True),
+        'amount': _decimal(row, 'amount', required=True),
+        'method': _enum(row, 'method', payment_method, required=True),
+        'status': _enum(row, 'status', payment_status, default='pending'),
+        'transaction_date': _datetime(row, 'transaction_date'),
+        'notes': _value(row, 'notes')
+    }
+
+
+def insert_rows(model, rows):
+    """
+    Вставка пачки одним executemany (INSERT ... VALUES ... RETURNING по несколько строк).
+    Возвращает первичные ключи в порядке строк.
+    """
+    pk_column = model.__mapper__.primary_key[0]
+    statement = insert(model).returning(pk_column, sort_by_parameter_order=True)
+    return db.session.execute(statement, rows).scalars().all()
+
+
+def insert_rooms(rows):
+    """
+    Номера вставляются вместе с пустыми записями расписания уборки (как в add_room).
+    """
+    room_ids = insert_rows(Room, rows)
+    db.session.execute(
+        insert(CleaningSchedule),
+        [{'room_id': room_id, 'needs_cleaning': False, 'next_cleaning_date': None} for room_id in room_ids]
+    )
+    return room_ids
+
+
+def room_changes(pairs):
+    return [('room', room_id, row['capacity']) for room_id, row in pairs]
+
+
+def booking_changes(pairs):
+    return [
+        ('booking', booking_id, row['room_id'], row['check_in_date'], row['check_out_date'], row['status'])
+        for booking_id, row in pairs
+    ]
+
+
+# Описание сущностей: модель, преобразование строки, вставка пачки, пространства имен кэша
+# и изменения для индекса занятости (Core insert не вызывает событий сессии).
+# Загрузка номеров, бронирований и платежей обычно содержит историю, поэтому
+# сбрасывает и кэш отчетов за закрытые периоды (см. analytics.py)
+ENTITIES = {
+    'guests': {'model': Guest, 'convert': convert_guest, 'namespaces': ('guests',)},
+    'rooms': {
+        'model': Room, 'convert': convert_room, 'insert': insert_rooms,
+        'namespaces': ('rooms', 'cleaning', 'analytics'), 'index_changes': room_changes
+    },
+    'bookings': {
+        'model': Booking, 'convert': convert_booking,
+        'namespaces': ('bookings', 'analytics'), 'index_changes': booking_changes
+    },
+    'payments': {'model': Payment, 'convert': convert_payment, 'namespaces': ('payments', 'analytics')},
+}
+
+
+def read_rows():
+    """
+    Читает строки из тела запроса по Content-Type: JSON-массив, NDJSON или CSV
+    (с заголовком). NDJSON и CSV читаются из потока построчно.
+    Возвращает итератор (номер строки, словарь или None при ошибке разбора).
+    """
+    mimetype = request.mimetype
+    if mimetype in NDJSON_MIMETYPES:
+        return _read_ndjson(codecs.iterdecode(request.stream, 'utf-8-sig'))
+    if mimetype in CSV_MIMETYPES:
+        return _read_csv(codecs.iterdecode(request.stream, 'utf-8-sig'))
+    if mimetype == 'application/json':
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            raise BulkError("Expected a JSON array of objects")
+        return enumerate(data, start=1)
+    raise BulkError("Unsupported Content-Type. Use application/json, application/x-ndjson or text/csv")
+
+
+def _read_ndjson(lines):
+    number = 0
+    try:
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    except UnicodeDecodeError as e:
+        raise BulkError(f"Invalid UTF-8: {e}")
+
+
+def _read_csv(lines):
+    try:
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, row
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise BulkError(f"Invalid CSV: {e}")
+
+
+def _db_error_message(error):
+    diag = getattr(error.orig, 'diag', None)
+    return getattr(diag, 'message_primary', None) or str(error.orig).strip()
+
+
+class BulkResult:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append({'row': number, 'error': message})
+
+    def to_dict(self, entity):
+        return {
+            'entity': entity,
+            'received': self.received,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _flush_chunk(spec, chunk, result):
+    """
+    Вставляет пачку [(номер строки, значения)] в одной транзакции.
+    Если БД отклоняет пачку (уникальность, внешний ключ, пересечение дат), пачка
+    повторяется построчно в точках сохранения, чтобы вставить корректные строки
+    и вернуть ошибку для каждой отклоненной.
+    """
+    insert_chunk = spec.get('insert') or (lambda rows: insert_rows(spec['model'], rows))
+    try:
+        ids = insert_chunk([values for _, values in chunk])
+        db.session.commit()
+        inserted = list(zip(ids, (values for _, values in chunk)))
+    except (IntegrityError, DataError):
+        db.session.rollback()
+        inserted = []
+        for number, values in chunk:
+            try:
+                with db.session.begin_nested():
+                    ids = insert_chunk([values])
+                inserted.append((ids[0], values))
+            except (IntegrityError, DataError) as e:
+                result.add_error(number, _db_error_message(e))
+        db.session.commit()
+    result.inserted += len(inserted)
+    if inserted:
+        cache.invalidate(*spec['namespaces'])
+        if 'index_changes' in spec:
+            availability_index.apply_changes(spec['index_changes'](inserted))
+
+
+def bulk_insert(entity):
+    """
+    Массовая загрузка строк сущности из тела запроса.
+    Строки проверяются и преобразуются в Python, вставляются пачками по BULK_CHUNK_SIZE;
+    каждая пачка — одна транзакция. Возвращает сводку с ошибками по номерам строк.
+    """
+    spec = ENTITIES[entity]
+    result = BulkResult()
+    chunk = []
+    rows = read_rows()
+    while True:
+        try:
+            number, row = next(rows)
+        except StopIteration:
+            break
+        except BulkError as e:
+            if not result.received:
+                raise
+            # Поток оборвался посередине: уже разобранные строки сохраняются, остаток не читается
+            result.add_error(result.received + 1, str(e))
+            break
+        result.received += 1
+        if not isinstance(row, dict):
+            result.add_error(number, "Row must be a JSON object")
+            continue
+        if not InputValidator.is_safe_input(row):
+            result.add_error(number, "Invalid input data")
+            continue
+        try:
+            chunk.append((number, spec['convert'](row)))
+        except RowError as e:
+            result.add_error(number, str(e))
+            continue
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            _flush_chunk(spec, chunk, result)
+            chunk = []
+    if chunk:
+        _flush_chunk(spec, chunk, result)
+    return result.to_dict(entity)
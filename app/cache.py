@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Guest, Room, CleaningSchedule, Booking, Service, BookingService, Payment
+
+try:
+    import redis
+except ImportError:  # Redis нужен только для общего кэша (CACHE_BACKEND=redis)
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Пространства имен кэша: запись в таблицу модели делает устаревшими все ключи ее пространства
+MODEL_NAMESPACES = {
+    Guest: 'guests',
+    Room: 'rooms',
+    CleaningSchedule: 'cleaning',
+    Booking: 'bookings',
+    BookingService: 'bookings',
+    Service: 'services',
+    Payment: 'payments',
+}
+
+
+class MemoryBackend:
+    """
+    LRU-кэш в памяти процесса с ограничением времени жизни записей.
+    Версии пространств имен тоже хранятся в процессе, поэтому при нескольких
+    воркерах gunicorn запись в одном воркере не сбрасывает кэш остальных —
+    устаревание в них ограничено TTL.
+    """
+    name = 'memory'
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._versions = {}
+        self._modified = {}  # namespace -> время последней инвалидации (unix time)
+        self.epoch = f"{uuid.uuid4().hex}:{time.time()}"  # Версии процесса начинаются заново
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, namespaces):
+        with self._lock:
+            return [self._versions.get(namespace, 0) for namespace in namespaces]
+
+    def bump(self, namespaces):
+        now = time.time()
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+                self._modified[namespace] = now
+
+    def modified(self, namespaces):
+        started = float(self.epoch.rsplit(':', 1)[1])
+        with self._lock:
+            return [self._modified.get(namespace, started) for namespace in namespaces]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Общий для всех процессов кэш в Redis. Значения хранятся в JSON,
+    версии пространств имен — счетчиками INCR, поэтому запись в любом
+    воркере сразу делает устаревшими ключи во всех остальных.
+    """
+    name = 'redis'
+
+    def __init__(self, url, prefix='hotel:cache:'):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._epoch = None
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def versions(self, namespaces):
+        values = self.client.mget([f"{self.prefix}version:{namespace}" for namespace in namespaces])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, namespaces):
+        now = time.time()
+        pipeline = self.client.pipeline()
+        for namespace in namespaces:
+            pipeline.incr(f"{self.prefix}version:{namespace}")
+            pipeline.hset(f"{self.prefix}version:modified", namespace, now)
+        pipeline.execute()
+
+    @property
+    def epoch(self):
+        """
+        Метка поколения счетчиков: создается один раз и пропадает вместе с ними
+        (например, после FLUSHALL), чтобы новые версии не совпали со старыми.
+        """
+        key = f"{self.prefix}version:epoch"
+        epoch = self.client.get(key)
+        if epoch is None:
+            self.client.set(key, f"{uuid.uuid4().hex}:{time.time()}", nx=True)
+            epoch = self.client.get(key)
+        return epoch.decode()
+
+    def modified(self, namespaces):
+        started = float(self.epoch.rsplit(':', 1)[1])
+        values = self.client.hmget(f"{self.prefix}version:modified", list(namespaces))
+        return [float(value) if value is not None else started for value in values]
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        version_prefix = (self.prefix + 'version:').encode()
+        return sum(1 for key in self.client.scan_iter(match=self.prefix + '*') if not key.startswith(version_prefix))
+
+
+class Cache:
+    """
+    Read-through кэш справочных данных (номера, услуги) с TTL и явной инвалидацией.
+    Ключ записи включает версии ее пространств имен; после commit, изменившего
+    таблицу, версия увеличивается, и старые записи больше не читаются.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.ttl = None
+        self.backend = None
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    def init_app(self, app):
+        """
+        Читает настройки CACHE_* и регистрирует обработчики событий сессии.
+        """
+        self.enabled = os.getenv('CACHE_ENABLED', '1') == '1'
+        self.ttl = int(os.getenv('CACHE_TTL', '60'))  # Секунды; 0 — без ограничения
+        backend = os.getenv('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisBackend(os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        else:
+            self.backend = MemoryBackend(int(os.getenv('CACHE_MAX_ENTRIES', '1024')))
+        if not event.contains(Session, 'after_flush', _collect_cache_changes):
+            event.listen(Session, 'after_flush', _collect_cache_changes)
+            event.listen(Session, 'after_commit', _apply_cache_changes)
+            event.listen(Session, 'after_soft_rollback', _discard_cache_changes)
+
+    def get_or_set(self, namespaces, key, loader, ttl=None):
+        """
+        Возвращает значение из кэша или вызывает loader() и сохраняет результат.
+        namespaces — имя пространства или кортеж имен, от которых зависит значение.
+        Значения должны быть JSON-совместимыми; None не кэшируется.
+        """
+        if not self.enabled:
+            return loader()
+        if isinstance(namespaces, str):
+            namespaces = (namespaces,)
+        stat_name = namespaces[0]
+        try:
+            versions = self.backend.versions(namespaces)
+            full_key = ':'.join(f"{namespace}.{version}" for namespace, version in zip(namespaces, versions))
+            full_key = f"{full_key}:{key}"
+            value = self.backend.get(full_key)
+        except Exception as e:
+            logger.warning("Cache read failed: %s", e)
+            return loader()
+        if value is not None:
+            self._count(self._hits, stat_name)
+            return value
+        self._count(self._misses, stat_name)
+        value = loader()
+        if value is not None:
+            try:
+                self.backend.set(full_key, value, self.ttl if ttl is None else ttl)
+            except Exception as e:
+                logger.warning("Cache write failed: %s", e)
+        return value
+
+    def versions(self, namespaces):
+        """
+        Текущие версии пространств имен (список в том же порядке).
+        """
+        return self.backend.versions(namespaces)
+
+    def validators(self, namespaces):
+        """
+        Дешевые валидаторы HTTP-кэширования для данных из указанных пространств имен:
+        (метка версии, время последнего изменения в UTC). Метка меняется после
+        каждой инвалидации любого из пространств и при смене поколения счетчиков.
+        """
+        versions = self.backend.versions(namespaces)
+        modified = max(self.backend.modified(namespaces))
+        tag = '.'.join(f"{namespace}{version}" for namespace, version in zip(namespaces, versions))
+        return f"{self.backend.epoch}:{tag}", datetime.fromtimestamp(int(modified), timezone.utc)
+
+    def invalidate(self, *namespaces):
+        """
+        Делает устаревшими все записи указанных пространств имен.
+        Вызывается автоматически после commit через ORM; записи в обход сессии
+        (например, Core insert) должны вызывать его явно. Версии увеличиваются и
+        при выключенном кэше, так как на них построены ETag (см. conditional.py).
+        """
+        if self.backend is None or not namespaces:
+            return
+        try:
+            self.backend.bump(namespaces)
+        except Exception as e:
+            logger.error("Cache invalidation failed: %s", e, exc_info=True)
+
+    def _count(self, counters, namespace):
+        with self._lock:
+            counters[namespace] = counters.get(namespace, 0) + 1
+
+    def stats(self):
+        """
+        Счетчики попаданий и промахов по пространствам имен.
+        """
+        with self._lock:
+            hits, misses = dict(self._hits), dict(self._misses)
+        total_hits, total_misses = sum(hits.values()), sum(misses.values())
+        lookups = total_hits + total_misses
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend.name if self.backend else None,
+            'ttl': self.ttl,
+            'entries': self.backend.size() if self.backend else 0,
+            'hits': total_hits,
+            'misses': total_misses,
+            'hit_ratio': round(total_hits / lookups, 4) if lookups else None,
+            'namespaces': {
+                namespace: {'hits': hits.get(namespace, 0), 'misses': misses.get(namespace, 0)}
+                for namespace in sorted(hits.keys() | misses.keys())
+            }
+        }
+
+
+cache = Cache()
+
+
+def _collect_cache_changes(session, flush_context):
+    """
+    После flush запоминает пространства имен измененных таблиц; версии
+    увеличиваются только после успешного commit.
+    """
+    changed = session.info.setdefault('cache_namespaces', set())
+    for obj in session.new | session.dirty | session.deleted:
+        namespace = MODEL_NAMESPACES.get(type(obj))
+        if namespace:
+            changed.add(namespace)
+
+
+def _apply_cache_changes(session):
+    changed = session.info.pop('cache_namespaces', None)
+    if changed:
+        cache.invalidate(*sorted(changed))
+
+
+def _discard_cache_changes(session, previous_transaction):
+    session.info.pop('cache_namespaces', None)
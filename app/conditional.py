@@ -0,0 +1,77 @@
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+
+from app.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Через сколько секунд ETag меняется, а Last-Modified сдвигается вперед даже без инвалидации:
+# ограничивает срок, в течение которого клиент может не увидеть записи в обход приложения (psql, другие сервисы)
+ETAG_MAX_AGE = int(os.getenv('ETAG_MAX_AGE', os.getenv('CACHE_TTL', '60')))
+
+
+def validators_shared():
+    """
+    Общие ли версии пространств имен для всех процессов. Только с общим кэшем (CACHE_BACKEND=redis):
+    в кэше процесса (memory) запись в одном воркере не меняет версии остальных, и они
+    отвечали бы 304 на устаревший ETag.
+    """
+    return cache.backend is not None and cache.backend.name == 'redis'
+
+
+def current_validators(namespaces):
+    """
+    ETag и Last-Modified ответа на текущий запрос. ETag зависит от версий
+    пространств имен, пути с параметрами и заголовка Accept (формат ответа).
+    Last-Modified не раньше начала текущего окна ETAG_MAX_AGE: иначе клиент, который
+    присылает только If-Modified-Since, получал бы 304 бессрочно от воркера, не видевшего записи.
+    """
+    tag, last_modified = cache.validators(namespaces)
+    window = int(time.time() // ETAG_MAX_AGE) if ETAG_MAX_AGE else 0
+    if ETAG_MAX_AGE:
+        last_modified = max(last_modified, datetime.fromtimestamp(window * ETAG_MAX_AGE, timezone.utc))
+    source = f"{tag}|{window}|{request.full_path}|{request.headers.get('Accept', '')}"
+    return hashlib.sha1(source.encode()).hexdigest(), last_modified
+
+
+def conditional(namespaces):
+    """
+    Декоратор GET-маршрута: поддержка If-None-Match / If-Modified-Since.
+    Валидаторы вычисляются до вызова обработчика, поэтому при совпадении
+    ответ 304 отдается без запросов к БД и сериализации.
+    Без общего кэша (см. validators_shared) маршрут отвечает как обычно, без ETag.
+    namespaces — кортеж пространств имен кэша или функция (view_args) -> кортеж.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not validators_shared():
+                return view(*args, **kwargs)
+            names = namespaces(kwargs) if callable(namespaces) else namespaces
+            try:
+                etag, last_modified = current_validators(names)
+            except Exception as e:
+                logger.warning("Conditional request validators unavailable: %s", e)
+                return view(*args, **kwargs)
+            not_modified = (
+                request.if_none_match.contains_weak(etag) if request.if_none_match
+                else request.if_modified_since is not None and last_modified <= request.if_modified_since
+            )
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'  # Клиент хранит ответ, но всегда проверяет его
+            return response
+        return wrapper
+    return decorator
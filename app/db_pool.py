@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """
+    Счетчики пула соединений процесса: число выдач соединений, время ожидания
+    свободного соединения и число отказов по таймауту.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def snapshot(self, pool):
+        """
+        Текущее состояние пула и накопленные счетчики в виде словаря.
+        """
+        with self._lock:
+            checkouts, timeouts = self.checkouts, self.timeouts
+            wait_total, wait_max = self.wait_total, self.wait_max
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        return {
+            'pool_size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'utilization': round(pool.checkedout() / capacity, 4) if capacity else None,
+            'checkouts': checkouts,
+            'checkout_timeouts': timeouts,
+            'checkout_wait_avg_ms': round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            'checkout_wait_max_ms': round(wait_max * 1000, 3)
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool, который замеряет время ожидания соединения при выдаче из пула.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def engine_options():
+    """
+    Параметры create_engine (SQLALCHEMY_ENGINE_OPTIONS) из переменных окружения:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT (мс, 0 — без ограничения) и DB_PGBOUNCER.
+    """
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),  # Пересоздавать соединения старше N секунд
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1'  # Проверять соединение перед выдачей
+    }
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+    if statement_timeout and not pgbouncer_mode():
+        # Без PgBouncer таймаут задается параметром запуска сессии
+        options['connect_args'] = {'options': f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def pgbouncer_mode():
+    """
+    Режим совместимости с PgBouncer (DB_PGBOUNCER=1, пулинг транзакций).
+    """
+    return os.getenv('DB_PGBOUNCER', '0') == '1'
+
+
+def init_pool(app, db):
+    """
+    Донастройка движка после db.init_app.
+    В режиме PgBouncer состояние сессии не сохраняется между транзакциями, а параметр
+    запуска options не поддерживается, поэтому statement_timeout задается через
+    SET LOCAL в начале каждой транзакции. Подготовленных выражений psycopg2 не использует.
+    """
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+    if not (statement_timeout and pgbouncer_mode()):
+        return
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'begin')
+    def set_statement_timeout(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {statement_timeout}")
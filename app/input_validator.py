@@ -19,31 +19,46 @@ class InputValidator:
         r"DELETE\s+FROM",               # Проверка на DELETE FROM
     ]
 
+    # Все паттерны, объединенные в одно регулярное выражение и скомпилированные один раз:
+    # строка проверяется за один проход вместо отдельного re.search на каждый паттерн
+    DANGEROUS_PATTERN = re.compile(
+        "|".join(f"(?:{pattern})" for pattern in XSS_PATTERNS + SQL_INJECTION_PATTERNS),
+        re.IGNORECASE
+    )
+
+    # Ограничения на структуру проверяемых данных: более глубокие или большие
+    # данные считаются небезопасными без дальнейшего разбора
+    MAX_DEPTH = 32           # Максимальная вложенность словарей и списков
+    MAX_ITEMS = 10000        # Максимальное общее число значений
+    MAX_STRING_LENGTH = 65536  # Максимальная длина одной строки
+
     @staticmethod
     def is_safe_input(data):
         """
         Проверяет, является ли входное значение безопасным.
-        :param data: Входные данные (строка или словарь).
+        Вложенные словари и списки обходятся итеративно (без рекурсии).
+        :param data: Входные данные (строка, словарь или список).
         :return: True, если данные безопасны, иначе False.
         """
-        if isinstance(data, dict):
-            # Если данные - словарь, проверяем каждое значение
-            for value in data.values():
-                if not InputValidator.is_safe_input(value):
-                    return False
-            return True
-        elif isinstance(data, list):
-            # Если данные - список, проверяем каждый элемент
-            for item in data:
-                if not InputValidator.is_safe_input(item):
-                    return False
-            return True
-        elif isinstance(data, str):
-            # Если данные - строка, проверяем на наличие опасных паттернов
-            for pattern in InputValidator.XSS_PATTERNS + InputValidator.SQL_INJECTION_PATTERNS:
-                if re.search(pattern, data, re.IGNORECASE):
+        search = InputValidator.DANGEROUS_PATTERN.search
+        stack = [(data, 0)]
+        items = 0
+        while stack:
+            value, depth = stack.pop()
+            if isinstance(value, str):
+                # Строка проверяется на наличие опасных паттернов
+                if len(value) > InputValidator.MAX_STRING_LENGTH or search(value):
                     return False
-            return True
-        else:
-            # Для всех остальных типов данных считаем их безопасными
-            return True
\ No newline at end of file
+                continue
+            if isinstance(value, dict):
+                children = value.values()
+            elif isinstance(value, list):
+                children = value
+            else:
+                # Для всех остальных типов данных считаем их безопасными
+                continue
+            items += len(children)
+            if depth >= InputValidator.MAX_DEPTH or items > InputValidator.MAX_ITEMS:
+                return False
+            stack.extend((child, depth + 1) for child in children)
+        return True
@@ -1,31 +1,192 @@
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+from flask import g, has_request_context, request
+
+from app.profiling import current_profile
+
+# Записи пишутся в файл и консоль фоновым потоком QueueListener: поток запроса только
+# кладет запись в очередь и не ждет ввода-вывода и ротации файла
+_listener = None
+
+# Атрибуты стандартной записи; остальные (extra=..., поля запроса) попадают в JSON как есть
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Заголовок с идентификатором запроса: принимается от прокси/клиента и возвращается в ответе
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+request_logger = logging.getLogger('app.requests')
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Запись журнала одной строкой JSON: время, уровень, логгер, сообщение,
+    поля запроса (request_id, method, path, elapsed_ms), extra и трассировка исключения.
+    """
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and value is not None:
+                data[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Добавляет к записи идентификатор и адрес текущего запроса и время с его начала.
+    Выполняется в потоке запроса: в фоновом потоке записи контекста Flask уже нет.
+    """
+
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+            record.method = request.method
+            record.path = request.path
+            record.elapsed_ms = round((time.perf_counter() - g.request_started) * 1000, 2)
+        else:
+            record.request_id = None
+        return True
+
+
+class RequestQueueHandler(QueueHandler):
+    """
+    QueueHandler, сохраняющий сообщение и трассировку исключения отдельными полями
+    (стандартный prepare склеивает их в одну строку форматтером по умолчанию).
+    """
+
+    def prepare(self, record):
+        message = record.getMessage()  # Аргументы %-формата подставляются только для записей нужного уровня
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _level(name, default):
+    return logging.getLevelName(os.getenv(name, default).upper())
+
+
+def _handlers():
+    """
+    Обработчики фонового потока: консоль (stdout) и файл (настройки LOG_*).
+    Файл ротируется самим приложением (RotatingFileHandler) при LOG_FILE_MAX_BYTES > 0.
+    Это безопасно только в одном процессе: воркеры gunicorn переименовывали бы файл каждый
+    сам по себе. При LOG_FILE_MAX_BYTES=0 файл ротируется извне (logrotate), а обработчик
+    (WatchedFileHandler) заново открывает его после переименования.
+    Под gunicorn по умолчанию файла нет (gunicorn.conf.py): журнал — только stdout.
+    """
+    if os.getenv('LOG_FORMAT', 'json') == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    handlers = []
+    if os.getenv('LOG_CONSOLE', '1') == '1':
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(_level('LOG_CONSOLE_LEVEL', 'INFO'))
+        handlers.append(console_handler)
+    log_file = os.getenv('LOG_FILE', 'app.log')
+    if log_file:
+        max_bytes = int(os.getenv('LOG_FILE_MAX_BYTES', str(1024 * 1024)))
+        if max_bytes:
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))
+            )
+        else:
+            file_handler = WatchedFileHandler(log_file)
+        file_handler.setLevel(_level('LOG_FILE_LEVEL', 'DEBUG'))
+        handlers.append(file_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener(queue_handler, handlers):
+    global _listener
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """
+    Дописывает записи, оставшиеся в очереди, при завершении процесса.
+    """
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
 
 def setup_logger():
     """
     Настройка логгера для приложения.
+    Корневой логгер пишет в очередь; в консоль и файл записи выводит фоновый поток.
+    Уровни, формат (json или text) и размеры файлов задаются переменными LOG_*.
     """
-    # Создание логгера
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)  # Устанавливаем глобальный уровень логов
-
-    # Форматтер для логов
-    formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s - %(message)s"
-    )
-
-    # Логирование в консоль
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)  # Выводим INFO и выше в консоль
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    # Логирование в файл
-    file_handler = RotatingFileHandler(
-        "app.log", maxBytes=1024 * 1024, backupCount=5
-    )  # Лог-файл размером до 1 МБ, хранятся 5 старых файлов
-    file_handler.setLevel(logging.DEBUG)  # Сохраняем DEBUG и выше в файл
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-
-    return logger
\ No newline at end of file
+    if _listener is not None:
+        return logger
+    logger.setLevel(_level('LOG_LEVEL', 'INFO'))
+
+    handlers = _handlers()
+    queue_handler = RequestQueueHandler(None)
+    queue_handler.addFilter(RequestContextFilter())
+    logger.addHandler(queue_handler)
+    _start_listener(queue_handler, handlers)
+
+    atexit.register(_stop_listener)
+    # Поток записи не переживает fork (gunicorn с preload_app): в дочернем процессе он запускается заново
+    os.register_at_fork(after_in_child=lambda: _start_listener(queue_handler, handlers))
+    return logger
+
+
+def init_request_logging(app):
+    """
+    Идентификатор запроса (заголовок X-Request-ID или новый) для записей журнала и ответа;
+    при LOG_REQUESTS=1 — запись о каждом запросе со статусом и временем выполнения.
+    """
+    log_requests = os.getenv('LOG_REQUESTS', '0') == '1'
+
+    @app.before_request
+    def assign_request_id():
+        g.request_started = time.perf_counter()
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, '')[:64] or uuid.uuid4().hex
+
+    @app.after_request
+    def log_request(response):
+        if 'request_id' not in g:
+            return response
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        if log_requests:
+            timings = {'status': response.status_code}
+            profile = current_profile()
+            if profile is not None:
+                timings['db_ms'] = round(profile.db_time * 1000, 2)
+                timings['queries'] = profile.statements
+            request_logger.info(
+                "%s %s -> %s", request.method, request.full_path.rstrip('?'), response.status_code, extra=timings
+            )
+        return response
@@ -1,11 +1,34 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from dotenv import load_dotenv
+import bisect
 import os
-from datetime import datetime
-from app.logger_config import setup_logger
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+from psycopg2 import errorcodes
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from app.logger_config import init_request_logging, setup_logger
 from app.error_handlers import register_error_handlers
 from app.input_validator import InputValidator
-from app.models import db, Guest, Room, CleaningSchedule, Booking, Service, BookingService, Payment
+from app.db_pool import engine_options, init_pool, pool_stats
+from app.availability_index import availability_index
+from app.analytics import (
+    AnalyticsError, init_analytics, parse_date, parse_month, month_start,
+    occupancy_report, revenue_report, guest_segments, refresh_rollups
+)
+from app.bulk import BulkError, bulk_insert
+from app.cache import cache
+from app.conditional import conditional
+from app.pagination import (
+    PaginationError, is_digits, paginated_list, paginate, paginate_items, parse_page_args, next_page_headers
+)
+from app.metrics import metrics
+from app.profiling import profiler, timed
+from app.search import SearchError, parse_search_args, search_guests
+from app.streaming import stream_format, stream_query
+from app.tasks import complete_booking, task_queue
+from app.models import db, Guest, Room, CleaningSchedule, Booking, Service, BookingService, Payment, payment_method
 
 # Загрузка переменных окружения из файла .env
 load_dotenv()
@@ -13,21 +36,65 @@ load_dotenv()
 # Настройка логгера для записи логов приложения
 logger = setup_logger()
 
-# Создание экземпляра приложения Flask
-app = Flask(__name__)
+# Все маршруты API собраны в blueprint, приложение создается фабрикой create_app
+api = Blueprint('api', __name__)
 
-# Конфигурация базы данных: подключение к PostgreSQL с использованием переменных окружения
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-    f"@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
-)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Отключение отслеживания изменений для оптимизации
+def create_app():
+    """
+    Фабрика приложения Flask: конфигурация, расширения, маршруты и обработчики ошибок.
+    Используется и WSGI-сервером (wsgi.py, gunicorn), и локальным запуском.
+    """
+    app = Flask(__name__)
+
+    # Конфигурация базы данных: подключение к PostgreSQL с использованием переменных окружения
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Отключение отслеживания изменений для оптимизации
+    # Размер пула, таймауты, пересоздание соединений и pre-ping (переменные DB_POOL_*, см. db_pool.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+
+    # Инициализация базы данных SQLAlchemy в приложении
+    db.init_app(app)
+    init_pool(app, db)
+
+    # Внутрипроцессный индекс занятости номеров (включается AVAILABILITY_INDEX_ENABLED=1)
+    availability_index.init_app(app)
+
+    # Кэш справочных данных: номера и услуги (настройки CACHE_*, см. cache.py)
+    cache.init_app(app)
+    # Сброс кэша аналитических отчетов при изменениях закрытых периодов (см. analytics.py)
+    init_analytics(app)
+
+    # Фоновые задачи после commit: услуги и платеж брони (настройки TASK_*, см. tasks.py)
+    task_queue.init_app(app)
+
+    # Профилирование запросов: Server-Timing, журнал медленных запросов (настройки PROFILING_*, см. profiling.py)
+    profiler.init_app(app)
+
+    # Идентификатор запроса в журнале и заголовке X-Request-ID, журнал запросов (LOG_REQUESTS=1)
+    init_request_logging(app)
+
+    # Метрики Prometheus для /metrics (настройки METRICS_*, см. metrics.py)
+    metrics.init_app(app)
 
-# Инициализация базы данных SQLAlchemy в приложении
-db.init_app(app)
+    app.register_blueprint(api)
+
+    # Регистрация обработчиков ошибок
+    register_error_handlers(app)
+
+    # Создание недостающих таблиц при запуске (отключается DB_CREATE_ALL=0).
+    # Под gunicorn воркеры схему не создают: это делается один раз в on_starting (gunicorn.conf.py)
+    if os.getenv('DB_CREATE_ALL', '1') == '1':
+        with app.app_context():
+            db.create_all()
+
+    return app
 
 # Маршруты для работы с гостями
-@app.route('/api/guests', methods=['GET', 'POST'])
+@api.route('/api/guests', methods=['GET', 'POST'])
+@conditional(('guests',))
 def handle_guests():
     """
     Обработчик маршрута для получения списка гостей (GET) или добавления нового гостя (POST).
@@ -39,15 +106,17 @@ def handle_guests():
 
 def get_guests():
     """
-    Получение списка всех гостей из базы данных.
+    Получение списка гостей из базы данных.
+    Поддерживает keyset-пагинацию (?after_id=&limit=) и проекцию (?fields=).
     Возвращает JSON-массив объектов с информацией о каждом госте.
     Если возникает ошибка, возвращает сообщение об ошибке с кодом 500.
     """
     try:
-        guests = Guest.query.all()  # Запрос всех записей из таблицы Guest
-        return jsonify([guest.to_dict() for guest in guests])  # Преобразование в словарь и возврат JSON
+        return paginated_list(Guest)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving guests: {str(e)}", exc_info=True)
+        logger.error("Error retrieving guests: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 def add_guest():
@@ -77,10 +146,39 @@ def add_guest():
         return jsonify(new_guest.to_dict()), 201
     except Exception as e:
         db.session.rollback()  # Откат изменений в случае ошибки
-        logger.error(f"Error adding guest: {str(e)}", exc_info=True)
+        logger.error("Error adding guest: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/api/rooms/<room_number>/full-info', methods=['GET'])
+@api.route('/api/guests/search', methods=['GET'])
+@conditional(('guests',))
+def handle_guest_search():
+    """
+    Поиск гостей по фамилии, имени, телефону, email и части номера паспорта
+    (?q=, несколько слов — все должны совпасть). Сортировка ?sort=relevance|name|created,
+    страницы ?limit=&offset=; ссылка на следующую страницу — в заголовках Link и X-Next-Offset.
+    """
+    try:
+        tokens, sort, limit, offset = parse_search_args(request.args)
+        guests, next_offset = search_guests(tokens, sort, limit, offset)
+        headers = {}
+        if next_offset is not None:
+            args = request.args.to_dict()
+            args['offset'] = next_offset
+            headers = {
+                'Link': f'<{request.base_url}?{urlencode(args)}>; rel="next"',
+                'X-Next-Offset': str(next_offset)
+            }
+        return jsonify([guest.to_dict() for guest in guests]), 200, headers
+    except SearchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error searching guests: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+# Данные, из которых собирается полная информация о номере
+FULL_INFO_NAMESPACES = ('rooms', 'cleaning', 'bookings', 'services', 'payments', 'guests')
+@api.route('/api/rooms/<room_number>/full-info', methods=['GET'])
+@conditional(FULL_INFO_NAMESPACES)
 def get_full_room_info(room_number):
     """
     Получение полной информации о номере, включая бронирования, уборку, услуги и оплату.
@@ -88,26 +186,32 @@ def get_full_room_info(room_number):
     Возвращает JSON-объект с детальной информацией о номере.
     """
     try:
-        room = Room.query.filter_by(room_number=room_number).first()  # Поиск номера по room_number
+        # Номер и расписание уборки меняются редко и берутся из кэша
+        room = cache.get_or_set(('rooms', 'cleaning'), f"room:{room_number}", lambda: load_room_card(room_number))
         if not room:
             return jsonify({"error": "Room not found"}), 404
         result = {
-            "room_info": {
-                "room_number": room.room_number,
-                "type": room.type,
-                "capacity": room.capacity,
-                "status": room.status,
-                "daily_rate": float(room.daily_rate),
-                "description": room.description
-            },
+            "room_info": room["room_info"],
             "bookings": [],
-            "cleaning": [],
+            "cleaning": room["cleaning"],
             "payments": [],
             "services": []
         }
-        bookings = Booking.query.filter_by(room_id=room.room_id).all()  # Получение всех бронирований для номера
+        # Бронирования с гостями (JOIN), услугами и платежами (по одному IN-запросу на связь).
+        # Количество запросов не зависит от числа бронирований, услуг и платежей.
+        bookings = (
+            Booking.query
+            .options(
+                joinedload(Booking.guest),
+                selectinload(Booking.services).joinedload(BookingService.service),
+                selectinload(Booking.payments)
+            )
+            .filter_by(room_id=room["room_id"])
+            .order_by(Booking.check_in_date)
+            .all()
+        )
         for booking in bookings:
-            guest = db.session.get(Guest, booking.guest_id)
+            guest = booking.guest
             result["bookings"].append({
                 "guest_name": f"{guest.first_name} {guest.last_name}",
                 "check_in": booking.check_in_date.strftime('%d.%m.%Y'),
@@ -115,42 +219,64 @@ def get_full_room_info(room_number):
                 "status": booking.status
             })
             # Услуги по бронированию
-            booking_services = BookingService.query.filter_by(booking_id=booking.booking_id).all()
-            for bs in booking_services:
-                service = db.session.get(Service, bs.service_id)
+            for bs in booking.services:
                 result["services"].append({
-                    "service_name": service.name,
+                    "service_name": bs.service.name,
                     "quantity": bs.quantity,
                     "date": bs.service_date.strftime('%d.%m.%Y'),
                     "notes": bs.notes or ""
                 })
             # Платежи по бронированию
-            payments = Payment.query.filter_by(booking_id=booking.booking_id).all()
-            for payment in payments:
+            for payment in booking.payments:
                 result["payments"].append({
                     "amount": float(payment.amount),
                     "status": payment.status,
                     "method": payment.method,
                     "date": payment.transaction_date.strftime('%d.%m.%Y') if payment.transaction_date else "—"
                 })
-        # Уборка
-        cleaning = CleaningSchedule.query.filter_by(room_id=room.room_id).first()
-        if cleaning:
-            result["cleaning"].append({
-                "date": cleaning.next_cleaning_date.strftime('%d.%m.%Y') if cleaning.next_cleaning_date else None,
-                "needs_cleaning": cleaning.needs_cleaning
-            })
         return jsonify(result)
     except Exception as e:
-        logger.error(f"Error getting full room info: {str(e)}", exc_info=True)
+        logger.error("Error getting full room info: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/ui/services-by-date', methods=['GET'])
+def load_room_card(room_number):
+    """
+    Карточка номера для full-info: room_id, основные сведения и уборка.
+    Номер вместе с расписанием уборки загружается одним запросом.
+    Возвращает None, если номер не найден.
+    """
+    room = (
+        Room.query
+        .options(joinedload(Room.cleaning_schedule))
+        .filter_by(room_number=room_number)
+        .first()
+    )
+    if not room:
+        return None
+    cleaning = room.cleaning_schedule
+    return {
+        "room_id": room.room_id,
+        "room_info": {
+            "room_number": room.room_number,
+            "type": room.type,
+            "capacity": room.capacity,
+            "status": room.status,
+            "daily_rate": float(room.daily_rate),
+            "description": room.description
+        },
+        "cleaning": [{
+            "date": cleaning.next_cleaning_date.strftime('%d.%m.%Y') if cleaning.next_cleaning_date else None,
+            "needs_cleaning": cleaning.needs_cleaning
+        }] if cleaning else []
+    }
+
+@api.route('/ui/services-by-date', methods=['GET'])
 def get_services_by_date():
     """
     Получение списка услуг за указанный период.
     Принимает параметры start_date и end_date в формате YYYY-MM-DD.
-    Возвращает JSON-массив объектов с информацией об услугах.
+    Возвращает JSON-массив объектов с информацией об услугах
+    (или поток, если запрошен ?format=ndjson / ?stream=1).
     """
     try:
         start_date_str = request.args.get('start_date')
@@ -161,32 +287,53 @@ def get_services_by_date():
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
         if end_date < start_date:
             return jsonify({"error": "Invalid date range"}), 400
-        booking_services = (
-            db.session.query(BookingService, Booking, Room, Service)
+        # Выбираются только нужные столбцы, без загрузки ORM-объектов
+        query = (
+            db.session.query(
+                BookingService.booking_service_id,
+                BookingService.service_date,
+                Room.room_number,
+                Service.name,
+                BookingService.quantity,
+                BookingService.notes
+            )
             .join(Booking, Booking.booking_id == BookingService.booking_id)
             .join(Room, Room.room_id == Booking.room_id)
             .join(Service, Service.service_id == BookingService.service_id)
             .filter(BookingService.service_date >= start_date)
             .filter(BookingService.service_date <= end_date)
-            .order_by(BookingService.service_date)
-            .all()
+            .order_by(BookingService.service_date, BookingService.booking_service_id)
         )
-        results = []
-        for bs, booking, room, service in booking_services:
-            results.append({
-                "date": bs.service_date.strftime('%d.%m.%Y'),
-                "room_number": room.room_number,
-                "service_name": service.name,
-                "quantity": bs.quantity,
-                "notes": bs.notes or ""
-            })
-        return jsonify(results)
+
+        def serialize(row):
+            return {
+                "booking_service_id": row.booking_service_id,
+                "date": row.service_date.strftime('%d.%m.%Y'),
+                "room_number": row.room_number,
+                "service_name": row.name,
+                "quantity": row.quantity,
+                "notes": row.notes or ""
+            }
+
+        fmt = stream_format()
+        if fmt:
+            return stream_query(query, serialize, fmt)
+        return jsonify([serialize(row) for row in query.all()])
     except Exception as e:
-        logger.error(f"Ошибка при получении услуг за период: {str(e)}", exc_info=True)
+        logger.error("Ошибка при получении услуг за период: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Маршруты для работы с комнатами
-@app.route('/api/rooms', methods=['GET', 'POST'])
+def rooms_namespaces(view_args):
+    """
+    От чего зависит список комнат: с датами — еще и от бронирований.
+    """
+    if request.args.get('check_in') and request.args.get('check_out'):
+        return ('rooms', 'bookings')
+    return ('rooms',)
+
+@api.route('/api/rooms', methods=['GET', 'POST'])
+@conditional(rooms_namespaces)
 def handle_rooms():
     """
     Обработчик маршрута для получения списка комнат (GET) или добавления новой комнаты (POST).
@@ -196,76 +343,149 @@ def handle_rooms():
     elif request.method == 'POST':
         return add_room()
 
+def booking_overlap_filter(check_in_date, check_out_date):
+    """
+    Условие пересечения бронирования с периодом [check_in_date, check_out_date].
+    Используется в EXISTS-подзапросах; отмененные бронирования не учитываются
+    (как в find_available_rooms). Пересечение записано тем же выражением, что и
+    ограничение no_overlapping_bookings, чтобы поиск шел по его GiST-индексу.
+    """
+    return and_(
+        func.daterange(Booking.check_in_date, Booking.check_out_date, '[]')
+        .op('&&')(func.daterange(check_in_date, check_out_date, '[]')),
+        Booking.status != 'cancelled'
+    )
+
 def get_rooms():
     """
     Получение списка комнат с возможностью фильтрации по статусу, вместимости и датам.
+    Динамический статус вычисляется в том же запросе через EXISTS-подзапрос,
+    поэтому количество запросов не зависит от числа комнат.
+    Поддерживает keyset-пагинацию по room_id (?after_id=&limit=).
+    Без дат список берется из кэша (см. get_cached_rooms).
     Возвращает JSON-массив объектов с информацией о комнатах.
     """
     try:
+        after_id, limit = parse_page_args(request.args)
         status = request.args.get('status')
         capacity = request.args.get('capacity')
         min_capacity = request.args.get('min_capacity')
         check_in = request.args.get('check_in')
         check_out = request.args.get('check_out')
+        if not (check_in and check_out):
+            return get_cached_rooms(status, capacity, min_capacity, after_id, limit)
         query = Room.query
-        # Фильтр по вместимости
-        if capacity and capacity.isdigit():
-            query = query.filter(Room.capacity == int(capacity))
-        elif min_capacity and min_capacity.isdigit():
-            query = query.filter(Room.capacity >= int(min_capacity))
+        # Фильтр по вместимости: границы диапазона (в индексе занятости — тоже)
+        lowest = highest = None
+        if capacity and is_digits(capacity):
+            lowest = highest = int(capacity)
+            query = query.filter(Room.capacity == lowest)
+        elif min_capacity and is_digits(min_capacity):
+            lowest = int(min_capacity)
+            query = query.filter(Room.capacity >= lowest)
         # Проверка дат
-        if check_in and check_out:
-            try:
-                check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
-                check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
-                # Подзапрос: номера, ЗАНЯТЫЕ в заданный период
-                booked_room_ids = db.session.query(Booking.room_id).filter(
-                    Booking.check_in_date <= check_out_date,
-                    Booking.check_out_date >= check_in_date,
-                    Booking.status != 'cancelled'
-                ).subquery()
-                if status == "available":
-                    query = query.filter(~Room.room_id.in_(booked_room_ids))
-                elif status == "occupied":
-                    query = query.filter(Room.room_id.in_(booked_room_ids))
-                elif status == "maintenance":
-                    query = query.filter(Room.status == 'maintenance')
-                # статус "все" или None — ничего не фильтруем
-            except ValueError as e:
-                logger.warning(f"Invalid date format: {e}")
-                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        try:
+            check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
+            check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
+        except ValueError as e:
+            logger.warning("Invalid date format: %s", e)
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        # daterange в booking_overlap_filter не допускает нижнюю границу больше верхней
+        if check_out_date < check_in_date:
+            return jsonify({"error": "check_out must not be earlier than check_in"}), 400
+        if status == "maintenance":
+            query = query.filter(Room.status == 'maintenance')
+        if availability_index.enabled:
+            # Занятость берется из индекса в памяти, без обращения к bookings. Фильтр по статусу
+            # применяется до пагинации, чтобы страницы были полными, как в ветке с подзапросом
+            availability_index.ensure_fresh()
+            if status in ("available", "occupied"):
+                # Индекс сам отбирает номера по вместимости и занятости; страница считается по списку
+                # room_id, и в SQL уходят только ключи страницы, а не все свободные или занятые номера
+                booked = status == "occupied"
+                find = availability_index.booked_rooms if booked else availability_index.free_rooms
+                room_ids = sorted(find(check_in_date, check_out_date, lowest, highest))
+                if after_id is not None:
+                    room_ids = room_ids[bisect.bisect_right(room_ids, after_id):]
+                if limit is None:
+                    # Весь список: номера читаются с фильтром по вместимости и отбираются по индексу
+                    selected = set(room_ids)
+                    rooms = [room for room in query.order_by(Room.room_id) if room.room_id in selected]
+                    next_cursor = None
+                else:
+                    page_ids = room_ids[:limit]
+                    rooms = Room.query.filter(Room.room_id.in_(page_ids)).order_by(Room.room_id).all()
+                    next_cursor = page_ids[-1] if len(room_ids) > limit else None
+                rows = [(room, booked) for room in rooms]
+            else:
+                rooms, next_cursor = paginate(query, Room.room_id, after_id, limit)
+                rows = [
+                    (room, availability_index.is_booked(room.room_id, check_in_date, check_out_date))
+                    for room in rooms
+                ]
         else:
-            # если даты не заданы, фильтруем только по room.status
+            # Коррелированный подзапрос: есть ли у номера бронь, пересекающая период
+            is_booked = (
+                db.session.query(Booking.booking_id)
+                .filter(Booking.room_id == Room.room_id)
+                .filter(booking_overlap_filter(check_in_date, check_out_date))
+                .exists()
+            )
             if status == "available":
-                query = query.filter(Room.status == 'available')
+                query = query.filter(~is_booked)
             elif status == "occupied":
-                query = query.filter(Room.status != 'available')
-            elif status == "maintenance":
-                query = query.filter(Room.status == 'maintenance')
-        rooms = query.all()
+                query = query.filter(is_booked)
+            # статус "все" или None — ничего не фильтруем
+            rows, next_cursor = paginate(
+                query.add_columns(is_booked.label('is_booked')), Room.room_id, after_id, limit,
+                cursor=lambda row: row[0].room_id
+            )
         results = []
-        for room in rooms:
-            room_dict = room.to_dict()
-            if check_in and check_out:
-                # Вычисляем динамический статус
-                overlapping_booking = Booking.query.filter(
-                    Booking.room_id == room.room_id,
-                    Booking.check_in_date <= check_out_date,
-                    Booking.check_out_date >= check_in_date,
-                    Booking.status != 'cancelled'
-                ).first()
-                if overlapping_booking:
-                    room_dict['dynamic_status'] = 'occupied'
-                else:
-                    room_dict['dynamic_status'] = 'available'
-            else:
-                room_dict['dynamic_status'] = room.status  # если нет дат — обычный статус
-            results.append(room_dict)
-        return jsonify(results)
+        with timed('to_dict'):
+            for room, booked in rows:
+                room_dict = room.to_dict()
+                room_dict['dynamic_status'] = 'occupied' if booked else 'available'
+                results.append(room_dict)
+        return jsonify(results), 200, next_page_headers(next_cursor, limit)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving rooms: {str(e)}", exc_info=True)
+        logger.error("Error retrieving rooms: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+def load_rooms():
+    """
+    Все номера, отсортированные по room_id, в виде словарей для кэша.
+    Без дат динамический статус совпадает с обычным.
+    """
+    results = []
+    for room in Room.query.order_by(Room.room_id).all():
+        room_dict = room.to_dict()
+        room_dict['dynamic_status'] = room.status
+        results.append(room_dict)
+    return results
+
+def get_cached_rooms(status, capacity, min_capacity, after_id, limit):
+    """
+    Список комнат без дат: фильтры по room.status и вместимости применяются
+    к кэшированному списку всех номеров, без обращения к БД.
+    """
+    rooms = cache.get_or_set('rooms', 'all', load_rooms)
+    # Фильтр по вместимости
+    if capacity and is_digits(capacity):
+        rooms = [room for room in rooms if room['capacity'] == int(capacity)]
+    elif min_capacity and is_digits(min_capacity):
+        rooms = [room for room in rooms if room['capacity'] >= int(min_capacity)]
+    # если даты не заданы, фильтруем только по room.status
+    if status == "available":
+        rooms = [room for room in rooms if room['status'] == 'available']
+    elif status == "occupied":
+        rooms = [room for room in rooms if room['status'] != 'available']
+    elif status == "maintenance":
+        rooms = [room for room in rooms if room['status'] == 'maintenance']
+    rooms, next_cursor = paginate_items(rooms, 'room_id', after_id, limit)
+    return jsonify(rooms), 200, next_page_headers(next_cursor, limit)
+
 def add_room():
     """
     Добавление новой комнаты в базу данных.
@@ -288,22 +508,22 @@ def add_room():
             description=data.get('description')
         )
         db.session.add(new_room)
-        db.session.commit()
+        db.session.flush()  # чтобы получить new_room.room_id до commit
         cleaning_schedule = CleaningSchedule(
             room_id=new_room.room_id,
             needs_cleaning=False,
             next_cleaning_date=None
         )
         db.session.add(cleaning_schedule)
-        db.session.commit()
+        db.session.commit()  # Номер и расписание уборки — одной транзакцией
         return jsonify(new_room.to_dict()), 201
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding room: {str(e)}", exc_info=True)
+        logger.error("Error adding room: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Маршруты для работы с уборкой
-@app.route('/api/cleaning-schedule', methods=['GET', 'POST', 'PUT'])
+@api.route('/api/cleaning-schedule', methods=['GET', 'POST', 'PUT'])
 def handle_cleaning():
     """
     Обработчик маршрута для получения расписания уборки (GET),
@@ -319,13 +539,15 @@ def handle_cleaning():
 def get_cleaning_schedule():
     """
     Получение расписания уборки для всех комнат.
+    Поддерживает keyset-пагинацию (?after_id=&limit=) и проекцию (?fields=).
     Возвращает JSON-массив объектов с информацией о расписании.
     """
     try:
-        schedules = CleaningSchedule.query.all()
-        return jsonify([schedule.to_dict() for schedule in schedules])
+        return paginated_list(CleaningSchedule)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving cleaning schedule: {str(e)}", exc_info=True)
+        logger.error("Error retrieving cleaning schedule: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 def add_cleaning_schedule():
@@ -352,7 +574,7 @@ def add_cleaning_schedule():
         return jsonify(new_schedule.to_dict()), 201
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding cleaning schedule: {str(e)}", exc_info=True)
+        logger.error("Error adding cleaning schedule: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 def update_cleaning_schedule():
@@ -378,11 +600,11 @@ def update_cleaning_schedule():
         return jsonify(schedule.to_dict())
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error updating cleaning schedule: {str(e)}", exc_info=True)
+        logger.error("Error updating cleaning schedule: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Маршруты для работы с бронированиями
-@app.route('/api/bookings', methods=['GET', 'POST'])
+@api.route('/api/bookings', methods=['GET', 'POST'])
 def handle_bookings():
     """
     Обработчик маршрута для получения списка бронирований (GET)
@@ -395,18 +617,25 @@ def handle_bookings():
 
 def get_bookings():
     """
-    Получение списка всех бронирований.
+    Получение списка бронирований.
+    Поддерживает keyset-пагинацию (?after_id=&limit=) и проекцию (?fields=).
     Возвращает JSON-массив объектов с информацией о бронированиях.
     """
     try:
-        bookings = Booking.query.all()
-        return jsonify([booking.to_dict() for booking in bookings])
+        return paginated_list(Booking)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving bookings: {str(e)}", exc_info=True)
+        logger.error("Error retrieving bookings: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 def add_booking():
-    """Добавление нового бронирования"""
+    """
+    Добавление нового бронирования.
+    Синхронно выполняются только поиск или создание гостя и вставка брони; услуги
+    (services), ожидающий платеж (payment_method) и расписание уборки обрабатываются
+    фоновой задачей после commit (см. tasks.complete_booking).
+    """
     try:
         data = request.json
 
@@ -418,6 +647,29 @@ def add_booking():
         if not all(field in data for field in required_fields):
             return jsonify({"error": "Missing required fields"}), 400
 
+        # Услуги и способ оплаты проверяются до вставки, а записываются в фоне
+        services = data.get('services') or []
+        if not isinstance(services, list) or not all(
+            isinstance(item, dict)
+            and isinstance(item.get('service_id'), int) and isinstance(item.get('quantity'), int)
+            and item['quantity'] > 0
+            for item in services
+        ):
+            return jsonify({"error": "services must be a list of {service_id, quantity} with positive quantity"}), 400
+        method = data.get('payment_method')
+        if method is not None and method not in payment_method.enums:
+            return jsonify({"error": f"payment_method must be one of: {', '.join(payment_method.enums)}"}), 400
+
+        # Даты проверяются до обращения к БД: при check_out_date < check_in_date выражение
+        # daterange ограничения no_overlapping_bookings завершилось бы ошибкой, а не отказом
+        try:
+            check_in_date = datetime.strptime(data['check_in_date'], '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(data['check_out_date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        if check_out_date <= check_in_date:
+            return jsonify({"error": "check_out_date must be after check_in_date"}), 400
+
         # 2. Получение и валидация гостя
         guest_data = data['guest']
         if 'passport_number' not in guest_data:
@@ -447,23 +699,13 @@ def add_booking():
         if data['adults'] + data.get('children', 0) > room.capacity:
             return jsonify({"error": "Room capacity exceeded"}), 400
 
-        # 5. Проверка пересечений
-        existing_booking = Booking.query.filter(
-            Booking.room_id == data['room_id'],
-            Booking.check_in_date <= datetime.strptime(data['check_out_date'], '%Y-%m-%d').date(),
-            Booking.check_out_date >= datetime.strptime(data['check_in_date'], '%Y-%m-%d').date(),
-            Booking.status != 'cancelled'
-        ).first()
-
-        if existing_booking:
-            return jsonify({"error": "Room already booked for these dates"}), 400
-
-        # 6. Создание брони
+        # 5. Создание брони. Пересечения дат отсекает ограничение no_overlapping_bookings,
+        # поэтому отдельный SELECT не нужен и конкурентные запросы не могут забронировать номер дважды.
         new_booking = Booking(
             guest_id=guest.guest_id,
             room_id=data['room_id'],
-            check_in_date=datetime.strptime(data['check_in_date'], '%Y-%m-%d').date(),
-            check_out_date=datetime.strptime(data['check_out_date'], '%Y-%m-%d').date(),
+            check_in_date=check_in_date,
+            check_out_date=check_out_date,
             adults=data['adults'],
             children=data.get('children', 0),
             status='confirmed'
@@ -471,17 +713,26 @@ def add_booking():
 
         db.session.add(new_booking)
         room.status = 'occupied'
-        db.session.commit()
-
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if getattr(e.orig, 'pgcode', None) == errorcodes.EXCLUSION_VIOLATION:
+                metrics.booking_conflict()
+                return jsonify({"error": "Room already booked for these dates"}), 400
+            raise
+
+        task_queue.submit(complete_booking, new_booking.booking_id, services, method)
         return jsonify(new_booking.to_dict()), 201
 
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding booking: {str(e)}", exc_info=True)
+        logger.error("Error adding booking: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Маршруты для работы с услугами
-@app.route('/api/services', methods=['GET', 'POST'])
+@api.route('/api/services', methods=['GET', 'POST'])
+@conditional(('services',))
 def handle_services():
     """
     Обработчик маршрута для получения списка услуг (GET)
@@ -495,15 +746,30 @@ def handle_services():
 def get_services():
     """
     Получение списка активных услуг.
+    Поддерживает keyset-пагинацию (?after_id=&limit=) и проекцию (?fields=).
+    Полный каталог без проекции отдается из кэша.
     Возвращает JSON-массив объектов с информацией об услугах.
     """
     try:
-        services = Service.query.filter_by(is_active=True).all()
-        return jsonify([service.to_dict() for service in services])
+        if not request.args.get('fields') and not stream_format():
+            after_id, limit = parse_page_args(request.args)
+            services = cache.get_or_set('services', 'active', load_active_services)
+            services, next_cursor = paginate_items(services, 'service_id', after_id, limit)
+            return jsonify(services), 200, next_page_headers(next_cursor, limit)
+        return paginated_list(Service, Service.is_active.is_(True))
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving services: {str(e)}", exc_info=True)
+        logger.error("Error retrieving services: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+def load_active_services():
+    """
+    Активные услуги, отсортированные по service_id, в виде словарей для кэша.
+    """
+    services = Service.query.filter(Service.is_active.is_(True)).order_by(Service.service_id).all()
+    return [service.to_dict() for service in services]
+
 def add_service():
     """
     Добавление новой услуги в базу данных.
@@ -528,11 +794,11 @@ def add_service():
         return jsonify(new_service.to_dict()), 201
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding service: {str(e)}", exc_info=True)
+        logger.error("Error adding service: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Маршруты для работы с платежами
-@app.route('/api/payments', methods=['GET', 'POST'])
+@api.route('/api/payments', methods=['GET', 'POST'])
 def handle_payments():
     """
     Обработчик маршрута для получения списка платежей (GET)
@@ -545,14 +811,16 @@ def handle_payments():
 
 def get_payments():
     """
-    Получение списка всех платежей.
+    Получение списка платежей.
+    Поддерживает keyset-пагинацию (?after_id=&limit=) и проекцию (?fields=).
     Возвращает JSON-массив объектов с информацией о платежах.
     """
     try:
-        payments = Payment.query.all()
-        return jsonify([payment.to_dict() for payment in payments])
+        return paginated_list(Payment)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error retrieving payments: {str(e)}", exc_info=True)
+        logger.error("Error retrieving payments: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 def add_payment():
@@ -583,11 +851,139 @@ def add_payment():
         return jsonify(new_payment.to_dict()), 201
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding payment: {str(e)}", exc_info=True)
+        logger.error("Error adding payment: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+# Массовая загрузка
+@api.route('/api/<any(guests, rooms, bookings, payments):entity>/bulk', methods=['POST'])
+def handle_bulk(entity):
+    """
+    Массовая загрузка гостей, номеров, бронирований или платежей.
+    Тело — JSON-массив объектов, NDJSON (application/x-ndjson) или CSV с заголовком (text/csv).
+    Строки вставляются пачками, каждая пачка — одна транзакция; некорректные строки
+    пропускаются. Возвращает число вставленных строк и ошибки по номерам строк.
+    """
+    try:
+        result = bulk_insert(entity)
+        metrics.bulk_inserted(entity, result['inserted'])
+        return jsonify(result)
+    except BulkError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error in bulk load of %s: %s", entity, e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+# Аналитические отчеты (функции hotel.get_*, см. functions/analytics)
+@api.route('/api/analytics/occupancy', methods=['GET'])
+def get_occupancy():
+    """
+    Загрузка номеров по типам за период ?start_date=&end_date= (YYYY-MM-DD, end_date не входит).
+    По умолчанию — текущий месяц.
+    """
+    try:
+        today = date.today()
+        start = request.args.get('start_date')
+        end = request.args.get('end_date')
+        start_date = parse_date(start, 'start_date') if start else month_start(today)
+        end_date = parse_date(end, 'end_date') if end else month_start(start_date + timedelta(days=31))
+        return jsonify(occupancy_report(start_date, end_date))
+    except AnalyticsError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error retrieving occupancy report: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+@api.route('/api/analytics/revenue', methods=['GET'])
+def get_revenue():
+    """
+    Доходы по месяцам со сравнением с предыдущим годом.
+    Необязательные границы ?from=&to= (YYYY-MM, включительно).
+    """
+    try:
+        from_value = request.args.get('from')
+        to_value = request.args.get('to')
+        from_month = parse_month(from_value, 'from') if from_value else None
+        to_month = parse_month(to_value, 'to') if to_value else None
+        return jsonify(revenue_report(from_month, to_month))
+    except AnalyticsError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error retrieving revenue report: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+@api.route('/api/analytics/segments', methods=['GET'])
+def get_segments():
+    """
+    Сегментация гостей по убыванию расходов.
+    Необязательный фильтр ?segment= и ограничение ?limit= (первые N гостей).
+    """
+    try:
+        limit = request.args.get('limit')
+        if limit is not None and (not is_digits(limit) or int(limit) == 0):
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        return jsonify(guest_segments(request.args.get('segment'), int(limit) if limit else None))
+    except AnalyticsError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error retrieving guest segments: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+@api.route('/api/analytics/refresh', methods=['POST'])
+def refresh_analytics():
+    """
+    Полный пересчет агрегированных таблиц отчетов и сброс их кэша.
+    Нужен после изменения данных в обход приложения (psql, загрузка с отключенными триггерами).
+    С кэшем процесса (CACHE_BACKEND=memory) сбрасывается кэш только воркера, обработавшего
+    запрос: другие воркеры gunicorn обновят отчеты за закрытые периоды через ANALYTICS_CLOSED_TTL.
+    """
+    try:
+        refresh_rollups()
+        return jsonify({"message": "Analytics rollups refreshed"})
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error refreshing analytics rollups: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+# Служебные маршруты
+@api.route('/api/stats/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    Состояние пула соединений с БД текущего процесса: занятость, время ожидания
+    соединения и число отказов по таймауту.
+    """
+    return jsonify(pool_stats.snapshot(db.engine.pool))
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus: запросы по маршрутам, пул соединений,
+    кэш, бронирования и платежи. При нескольких воркерах gunicorn — сумма по всем воркерам.
+    """
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    body, content_type = metrics.render()
+    return body, 200, {'Content-Type': content_type}
+
+@api.route('/api/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Состояние кэша справочных данных текущего процесса: бэкенд, число записей,
+    попадания и промахи по пространствам имен.
+    """
+    return jsonify(cache.stats())
+
+@api.route('/api/stats/tasks', methods=['GET'])
+def get_task_stats():
+    """
+    Состояние фоновых задач текущего процесса: поставлено, выполнено, повторено,
+    завершилось ошибкой и ожидает выполнения.
+    """
+    return jsonify(task_queue.stats())
+
 # UI-маршрут для фронта (Qt) — список комнат
-@app.route('/ui/rooms', methods=['GET'])
+@api.route('/ui/rooms', methods=['GET'])
+@conditional(rooms_namespaces)
 def ui_get_rooms():
     """
     Контроллер для фронта: отдает отфильтрованный список комнат.
@@ -596,15 +992,9 @@ def ui_get_rooms():
     try:
         return get_rooms()
     except Exception as e:
-        logger.error(f"UI: Ошибка получения списка комнат: {str(e)}", exc_info=True)
+        logger.error("UI: Ошибка получения списка комнат: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
-# Регистрация обработчиков ошибок
-register_error_handlers(app)
-
-# Создание таблиц при запуске
-with app.app_context():
-    db.create_all()
-
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Встроенный сервер Werkzeug — только для разработки; в продакшене используется gunicorn (см. gunicorn.conf.py)
+    create_app().run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG') == '1')
\ No newline at end of file
@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+import time
+
+from flask import appcontext_tearing_down, g, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.cache import cache
+from app.db_pool import pool_stats
+from app.models import db, Booking, Payment
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client нужен только для /metrics (METRICS_ENABLED=1)
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    Метрики Prometheus: запросы по маршрутам (счетчик, гистограмма задержек, выполняющиеся),
+    пул соединений с БД, кэш и бизнес-счетчики бронирований и платежей.
+
+    При нескольких воркерах gunicorn значения хранятся в файлах каталога
+    PROMETHEUS_MULTIPROC_DIR (режим multiprocess prometheus_client) и суммируются при чтении
+    /metrics любым воркером. Счетчики пула и кэша процесс ведет сам (db_pool.pool_stats,
+    cache.stats); в метрики они переносятся не чаще раза в METRICS_SYNC_INTERVAL секунд,
+    поэтому на каждый запрос приходится только несколько инкрементов. Перенос выполняется
+    после завершения контекста приложения, когда сессия уже вернула соединение в пул:
+    иначе занятые соединения учитывали бы соединение самого запроса.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sync_interval = None
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._synced = {}  # Значения счетчиков процесса на момент последнего переноса
+        self._children = {}  # (метрика, метки) -> дочерняя метрика
+
+    def init_app(self, app):
+        """
+        Создает метрики и регистрирует обработчики запроса и событий сессии (METRICS_ENABLED=1).
+        """
+        self.enabled = os.getenv('METRICS_ENABLED', '1') == '1'
+        self.sync_interval = float(os.getenv('METRICS_SYNC_INTERVAL', '5'))
+        if self.enabled and prometheus_client is None:
+            logger.warning("prometheus_client is not installed, /metrics is disabled")
+            self.enabled = False
+        if not self.enabled:
+            return
+        if not hasattr(self, 'requests'):
+            self._create()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        appcontext_tearing_down.connect(self._on_appcontext_teardown, app)
+        if not event.contains(Session, 'after_flush', _collect_business_events):
+            event.listen(Session, 'after_flush', _collect_business_events)
+            event.listen(Session, 'after_commit', _apply_business_events)
+            event.listen(Session, 'after_soft_rollback', _discard_business_events)
+
+    def _create(self):
+        labels = ('method', 'route')
+        self.requests = prometheus_client.Counter(
+            'hotel_http_requests_total', 'HTTP requests', labels + ('status',)
+        )
+        self.latency = prometheus_client.Histogram(
+            'hotel_http_request_duration_seconds', 'HTTP request latency', labels, buckets=LATENCY_BUCKETS
+        )
+        self.in_progress = prometheus_client.Gauge(
+            'hotel_http_requests_in_progress', 'HTTP requests being served', labels, multiprocess_mode='livesum'
+        )
+        self.pool_checked_out = prometheus_client.Gauge(
+            'hotel_db_pool_checked_out', 'Connections checked out of the pool', multiprocess_mode='livesum'
+        )
+        self.pool_overflow = prometheus_client.Gauge(
+            'hotel_db_pool_overflow', 'Overflow connections above pool_size', multiprocess_mode='livesum'
+        )
+        self.pool_checkouts = prometheus_client.Counter('hotel_db_pool_checkouts_total', 'Connection checkouts')
+        self.pool_timeouts = prometheus_client.Counter(
+            'hotel_db_pool_checkout_timeouts_total', 'Connection checkout timeouts'
+        )
+        self.pool_wait = prometheus_client.Counter(
+            'hotel_db_pool_checkout_wait_seconds_total', 'Time spent waiting for a connection'
+        )
+        self.cache_requests = prometheus_client.Counter(
+            'hotel_cache_requests_total', 'Cache lookups by namespace and result (hit, miss)', ('namespace', 'result')
+        )
+        self.bookings_created = prometheus_client.Counter('hotel_bookings_created_total', 'Bookings created')
+        self.booking_conflicts = prometheus_client.Counter(
+            'hotel_booking_conflicts_total', 'Bookings rejected because the room is already booked'
+        )
+        self.booking_status = prometheus_client.Counter(
+            'hotel_booking_status_changes_total', 'Bookings entering a status (ORM writes)', ('status',)
+        )
+        self.payments_created = prometheus_client.Counter('hotel_payments_created_total', 'Payments created')
+        self.payment_status = prometheus_client.Counter(
+            'hotel_payment_status_changes_total', 'Payments entering a status (ORM writes)', ('status',)
+        )
+
+    # --- Запросы ---
+
+    def _child(self, metric, *labels):
+        """
+        Метрика с заданными метками. Дочерние метрики запоминаются: labels() проверяет
+        метки и берет блокировку на каждый вызов. Маршруты — шаблоны правил, поэтому
+        словарь не растет без ограничения.
+        """
+        key = (metric, labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*labels)
+        return child
+
+    def _start(self):
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.metrics_route = route
+        g.metrics_started = time.perf_counter()
+        self._child(self.in_progress, request.method, route).inc()
+
+    def _finish(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = g.metrics_route
+            self._child(self.requests, request.method, route, response.status_code).inc()
+            self._child(self.latency, request.method, route).observe(time.perf_counter() - started)
+        return response
+
+    def _teardown(self, error=None):
+        route = g.pop('metrics_route', None)
+        if route is not None:
+            self._child(self.in_progress, request.method, route).dec()
+
+    # --- Пул соединений и кэш ---
+
+    def _on_appcontext_teardown(self, sender, **kwargs):
+        # Сигнал отправляется после teardown_appcontext, в том числе после db.session.remove()
+        self._maybe_sync()
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = now
+            self._sync()
+        except Exception as e:
+            logger.warning("Metrics sync failed: %s", e)
+        finally:
+            self._lock.release()
+
+    def _delta(self, name, value):
+        previous = self._synced.get(name, 0)
+        self._synced[name] = value
+        return value - previous
+
+    def _sync(self):
+        """
+        Переносит накопленные с прошлого раза значения счетчиков процесса в метрики.
+        """
+        pool = db.engine.pool
+        self.pool_checked_out.set(pool.checkedout())
+        self.pool_overflow.set(max(pool.overflow(), 0))
+        self.pool_checkouts.inc(self._delta('pool_checkouts', pool_stats.checkouts))
+        self.pool_timeouts.inc(self._delta('pool_timeouts', pool_stats.timeouts))
+        self.pool_wait.inc(self._delta('pool_wait', pool_stats.wait_total))
+        for namespace, counts in cache.stats()['namespaces'].items():
+            for result, name in (('hit', 'hits'), ('miss', 'misses')):
+                delta = self._delta(f'cache:{namespace}:{result}', counts[name])
+                if delta:
+                    self.cache_requests.labels(namespace, result).inc(delta)
+
+    # --- Бизнес-счетчики ---
+
+    def booking_conflict(self):
+        if self.enabled:
+            self.booking_conflicts.inc()
+
+    def bulk_inserted(self, entity, count):
+        """
+        Строки, вставленные массовой загрузкой (Core insert, в обход событий сессии).
+        """
+        if not self.enabled or not count:
+            return
+        if entity == 'bookings':
+            self.bookings_created.inc(count)
+        elif entity == 'payments':
+            self.payments_created.inc(count)
+
+    def render(self):
+        """
+        Текст метрик для /metrics и его Content-Type.
+        """
+        with self._lock:
+            self._last_sync = time.monotonic()
+            self._sync()
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+metrics = Metrics()
+
+
+def _status_change(obj, is_new):
+    """
+    Новый статус брони или платежа, если он задан при создании или изменен.
+    """
+    if is_new or inspect(obj).attrs.status.history.has_changes():
+        return obj.status
+    return None
+
+
+def _collect_business_events(session, flush_context):
+    """
+    После flush запоминает созданные брони и платежи и смены их статусов;
+    счетчики увеличиваются только после успешного commit.
+    """
+    events = session.info.setdefault('metrics_events', [])
+    for obj in session.new | session.dirty:
+        if isinstance(obj, (Booking, Payment)):
+            is_new = obj in session.new
+            status = _status_change(obj, is_new)
+            if is_new or status is not None:
+                events.append((type(obj), is_new, status))
+
+
+def _apply_business_events(session):
+    for model, is_new, status in session.info.pop('metrics_events', ()):
+        if model is Booking:
+            if is_new:
+                metrics.bookings_created.inc()
+            if status is not None:
+                metrics.booking_status.labels(status).inc()
+        else:
+            if is_new:
+                metrics.payments_created.inc()
+            if status is not None:
+                metrics.payment_status.labels(status).inc()
+
+
+def _discard_business_events(session, previous_transaction):
+    session.info.pop('metrics_events', None)
@@ -1,6 +1,9 @@
+import os  # Для пути к SQL-скриптам hotel_management_db
 from app import db  # Импортируем объект базы данных из приложения
 from datetime import datetime  # Для работы с датами и временем
-from sqlalchemy.dialects.postgresql import ENUM  # Для создания пользовательских типов ENUM в PostgreSQL
+from sqlalchemy import DDL, event  # Для DDL, выполняемого при создании таблиц
+from sqlalchemy.dialects.postgresql import ENUM, ExcludeConstraint  # Типы ENUM и ограничения-исключения PostgreSQL
+from sqlalchemy.orm import joinedload  # Для загрузки связей вместе с основным запросом
 
 # Создаем пользовательские типы ENUM для PostgreSQL
 # Эти типы используются для ограничения значений полей в таблицах базы данных
@@ -10,6 +13,14 @@ booking_status = ENUM('confirmed', 'checked_in', 'checked_out', 'cancelled', nam
 payment_method = ENUM('cash', 'credit_card', 'bank_transfer', 'online', name='payment_method', create_type=True)
 payment_status = ENUM('pending', 'completed', 'failed', 'refunded', name='payment_status', create_type=True)
 
+def to_dict_options(model):
+    """
+    Опции загрузки связей, перечисленных в model.to_dict_relationships.
+    Все они "многие-к-одному", поэтому подгружаются через JOIN в том же запросе,
+    и сериализация списка не порождает N+1 запросов.
+    """
+    return [joinedload(getattr(model, name)) for name in getattr(model, 'to_dict_relationships', ())]
+
 class Guest(db.Model):
     """
     Модель для хранения информации о гостях.
@@ -47,13 +58,37 @@ class Guest(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+# Поиск гостей (app/search.py): расширение pg_trgm, функция строки поиска и индексы по ней.
+# То же, что indexes/02_guest_search_indexes.sql, для базы, созданной через create_all
+event.listen(Guest.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public'))
+event.listen(Guest.__table__, 'before_create', DDL("""
+    CREATE OR REPLACE FUNCTION hotel.guest_search_text(
+        p_first_name VARCHAR, p_last_name VARCHAR, p_passport_number VARCHAR, p_phone VARCHAR, p_email VARCHAR
+    ) RETURNS TEXT AS $$
+        SELECT lower(p_last_name || ' ' || p_first_name || ' ' || p_passport_number) || ' '
+            || regexp_replace(p_phone, '[^0-9]', '', 'g') || ' '
+            || coalesce(lower(p_email), '');
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+"""))
+event.listen(Guest.__table__, 'after_create', DDL(
+    'CREATE INDEX IF NOT EXISTS idx_guests_search_trgm ON hotel.guests USING gin '
+    '(hotel.guest_search_text(first_name, last_name, passport_number, phone, email) public.gin_trgm_ops)'
+))
+event.listen(Guest.__table__, 'after_create', DDL(
+    'CREATE INDEX IF NOT EXISTS idx_guests_last_name_prefix ON hotel.guests (lower(last_name) text_pattern_ops, guest_id)'
+))
+
 class Room(db.Model):
     """
     Модель для хранения информации о номерах.
     Таблица: rooms (схема hotel).
     """
     __tablename__ = 'rooms'
-    __table_args__ = {'schema': 'hotel'}
+    __table_args__ = (
+        # Индексы — как в indexes/01_create_indexes.sql (для базы, созданной через create_all)
+        db.Index('idx_rooms_status', 'status'),
+        {'schema': 'hotel'}
+    )
     
     room_id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
     room_number = db.Column(db.String(10), nullable=False, unique=True)  # Номер комнаты
@@ -88,7 +123,6 @@ class Booking(db.Model):
     Таблица: bookings (схема hotel).
     """
     __tablename__ = 'bookings'
-    __table_args__ = {'schema': 'hotel'}
     
     booking_id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
     guest_id = db.Column(db.Integer, db.ForeignKey('hotel.guests.guest_id'), nullable=False)  # Внешний ключ на guests
@@ -100,10 +134,35 @@ class Booking(db.Model):
     children = db.Column(db.SmallInteger, nullable=False, default=0)  # Количество детей
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow)  # Дата создания бронирования
     
+    __table_args__ = (
+        # Неотмененные бронирования одного номера не могут пересекаться по датам
+        # (границы включительно). Нарушение — ошибка 23P01 (exclusion_violation).
+        ExcludeConstraint(
+            (room_id, '='),
+            (db.func.daterange(check_in_date, check_out_date, '[]'), '&&'),
+            name='no_overlapping_bookings',
+            using='gist',
+            where=db.text("status <> 'cancelled'")
+        ),
+        # Неотмененные брони, пересекающие период, без условия на номер
+        db.Index(
+            'idx_bookings_period',
+            db.func.daterange(check_in_date, check_out_date, '[]'),
+            postgresql_using='gist',
+            postgresql_where=db.text("status <> 'cancelled'")
+        ),
+        db.Index('idx_bookings_room_dates', room_id, check_in_date),
+        db.Index('idx_bookings_guest', guest_id),
+        {'schema': 'hotel'}
+    )
+    
     # Связи с таблицами booking_services и payments
     services = db.relationship('BookingService', backref='booking', lazy=True)
     payments = db.relationship('Payment', backref='booking', lazy=True)
     
+    # Связи, которые читает to_dict: списочные запросы загружают их заранее (см. to_dict_options)
+    to_dict_relationships = ('guest', 'room')
+    
     def to_dict(self):
         """
         Преобразует объект Booking в словарь для сериализации в JSON.
@@ -122,6 +181,9 @@ class Booking(db.Model):
             'room_number': self.room.room_number if self.room else None
         }
 
+# Для ограничения no_overlapping_bookings нужно расширение btree_gist
+event.listen(Booking.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS btree_gist WITH SCHEMA public'))
+
 class Service(db.Model):
     """
     Модель для хранения информации об услугах.
@@ -157,7 +219,11 @@ class BookingService(db.Model):
     Таблица: booking_services (схема hotel).
     """
     __tablename__ = 'booking_services'
-    __table_args__ = {'schema': 'hotel'}
+    __table_args__ = (
+        db.Index('idx_booking_services_date', 'service_date', 'booking_service_id'),
+        db.Index('idx_booking_services_booking', 'booking_id'),
+        {'schema': 'hotel'}
+    )
     
     booking_service_id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
     booking_id = db.Column(db.Integer, db.ForeignKey('hotel.bookings.booking_id'), nullable=False)  # Внешний ключ на bookings
@@ -166,6 +232,8 @@ class BookingService(db.Model):
     service_date = db.Column(db.Date, default=datetime.utcnow().date())  # Дата оказания услуги
     notes = db.Column(db.Text)  # Примечания (необязательно)
     
+    to_dict_relationships = ('service',)
+    
     def to_dict(self):
         """
         Преобразует объект BookingService в словарь для сериализации в JSON.
@@ -187,7 +255,11 @@ class Payment(db.Model):
     Таблица: payments (схема hotel).
     """
     __tablename__ = 'payments'
-    __table_args__ = {'schema': 'hotel'}
+    __table_args__ = (
+        db.Index('idx_payments_booking', 'booking_id'),
+        db.Index('idx_payments_status_date', 'status', 'transaction_date'),
+        {'schema': 'hotel'}
+    )
     
     payment_id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
     booking_id = db.Column(db.Integer, db.ForeignKey('hotel.bookings.booking_id'), nullable=False)  # Внешний ключ на bookings
@@ -224,6 +296,8 @@ class CleaningSchedule(db.Model):
     next_cleaning_date = db.Column(db.Date)  # Дата следующей уборки
     room_id = db.Column(db.Integer, db.ForeignKey('hotel.rooms.room_id'), unique=True, nullable=False)  # Внешний ключ на rooms
     
+    to_dict_relationships = ('room',)
+    
     def to_dict(self):
         """
         Преобразует объект CleaningSchedule в словарь для сериализации в JSON.
@@ -234,4 +308,105 @@ class CleaningSchedule(db.Model):
             'next_cleaning_date': self.next_cleaning_date.isoformat() if self.next_cleaning_date else None,
             'room_id': self.room_id,
             'room_number': self.room.room_number if self.room else None
-        }
\ No newline at end of file
+        }
+
+# Агрегаты для аналитики (schema/04_analytics_rollups.sql). Приложение читает их только через
+# SQL-функции get_occupancy_rate, get_revenue_report и get_guest_segmentation; модели нужны,
+# чтобы create_all создавал таблицы в базе, развернутой без full_deploy.sql.
+
+class OccupancyDaily(db.Model):
+    """
+    Количество занятых номеро-ночей каждого типа номера за каждый день.
+    Таблица: occupancy_daily (схема hotel).
+    """
+    __tablename__ = 'occupancy_daily'
+    __table_args__ = {'schema': 'hotel'}
+    
+    day = db.Column(db.Date, primary_key=True)  # Дата ночи
+    room_type = db.Column(room_type, primary_key=True)  # Тип номера
+    room_nights = db.Column(db.Integer, nullable=False, server_default='0')  # Занятые номера этого типа
+
+class OccupancyChange(db.Model):
+    """
+    Журнал изменений занятости, еще не перенесенных в occupancy_daily (fold_occupancy_changes).
+    Таблица: occupancy_changes (схема hotel).
+    """
+    __tablename__ = 'occupancy_changes'
+    __table_args__ = {'schema': 'hotel'}
+    
+    change_id = db.Column(db.BigInteger, primary_key=True)  # Первичный ключ
+    room_type = db.Column(room_type, nullable=False)  # Тип номера
+    check_in_date = db.Column(db.Date, nullable=False)  # Первая ночь
+    check_out_date = db.Column(db.Date, nullable=False)  # День выезда (ночь не входит)
+    delta = db.Column(db.SmallInteger, nullable=False)  # +1 — ночи заняты, -1 — освобождены
+
+class RevenueMonthly(db.Model):
+    """
+    Суммы завершенных платежей по месяцу транзакции.
+    Таблица: revenue_monthly (схема hotel).
+    """
+    __tablename__ = 'revenue_monthly'
+    __table_args__ = {'schema': 'hotel'}
+    
+    month = db.Column(db.Date, primary_key=True)  # Первый день месяца
+    room_revenue = db.Column(db.Numeric(14, 2), nullable=False, server_default='0')  # Доход от проживания
+    service_revenue = db.Column(db.Numeric(14, 2), nullable=False, server_default='0')  # Доход от услуг
+    total_revenue = db.Column(db.Numeric(14, 2), nullable=False, server_default='0')  # Общий доход
+    payments_count = db.Column(db.Integer, nullable=False, server_default='0')  # Завершенные платежи
+
+class GuestStats(db.Model):
+    """
+    Показатели гостя по завершенным бронированиям.
+    Таблица: guest_stats (схема hotel).
+    """
+    __tablename__ = 'guest_stats'
+    __table_args__ = {'schema': 'hotel'}
+    
+    guest_id = db.Column(db.Integer, db.ForeignKey('hotel.guests.guest_id', ondelete='CASCADE'), primary_key=True)
+    total_bookings = db.Column(db.Integer, nullable=False, server_default='0')  # Завершенные бронирования
+    total_nights = db.Column(db.Integer, nullable=False, server_default='0')  # Ночи по ним
+    total_spending = db.Column(db.Numeric(12, 2), nullable=False, server_default='0')  # Завершенные платежи по ним
+    last_visit = db.Column(db.Date)  # Последняя дата выезда
+
+# Функции и триггеры, поддерживающие агрегаты, и аналитические функции, которые их читают
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hotel_management_db')
+ROLLUP_SCRIPTS = (
+    'triggers/03_analytics_rollup_functions.sql',
+    'triggers/04_analytics_rollup_triggers.sql',
+    'functions/analytics/01_get_occupancy_rate.sql',
+    'functions/analytics/02_get_revenue_report.sql',
+    'functions/analytics/03_get_guest_segmentation.sql',
+)
+ROLLUP_TABLES = {OccupancyDaily.__table__, OccupancyChange.__table__, RevenueMonthly.__table__, GuestStats.__table__}
+
+def create_analytics_rollups(target, connection, tables=(), **kw):
+    """
+    После create_all: если создана хотя бы одна таблица агрегатов, (пере)создает функции
+    и триггеры из hotel_management_db и заполняет агрегаты по существующим данным
+    (то же, что schema/upgrade_02_analytics_rollups.sql).
+    """
+    if not ROLLUP_TABLES.intersection(tables):
+        return
+    connection.exec_driver_sql(
+        'DROP TRIGGER IF EXISTS bookings_rollup ON hotel.bookings; '
+        'DROP TRIGGER IF EXISTS payments_rollup ON hotel.payments; '
+        'DROP TRIGGER IF EXISTS rooms_rollup ON hotel.rooms'
+    )
+    # Курсор DBAPI без параметров: знаки % в тексте функций не считаются подстановками
+    cursor = connection.connection.cursor()
+    for script in ROLLUP_SCRIPTS:
+        with open(os.path.join(SQL_DIR, script), encoding='utf-8') as file:
+            cursor.execute(file.read())
+    cursor.close()
+    connection.exec_driver_sql('SELECT hotel.refresh_analytics_rollups()')
+
+def set_search_path(target, connection, **kw):
+    """
+    Перед create_all: типы ENUM без схемы ищутся и создаются в hotel, как в full_deploy.sql
+    (иначе таблицы агрегатов в такой базе получили бы новый тип public.room_type).
+    Действует до конца транзакции create_all; выполняется раньше создания типов (insert=True).
+    """
+    connection.exec_driver_sql('SET LOCAL search_path TO hotel, public')
+
+event.listen(db.metadata, 'before_create', set_search_path, insert=True)
+event.listen(db.metadata, 'after_create', create_analytics_rollups)
@@ -0,0 +1,159 @@
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from flask import jsonify, request
+
+from app.models import db, to_dict_options
+from app.profiling import timed
+from app.streaming import stream_format, stream_query
+
+# Размер страницы по умолчанию (если передан только after_id) и максимальный размер страницы
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+
+
+class PaginationError(ValueError):
+    """
+    Некорректные параметры пагинации или проекции (after_id, limit, fields).
+    """
+
+
+def serialize_value(value):
+    """
+    Приводит значение столбца к JSON-совместимому виду так же, как методы to_dict.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def is_digits(value):
+    """
+    Состоит ли строка только из цифр 0-9. str.isdigit() принимает и другие цифры
+    Юникода (например, '²'), на которых int() падает с ValueError.
+    """
+    return value.isascii() and value.isdigit()
+
+
+def parse_page_args(args):
+    """
+    Читает параметры ?after_id=&limit=.
+    Без параметров возвращает (None, None) — весь список, как раньше.
+    """
+    after_id = args.get('after_id')
+    limit = args.get('limit')
+    if after_id is not None:
+        if not is_digits(after_id):
+            raise PaginationError("after_id must be a non-negative integer")
+        after_id = int(after_id)
+    if limit is not None:
+        if not is_digits(limit) or int(limit) == 0:
+            raise PaginationError("limit must be a positive integer")
+        limit = min(int(limit), MAX_PAGE_SIZE)
+    elif after_id is not None:
+        limit = DEFAULT_PAGE_SIZE
+    return after_id, limit
+
+
+def parse_fields(args, model):
+    """
+    Читает параметр ?fields=a,b,c и проверяет, что это столбцы таблицы модели.
+    Возвращает список имен столбцов или None, если проекция не запрошена.
+    """
+    fields = args.get('fields')
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in model.__table__.columns]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def paginate(query, pk_column, after_id, limit, cursor=None):
+    """
+    Keyset-пагинация: сортировка по первичному ключу и условие pk > after_id.
+    Возвращает (rows, next_cursor); next_cursor равен None на последней странице.
+    cursor — функция, извлекающая значение ключа из строки результата.
+    """
+    query = query.order_by(pk_column)
+    if after_id is not None:
+        query = query.filter(pk_column > after_id)
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()  # Лишняя строка показывает, есть ли следующая страница
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    cursor = cursor or (lambda row: getattr(row, pk_column.key))
+    return rows, cursor(rows[-1])
+
+
+def paginate_items(items, key, after_id, limit):
+    """
+    Та же keyset-пагинация для уже загруженного списка словарей,
+    отсортированного по ключу key (например, из кэша).
+    """
+    if after_id is not None:
+        items = [item for item in items if item[key] > after_id]
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, items[-1][key]
+
+
+def next_page_headers(next_cursor, limit):
+    """
+    Заголовки Link (rel="next") и X-Next-Cursor для следующей страницы.
+    """
+    if next_cursor is None:
+        return {}
+    args = request.args.to_dict()
+    args['after_id'] = next_cursor
+    args['limit'] = limit
+    return {
+        'Link': f'<{request.base_url}?{urlencode(args)}>; rel="next"',
+        'X-Next-Cursor': str(next_cursor)
+    }
+
+
+def paginated_list(model, *filters):
+    """
+    Общий обработчик GET для списочных маршрутов: keyset-пагинация (?after_id=&limit=)
+    и проекция (?fields=). С проекцией выбираются только запрошенные столбцы,
+    без неё строки сериализуются через to_dict, а нужные ему связи загружаются тем же запросом.
+    Метаданные следующей страницы передаются в заголовках, тело остается JSON-массивом.
+    Если запрошен потоковый ответ (см. streaming.stream_format), строки отдаются по мере чтения.
+    """
+    after_id, limit = parse_page_args(request.args)
+    fields = parse_fields(request.args, model)
+    fmt = stream_format()
+    pk_column = model.__mapper__.primary_key[0]
+    if fields:
+        columns = [model.__table__.columns[name] for name in fields]
+        if pk_column.key not in fields:
+            columns.append(pk_column)  # Ключ нужен для курсора, в ответ он не попадает
+        query = db.session.query(*columns).filter(*filters)
+
+        def serialize(row):
+            return {name: serialize_value(getattr(row, name)) for name in fields}
+    else:
+        query = model.query.options(*to_dict_options(model)).filter(*filters)
+
+        def serialize(row):
+            return row.to_dict()
+    if fmt:
+        query = query.order_by(pk_column)
+        if after_id is not None:
+            query = query.filter(pk_column > after_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return stream_query(query, serialize, fmt)
+    rows, next_cursor = paginate(query, pk_column, after_id, limit)
+    with timed('to_dict'):
+        items = [serialize(row) for row in rows]
+    return jsonify(items), 200, next_page_headers(next_cursor, limit)
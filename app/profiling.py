@@ -0,0 +1,183 @@
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Профиль текущего запроса хранится в потоке: события курсора SQLAlchemy приходят
+# в том же потоке, что и запрос. Фоновые задачи (tasks.py) профиля не имеют и не учитываются
+_local = threading.local()
+
+
+class RequestProfile:
+    """
+    Замеры одного запроса: число SQL-запросов, время в БД (выполнение курсора,
+    включая передачу строк) и время именованных участков (serialize — JSON, to_dict и т. п.).
+    """
+
+    __slots__ = ('statements', 'db_time', 'sections')
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.sections = {}
+
+    def add(self, name, seconds):
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        """
+        Значение заголовка Server-Timing (миллисекунды). app — время запроса
+        за вычетом БД и именованных участков: гидратация ORM, логика маршрута.
+        """
+        metrics = [f'db;dur={self.db_time * 1000:.2f};desc="{self.statements} queries"']
+        for name, seconds in self.sections.items():
+            metrics.append(f'{name};dur={seconds * 1000:.2f}')
+        rest = total - self.db_time - sum(self.sections.values())
+        metrics.append(f'app;dur={max(rest, 0.0) * 1000:.2f}')
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def current_profile():
+    """
+    Профиль текущего запроса или None (профилирование выключено, запрос не попал в выборку,
+    вызов вне запроса).
+    """
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def timed(name):
+    """
+    Замеряет участок кода запроса под именем name (отдельная метрика Server-Timing).
+    Вне профилируемого запроса ничего не делает.
+    """
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    JSON-провайдер Flask, замеряющий сериализацию (jsonify, потоковые ответы) как serialize.
+    """
+
+    def dumps(self, obj, **kwargs):
+        profile = current_profile()
+        if profile is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            profile.add('serialize', time.perf_counter() - started)
+
+
+def _format_parameters(parameters, limit):
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'profile', None) is not None:
+        conn.info['profiling_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_local, 'profile', None)
+    started = conn.info.pop('profiling_started', None)
+    if profile is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile.statements += 1
+    profile.db_time += elapsed
+    if elapsed * 1000 >= profiler.slow_query_ms:
+        logger.warning(
+            "Slow query %.1f ms in %s %s: %s parameters=%s", elapsed * 1000, request.method, request.path,
+            statement, _format_parameters(parameters, profiler.parameters_limit)
+        )
+
+
+class Profiler:
+    """
+    Профилирование запросов: число SQL-запросов, время в БД, сериализации и общее время
+    в заголовке Server-Timing, журнал медленных запросов к БД и медленных HTTP-запросов.
+    Подробные замеры делаются только для доли запросов PROFILING_SAMPLE_RATE; для остальных
+    замеряется лишь общее время (медленные запросы журналируются без разбивки).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.server_timing = True
+        self.slow_query_ms = None
+        self.slow_request_ms = None
+        self.parameters_limit = None
+
+    def init_app(self, app):
+        """
+        Читает настройки PROFILING_* и подключает обработчики запроса и событий курсора.
+        """
+        self.enabled = os.getenv('PROFILING_ENABLED', '1') == '1'
+        self.sample_rate = float(os.getenv('PROFILING_SAMPLE_RATE', '1.0'))
+        self.server_timing = os.getenv('PROFILING_SERVER_TIMING', '1') == '1'
+        self.slow_query_ms = float(os.getenv('PROFILING_SLOW_QUERY_MS', '100'))
+        self.slow_request_ms = float(os.getenv('PROFILING_SLOW_REQUEST_MS', '500'))
+        self.parameters_limit = int(os.getenv('PROFILING_PARAMETERS_LIMIT', '500'))  # Символов в журнале
+        if not self.enabled:
+            return
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._clear)
+
+    def _start(self):
+        _local.started = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        _local.profile = RequestProfile() if sampled else None
+
+    def _finish(self, response):
+        started = getattr(_local, 'started', None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        profile = _local.profile
+        if profile is not None and self.server_timing:
+            response.headers['Server-Timing'] = profile.server_timing(total)
+        if total * 1000 >= self.slow_request_ms:
+            if profile is not None:
+                parts = [f"{profile.statements} statements", f"db {profile.db_time * 1000:.1f} ms"]
+                parts.extend(f"{name} {seconds * 1000:.1f} ms" for name, seconds in profile.sections.items())
+                details = ', '.join(parts)
+            else:
+                details = "not sampled"
+            logger.warning(
+                "Slow request %s %s -> %s: %.1f ms (%s)", request.method, request.full_path,
+                response.status_code, total * 1000, details
+            )
+        return response
+
+    def _clear(self, error=None):
+        _local.started = None
+        _local.profile = None
+
+
+profiler = Profiler()
@@ -0,0 +1,121 @@
+import os
+import re
+
+from sqlalchemy import case, func
+
+from app.models import Guest
+from app.pagination import is_digits
+
+# Размер страницы поиска по умолчанию и максимальный; глубина пролистывания ограничена,
+# так как ранжированные результаты листаются смещением
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '100'))
+SEARCH_MAX_OFFSET = int(os.getenv('SEARCH_MAX_OFFSET', '1000'))
+
+# Запрос, все токены которого короче этого, ищется по началу фамилии: по 1-2 символам
+# триграммы не строятся, и индекс idx_guests_search_trgm такое условие не обслуживает
+TRIGRAM_MIN_LENGTH = 3
+
+SORTS = ('relevance', 'name', 'created')
+
+# Токен из цифр и знаков телефона (+7 (912) 123-45-67) сравнивается только цифрами,
+# как телефон в строке поиска
+PHONE_TOKEN_RE = re.compile(r'^[\d+()\-]+$')
+# Все, что не может встретиться в строке поиска, из токена удаляется
+TOKEN_STRIP_RE = re.compile(r'[^\w@.\-]')
+
+
+class SearchError(ValueError):
+    """
+    Некорректные параметры поиска (пустой запрос, сортировка, страница).
+    """
+
+
+def guest_search_text():
+    """
+    Строка поиска гостя — то же выражение, что и в индексе idx_guests_search_trgm.
+    """
+    return func.hotel.guest_search_text(
+        Guest.first_name, Guest.last_name, Guest.passport_number, Guest.phone, Guest.email
+    )
+
+
+def normalize_tokens(query):
+    tokens = []
+    for token in query.lower().split():
+        if PHONE_TOKEN_RE.match(token):
+            token = re.sub(r'\D', '', token)
+        else:
+            token = TOKEN_STRIP_RE.sub('', token)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_search_args(args):
+    """
+    Читает ?q=&sort=&limit=&offset=. Возвращает (токены, сортировка, limit, offset).
+    """
+    tokens = normalize_tokens(args.get('q', ''))
+    if not tokens:
+        raise SearchError("q must contain letters or digits")
+    sort = args.get('sort', 'relevance')
+    if sort not in SORTS:
+        raise SearchError(f"sort must be one of: {', '.join(SORTS)}")
+    limit = args.get('limit', str(SEARCH_PAGE_SIZE))
+    offset = args.get('offset', '0')
+    if not is_digits(limit) or int(limit) == 0:
+        raise SearchError("limit must be a positive integer")
+    if not is_digits(offset) or int(offset) > SEARCH_MAX_OFFSET:
+        raise SearchError(f"offset must be an integer between 0 and {SEARCH_MAX_OFFSET}")
+    return tokens, sort, min(int(limit), SEARCH_MAX_PAGE_SIZE), int(offset)
+
+
+def search_guests(tokens, sort, limit, offset):
+    """
+    Поиск гостей по фамилии, имени, номеру паспорта, телефону и email.
+    Каждый токен запроса должен встречаться в строке поиска гостя (поиск по подстроке,
+    поэтому работает и ввод с начала слова). Если все токены короткие, первый ищется
+    по началу фамилии, остальные проверяются в найденных строках. Релевантность: точное
+    совпадение паспорта, затем совпадение начала фамилии, затем триграммное сходство
+    (word_similarity).
+    Возвращает (гости, смещение следующей страницы или None).
+    """
+    text = ' '.join(tokens)
+    last_name = func.lower(Guest.last_name)
+    query = Guest.query
+    if all(len(token) < TRIGRAM_MIN_LENGTH for token in tokens):
+        # Поиск по индексу idx_guests_last_name_prefix, результаты уже в порядке фамилии.
+        # Остальные короткие токены — фильтр по найденным строкам, а не условие для всей таблицы
+        query = query.filter(last_name.like(escape_like(tokens[0]) + '%', escape='\\'))
+        search_text = guest_search_text()
+        for token in tokens[1:]:
+            query = query.filter(search_text.like('%' + escape_like(token) + '%', escape='\\'))
+        order = [last_name, Guest.guest_id] if sort != 'created' else [Guest.created_at.desc(), Guest.guest_id]
+    else:
+        search_text = guest_search_text()
+        for token in tokens:
+            query = query.filter(search_text.like('%' + escape_like(token) + '%', escape='\\'))
+        if sort == 'name':
+            order = [last_name, func.lower(Guest.first_name), Guest.guest_id]
+        elif sort == 'created':
+            order = [Guest.created_at.desc(), Guest.guest_id]
+        else:
+            order = [
+                case(
+                    (Guest.passport_number == text.upper(), 0),
+                    (last_name.like(escape_like(tokens[0]) + '%', escape='\\'), 1),
+                    else_=2
+                ),
+                func.word_similarity(text, search_text).desc(),
+                Guest.guest_id
+            ]
+    guests = query.order_by(*order).offset(offset).limit(limit + 1).all()
+    if len(guests) <= limit:
+        return guests, None
+    next_offset = offset + limit
+    return guests[:limit], next_offset if next_offset <= SEARCH_MAX_OFFSET else None
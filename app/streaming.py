@@ -0,0 +1,60 @@
+import logging
+import os
+
+from flask import Response, current_app, request, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк за раз забирается из серверного курсора
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '1000'))
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def stream_format():
+    """
+    Определяет, запрошен ли потоковый ответ и в каком формате.
+    ?format=ndjson или Accept: application/x-ndjson — по одному JSON-объекту на строку;
+    ?stream=1 — обычный JSON-массив, отдаваемый по частям.
+    Возвращает 'ndjson', 'json' или None (обычный ответ).
+    """
+    fmt = request.args.get('format')
+    if fmt == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return 'ndjson'
+    if request.args.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+
+def stream_query(query, serialize, fmt):
+    """
+    Потоковый ответ по запросу SQLAlchemy.
+    Строки читаются серверным курсором пачками по STREAM_BATCH_SIZE (yield_per),
+    сериализуются по одной и сразу отправляются клиенту, поэтому память процесса
+    не растет вместе с размером выборки.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        first = True
+        try:
+            if fmt == 'json':
+                yield '['
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                item = dumps(serialize(row))
+                if fmt == 'ndjson':
+                    yield item + '\n'
+                elif first:
+                    yield item
+                else:
+                    yield ',' + item
+                first = False
+            if fmt == 'json':
+                yield ']'
+        except Exception as e:
+            # Заголовки уже отправлены: прерываем поток, клиент получит неполный ответ
+            logger.error("Error while streaming response: %s", e, exc_info=True)
+            raise
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from psycopg2 import errorcodes
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from app.models import db, Booking, BookingService, CleaningSchedule, Payment, Service
+
+logger = logging.getLogger(__name__)
+
+# Ошибки PostgreSQL, после которых транзакцию имеет смысл повторить
+RETRYABLE_PGCODES = (errorcodes.SERIALIZATION_FAILURE, errorcodes.DEADLOCK_DETECTED, errorcodes.LOCK_NOT_AVAILABLE)
+
+
+def is_transient(error):
+    """
+    Временная ошибка: потеря соединения, недоступность БД, конфликт блокировок.
+    Ошибки данных (уникальность, внешние ключи) повторять бессмысленно.
+    """
+    if isinstance(error, OperationalError):
+        return True
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or getattr(error.orig, 'pgcode', None) in RETRYABLE_PGCODES
+    return False
+
+
+class TaskQueue:
+    """
+    Фоновые задачи процесса: пул потоков и повтор при временных ошибках
+    с экспоненциальной задержкой. Каждая попытка выполняется в своем контексте
+    приложения, то есть в своей сессии и транзакции; задача должна быть идемпотентной.
+    При TASKS_ENABLED=0 задачи выполняются сразу в вызывающем потоке.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.workers = None
+        self.max_retries = None
+        self.retry_delay = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'completed': 0, 'retried': 0, 'failed': 0}
+        self._pending = 0
+
+    def init_app(self, app):
+        """
+        Читает настройки TASK_* и запоминает приложение для контекста задач.
+        Потоки создаются при первой задаче, уже после fork воркера gunicorn.
+        """
+        self.app = app
+        self.enabled = os.getenv('TASKS_ENABLED', '1') == '1'
+        self.workers = int(os.getenv('TASK_WORKERS', '2'))
+        self.max_retries = int(os.getenv('TASK_MAX_RETRIES', '3'))
+        self.retry_delay = float(os.getenv('TASK_RETRY_DELAY', '0.5'))  # Секунды, удваивается с каждой попыткой
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='task')
+        return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Ставит задачу func(*args, **kwargs) в очередь. Вызывать после commit,
+        иначе задача может не увидеть данные запроса.
+        """
+        self._count('submitted')
+        if not self.enabled:
+            self._run(func, args, kwargs)
+            return
+        with self._lock:
+            self._pending += 1
+        try:
+            self._get_executor().submit(self._run, func, args, kwargs)
+        except RuntimeError:
+            # Пул уже остановлен (воркер завершается): задача выполняется сразу
+            with self._lock:
+                self._pending -= 1
+            self.enabled = False
+            self._run(func, args, kwargs)
+
+    def _run(self, func, args, kwargs):
+        name = getattr(func, '__name__', repr(func))
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with self.app.app_context():
+                        try:
+                            func(*args, **kwargs)
+                        except Exception:
+                            db.session.rollback()
+                            raise
+                    self._count('completed')
+                    return
+                except Exception as e:
+                    if attempt < self.max_retries and is_transient(e):
+                        self._count('retried')
+                        delay = self.retry_delay * 2 ** attempt
+                        logger.warning("Task %s failed (%s), retry %s in %.1fs", name, e, attempt + 1, delay)
+                        time.sleep(delay)
+                        continue
+                    self._count('failed')
+                    logger.error("Task %s failed after %s attempts: %s", name, attempt + 1, e, exc_info=True)
+                    return
+        finally:
+            if self.enabled:
+                with self._lock:
+                    self._pending -= 1
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """
+        Счетчики задач текущего процесса и число задач в очереди или в работе.
+        """
+        with self._lock:
+            return dict(self._counters, pending=self._pending, enabled=self.enabled, workers=self.workers)
+
+    def shutdown(self, wait=True):
+        """
+        Останавливает пул; при wait=True дожидается задач, уже поставленных в очередь.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+task_queue = TaskQueue()
+
+
+def complete_booking(booking_id, services, payment_method):
+    """
+    Работа после создания брони: услуги из заявки, ожидающий платеж на полную
+    стоимость (проживание и услуги) и дата уборки номера после выезда.
+    Повторный запуск ничего не дублирует: услуги и платеж создаются, только
+    если у брони их еще нет. Кэш сбрасывается обработчиками commit (см. cache.py).
+    """
+    booking = db.session.get(Booking, booking_id)
+    if booking is None or booking.status == 'cancelled':
+        logger.warning("Booking %s is missing or cancelled, post-booking tasks skipped", booking_id)
+        return
+
+    booked_services = BookingService.query.filter_by(booking_id=booking_id).all()
+    if services and not booked_services:
+        quantities = {}
+        for item in services:
+            quantities[item['service_id']] = quantities.get(item['service_id'], 0) + item['quantity']
+        active = Service.query.filter(Service.service_id.in_(quantities), Service.is_active.is_(True)).all()
+        unknown = set(quantities) - {service.service_id for service in active}
+        if unknown:
+            logger.warning("Booking %s: unknown or inactive services skipped: %s", booking_id, sorted(unknown))
+        for service in active:
+            booked_services.append(BookingService(
+                booking_id=booking_id,
+                service_id=service.service_id,
+                quantity=quantities[service.service_id],
+                service_date=booking.check_in_date
+            ))
+        db.session.add_all(booked_services)
+        db.session.flush()
+
+    if payment_method and not Payment.query.filter_by(booking_id=booking_id).first():
+        nights = (booking.check_out_date - booking.check_in_date).days
+        amount = booking.room.daily_rate * nights + sum(
+            (item.service.price * item.quantity for item in booked_services), Decimal('0')
+        )
+        db.session.add(Payment(booking_id=booking_id, amount=amount, method=payment_method, status='pending'))
+
+    # Уборка в день выезда, если раньше нее не назначена другая предстоящая уборка
+    schedule = CleaningSchedule.query.filter_by(room_id=booking.room_id).first()
+    next_date = schedule.next_cleaning_date if schedule is not None else None
+    if schedule is not None and (next_date is None or next_date < date.today() or next_date > booking.check_out_date):
+        schedule.next_cleaning_date = booking.check_out_date
+
+    db.session.commit()
@@ -0,0 +1,377 @@
+"""
+Сквозной бенчмарк API с проверкой регрессий.
+
+Запускает приложение (create_app, многопоточный сервер Werkzeug) в отдельном процессе
+на базе с данными генератора datagen.py и по очереди нагружает маршруты app/main.py.
+Для каждого маршрута записываются пропускная способность, перцентили задержки,
+число SQL-запросов на запрос (сервер возвращает его в заголовке X-Benchmark-Queries),
+для процесса сервера — пиковый RSS. Результаты сравниваются с базовым файлом;
+при регрессии сверх допусков скрипт завершается с кодом 1.
+
+Запуск (нужна PostgreSQL со схемой hotel; подключение — DATABASE_URL или DB_*, как для приложения):
+    python benchmarks/api_suite.py --load --profile medium --concurrency 16 --duration 10
+    python benchmarks/api_suite.py --profile medium --save-baseline
+--load удаляет данные в схеме hotel и загружает профиль заново (--profile, --seed);
+без него используется уже загруженная база. --route ограничивает набор маршрутов.
+Базовый файл (по умолчанию benchmarks/api_baseline.json) записывается с --save-baseline
+на эталонной машине; сравнение с результатами другого профиля или машины не имеет смысла.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from datagen import PROFILES, connect, load
+from load_test import percentile, run_load
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'api_baseline.json')
+QUERIES_HEADER = 'X-Benchmark-Queries'
+
+# Допуски по умолчанию: рост p95 и RSS, падение пропускной способности (доли).
+# Число SQL-запросов на запрос не должно расти вовсе
+LATENCY_TOLERANCE = 0.25
+THROUGHPUT_TOLERANCE = 0.2
+RSS_TOLERANCE = 0.2
+# Рост p95 меньше этого значения считается шумом
+MIN_LATENCY_DELTA_MS = 2.0
+
+# Номера, создаваемые для POST /api/bookings: после брони номер получает статус occupied,
+# поэтому каждый запрос бронирует свой номер
+POST_ROOM_PREFIX = 'B'
+
+
+def serve(port):
+    """
+    Процесс сервера: приложение с подсчетом SQL-запросов на каждый HTTP-запрос.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from sqlalchemy import event
+    from werkzeug.serving import make_server
+
+    from app.main import create_app
+    from app.models import db
+
+    app = create_app()
+    counter = threading.local()
+
+    def count_statement(*args):
+        counter.value = getattr(counter, 'value', 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    @app.before_request
+    def reset_counter():
+        counter.value = 0
+
+    @app.after_request
+    def report_counter(response):
+        response.headers[QUERIES_HEADER] = str(getattr(counter, 'value', 0))
+        return response
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def peak_rss_mb(pid):
+    """
+    Пиковый RSS процесса (VmHWM из /proc, только Linux).
+    """
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_server(port, timeout=60):
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port)])
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/stats/pool', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit("Server did not start")
+
+
+def dataset_params(cursor):
+    """
+    Параметры маршрутов из загруженных данных: номера с бронированиями, периоды, гость.
+    """
+    cursor.execute("""
+        SELECT r.room_number FROM hotel.rooms r
+        WHERE EXISTS (SELECT 1 FROM hotel.bookings b WHERE b.room_id = r.room_id)
+        ORDER BY r.room_id LIMIT 20
+    """)
+    room_numbers = [number for number, in cursor.fetchall()]
+    cursor.execute("SELECT MIN(check_in_date), MAX(check_out_date) FROM hotel.bookings")
+    first_day, last_day = cursor.fetchone()
+    cursor.execute("SELECT passport_number, last_name FROM hotel.guests ORDER BY guest_id LIMIT 1")
+    guest = cursor.fetchone()
+    if not room_numbers or guest is None:
+        sys.exit("The database has no bookings: run with --load")
+    step = max((last_day - first_day).days // 20, 1)
+    periods = [(first_day + timedelta(days=i * step), first_day + timedelta(days=i * step + 3)) for i in range(20)]
+    return {'room_numbers': room_numbers, 'periods': periods, 'passport': guest[0], 'last_name': guest[1]}
+
+
+def scenarios(params):
+    """
+    {название: список путей}. Пути одного маршрута чередуются (разные номера и периоды).
+    """
+    periods = params['periods']
+    return {
+        'GET /api/guests': ['/api/guests?limit=100'],
+        'GET /api/guests/search': [
+            f"/api/guests/search?q={quote(params['last_name'][:4])}",
+            f"/api/guests/search?q={quote(params['passport'])}"
+        ],
+        'GET /api/rooms': ['/api/rooms'],
+        'GET /api/rooms (dates)': [
+            f"/api/rooms?check_in={start}&check_out={end}&status=available" for start, end in periods
+        ],
+        'GET /ui/rooms (dates)': [f"/ui/rooms?check_in={start}&check_out={end}" for start, end in periods],
+        'GET /api/rooms/<n>/full-info': [f"/api/rooms/{number}/full-info" for number in params['room_numbers']],
+        'GET /ui/services-by-date': [
+            f"/ui/services-by-date?start_date={start}&end_date={start + timedelta(days=30)}" for start, _ in periods
+        ],
+        'GET /api/services': ['/api/services'],
+        'GET /api/bookings': ['/api/bookings?limit=100'],
+        'GET /api/payments': ['/api/payments?limit=100'],
+        'GET /api/analytics/occupancy': [
+            f"/api/analytics/occupancy?start_date={start}&end_date={start + timedelta(days=30)}"
+            for start, _ in periods
+        ],
+        'GET /api/analytics/revenue': ['/api/analytics/revenue'],
+    }
+
+
+def get_request(connection, path):
+    connection.request('GET', path)
+    response = connection.getresponse()
+    response.read()
+    return response.status, int(response.getheader(QUERIES_HEADER, '0'))
+
+
+def create_post_rooms(cursor, count):
+    cursor.execute(
+        "INSERT INTO hotel.rooms (room_number, type, capacity, daily_rate, status) "
+        "SELECT %s || i, 'Basic', 2, 2500, 'available' FROM generate_series(1, %s) AS i "
+        "RETURNING room_id",
+        (POST_ROOM_PREFIX + os.urandom(2).hex()[:3].upper(), count)  # room_number — до 10 символов
+    )
+    return [room_id for room_id, in cursor.fetchall()]
+
+
+def delete_post_rooms(cursor, room_ids):
+    """
+    Удаляет номера POST-сценария вместе с бронями, которые на них создал бенчмарк.
+    """
+    cursor.execute("SELECT to_regclass('hotel.cleaning_schedule') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("DELETE FROM hotel.cleaning_schedule WHERE room_id = ANY(%s)", (room_ids,))
+    for table in ('booking_services', 'payments'):
+        cursor.execute(
+            f"DELETE FROM hotel.{table} WHERE booking_id IN "
+            "(SELECT booking_id FROM hotel.bookings WHERE room_id = ANY(%s))", (room_ids,)
+        )
+    cursor.execute("DELETE FROM hotel.bookings WHERE room_id = ANY(%s)", (room_ids,))
+    cursor.execute("DELETE FROM hotel.rooms WHERE room_id = ANY(%s)", (room_ids,))
+
+
+def post_booking_request(room_ids, passport):
+    """
+    request_fn для run_load: каждый вызов бронирует следующий номер из room_ids.
+    """
+    numbers = itertools.count()
+    check_in = date.today() + timedelta(days=400)
+
+    def request(connection, path):
+        number = next(numbers)
+        if number >= len(room_ids):
+            time.sleep(0.1)
+            raise OSError("room pool exhausted, increase --post-rooms")
+        body = json.dumps({
+            'room_id': room_ids[number],
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': (check_in + timedelta(days=2)).isoformat(),
+            'adults': 1,
+            'guest': {'passport_number': passport}
+        })
+        connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        return response.status, int(response.getheader(QUERIES_HEADER, '0'))
+
+    return request
+
+
+def summarize(elapsed, latencies, errors, extras):
+    values = [value for path_values in latencies.values() for value in path_values]
+    statements = [value for path_values in extras.values() for value in path_values]
+    requests = len(values)
+    return {
+        'requests': requests,
+        'errors': sum(errors.values()),
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(values, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'sql_mean': round(sum(statements) / len(statements), 2) if statements else 0,
+        'sql_max': max(statements, default=0),
+    }
+
+
+def compare(results, baseline, tolerances):
+    """
+    Список регрессий относительно базового файла.
+    """
+    regressions = []
+    for name, current in results['routes'].items():
+        base = baseline['routes'].get(name)
+        if base is None:
+            continue
+        if current['sql_max'] > base['sql_max']:
+            regressions.append(f"{name}: SQL statements per request {base['sql_max']} -> {current['sql_max']}")
+        if (current['p95_ms'] > base['p95_ms'] * (1 + tolerances['latency'])
+                and current['p95_ms'] - base['p95_ms'] > MIN_LATENCY_DELTA_MS):
+            regressions.append(f"{name}: p95 {base['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current['rps'] < base['rps'] * (1 - tolerances['throughput']):
+            regressions.append(f"{name}: throughput {base['rps']} -> {current['rps']} req/s")
+        if base['errors'] == 0 and current['errors'] > 0:
+            regressions.append(f"{name}: {current['errors']} failed requests")
+    if results['peak_rss_mb'] and baseline.get('peak_rss_mb'):
+        if results['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerances['rss']):
+            regressions.append(f"server peak RSS {baseline['peak_rss_mb']:.0f} MB -> {results['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'route':<34}{'req':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql':>7}")
+    for name, stats in results['routes'].items():
+        print(f"{name:<34}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+              f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['sql_max']:>7}")
+    if results['peak_rss_mb']:
+        print(f"server peak RSS: {results['peak_rss_mb']:.0f} MB")
+
+
+def run(args):
+    with connect() as conn, conn.cursor() as cursor:
+        if args.load:
+            counts = load(conn, args.profile, args.seed, truncate=True)
+            print(f"Loaded profile {args.profile}: {counts['bookings']} bookings")
+        params = dataset_params(cursor)
+        post_rooms = []
+        if not args.route or 'POST /api/bookings' in args.route:
+            post_rooms = create_post_rooms(cursor, args.post_rooms)
+        conn.commit()
+
+    routes = scenarios(params)
+    if args.route:
+        routes = {name: paths for name, paths in routes.items() if name in args.route}
+    base_url = f'http://127.0.0.1:{args.port}'
+    server = start_server(args.port)
+    results = {
+        'meta': {
+            'profile': args.profile,
+            'seed': args.seed,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'python': platform.python_version(),
+            'machine': platform.node(),
+        },
+        'routes': {},
+    }
+    try:
+        for name, paths in routes.items():
+            print(f"{name} ...", flush=True)
+            results['routes'][name] = summarize(
+                *run_load(base_url, paths, args.concurrency, args.duration, get_request)
+            )
+        # Сценарий записи — последним, чтобы созданные брони не влияли на чтение
+        if post_rooms:
+            print("POST /api/bookings ...", flush=True)
+            results['routes']['POST /api/bookings'] = summarize(*run_load(
+                base_url, ['/api/bookings'], args.concurrency, args.duration,
+                post_booking_request(post_rooms, params['passport'])
+            ))
+        results['peak_rss_mb'] = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+        if post_rooms:
+            with connect() as conn, conn.cursor() as cursor:
+                delete_post_rooms(cursor, post_rooms)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PROFILES), default='medium')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--load', action='store_true', help="truncate hotel data and load --profile")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help="seconds per route")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--route', action='append', help="route name to run (repeatable), e.g. 'GET /api/rooms'")
+    parser.add_argument('--post-rooms', type=int, default=20000, help="rooms created for POST /api/bookings")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument('--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument('--rss-tolerance', type=float, default=RSS_TOLERANCE)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}: run with --save-baseline to create it")
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['meta'].get('profile') != args.profile:
+        print(f"Baseline was recorded on profile {baseline['meta'].get('profile')}, not {args.profile}")
+    regressions = compare(results, baseline, {
+        'latency': args.latency_tolerance,
+        'throughput': args.throughput_tolerance,
+        'rss': args.rss_tolerance,
+    })
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Бенчмарк индекса занятости номеров: сравнение поиска свободных номеров
+в памяти (AvailabilityIndex.free_rooms) и в PostgreSQL (NOT EXISTS по bookings).
+
+Запуск:
+    python benchmarks/availability_index.py --rooms 1000 --bookings 1000000
+
+Если задана переменная окружения DATABASE_URL, дополнительно замеряется
+SQL-путь на той же базе (данные должны быть загружены заранее).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.availability_index import AvailabilityIndex  # noqa: E402
+
+SQL_FREE_ROOMS = """
+    SELECT r.room_id
+    FROM hotel.rooms r
+    WHERE r.capacity >= %(capacity)s
+      AND NOT EXISTS (
+          SELECT 1 FROM hotel.bookings b
+          WHERE b.room_id = r.room_id
+            AND b.status <> 'cancelled'
+            AND daterange(b.check_in_date, b.check_out_date, '[]') && daterange(%(check_in)s, %(check_out)s, '[]')
+      )
+"""
+
+
+def generate(rooms, bookings, seed):
+    """
+    Синтетические номера и непересекающиеся бронирования (по bookings // rooms на номер).
+    """
+    rnd = random.Random(seed)
+    room_rows = [(room_id, rnd.randint(1, 6)) for room_id in range(1, rooms + 1)]
+    booking_rows = []
+    per_room = bookings // rooms
+    start = date(2000, 1, 1)
+    booking_id = 0
+    for room_id, _ in room_rows:
+        day = start
+        for _ in range(per_room):
+            day += timedelta(days=rnd.randint(0, 3))
+            nights = rnd.randint(1, 7)
+            booking_id += 1
+            booking_rows.append((booking_id, room_id, day, day + timedelta(days=nights)))
+            day += timedelta(days=nights + 1)
+    return room_rows, booking_rows, start, day
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def report(name, timings):
+    print(f"{name:>10}: p50={percentile(timings, 0.5) * 1e6:9.1f} us  "
+          f"p99={percentile(timings, 0.99) * 1e6:9.1f} us  mean={statistics.mean(timings) * 1e6:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rooms, bookings, first_day, last_day = generate(args.rooms, args.bookings, args.seed)
+    index = AvailabilityIndex()
+    started = time.perf_counter()
+    index.build(rooms, bookings)
+    print(f"Index built for {len(rooms)} rooms / {len(bookings)} bookings in {time.perf_counter() - started:.2f} s")
+
+    rnd = random.Random(args.seed + 1)
+    span = (last_day - first_day).days
+    queries = []
+    for _ in range(args.queries):
+        check_in = first_day + timedelta(days=rnd.randint(0, span))
+        queries.append((check_in, check_in + timedelta(days=rnd.randint(1, 14)), rnd.randint(1, 6)))
+
+    timings = []
+    for check_in, check_out, capacity in queries:
+        started = time.perf_counter()
+        index.free_rooms(check_in, check_out, capacity)
+        timings.append(time.perf_counter() - started)
+    report('memory', timings)
+
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("DATABASE_URL is not set, SQL path skipped")
+        return
+    import psycopg2
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        timings = []
+        for check_in, check_out, capacity in queries:
+            started = time.perf_counter()
+            cursor.execute(SQL_FREE_ROOMS, {'check_in': check_in, 'check_out': check_out, 'capacity': capacity})
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+        report('postgres', timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Нагрузочная проверка защиты от двойного бронирования (ограничение no_overlapping_bookings).
+
+Для каждого раунда создается новый номер, после чего --threads потоков одновременно
+отправляют POST /api/bookings на одни и те же даты. Ожидается ровно один ответ 201;
+остальные — 400 от ограничения ("Room already booked for these dates") или от проверки
+статуса номера ("Room not available"), если запрос пришел уже после commit победителя.
+Затем статус номера возвращается в available и потоки бронируют пересекающийся период:
+проверка статуса пропускает все запросы, и отказ может дать только ограничение.
+У каждого номера в итоге должна остаться ровно одна бронь, а в базе — ни одного пересечения.
+
+Нужна локальная PostgreSQL с развернутой схемой hotel (переменные DB_* как для приложения):
+    python benchmarks/booking_stress.py --threads 32 --rounds 20
+"""
+import argparse
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import create_app  # noqa: E402
+from app.models import db  # noqa: E402
+
+app = create_app()
+
+CONFLICT_ERROR = "Room already booked for these dates"
+STATUS_ERROR = "Room not available"
+
+FIRST_PERIOD = ('2030-01-10', '2030-01-15')
+OVERLAPPING_PERIOD = ('2030-01-12', '2030-01-20')
+
+OVERLAPS_SQL = """
+    SELECT COUNT(*)
+    FROM hotel.bookings a
+    JOIN hotel.bookings b
+      ON a.room_id = b.room_id
+     AND a.booking_id < b.booking_id
+     AND a.check_in_date <= b.check_out_date
+     AND a.check_out_date >= b.check_in_date
+    WHERE a.status <> 'cancelled' AND b.status <> 'cancelled'
+"""
+
+
+def create_room(client):
+    response = client.post('/api/rooms', json={
+        'room_number': uuid.uuid4().hex[:10],
+        'type': 'Basic',
+        'capacity': 2,
+        'daily_rate': 1000
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['room_id']
+
+
+def book(room_id, period, barrier, outcomes, lock):
+    client = app.test_client()
+    payload = {
+        'room_id': room_id,
+        'check_in_date': period[0],
+        'check_out_date': period[1],
+        'adults': 1,
+        'guest': {
+            'passport_number': uuid.uuid4().hex[:12].upper(),
+            'first_name': 'Stress',
+            'last_name': 'Test',
+            'phone': '+70000000000'
+        }
+    }
+    barrier.wait()
+    response = client.post('/api/bookings', json=payload)
+    if response.status_code == 201:
+        outcome = 'created'
+    else:
+        outcome = f"{response.status_code} {(response.get_json(silent=True) or {}).get('error')}"
+    with lock:
+        outcomes[outcome] += 1
+
+
+def run_concurrently(room_id, period, threads):
+    """
+    threads одновременных бронирований номера на period. Возвращает Counter исходов:
+    'created' или '<статус> <текст ошибки>'.
+    """
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    workers = [
+        threading.Thread(target=book, args=(room_id, period, barrier, outcomes, lock))
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return outcomes
+
+
+def reset_room_status(room_id):
+    with app.app_context():
+        db.session.execute(db.text("UPDATE hotel.rooms SET status = 'available' WHERE room_id = :room_id"),
+                           {'room_id': room_id})
+        db.session.commit()
+
+
+def active_bookings(room_id):
+    with app.app_context():
+        return db.session.execute(
+            db.text("SELECT COUNT(*) FROM hotel.bookings WHERE room_id = :room_id AND status <> 'cancelled'"),
+            {'room_id': room_id}
+        ).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    failures = 0
+    for round_number in range(1, args.rounds + 1):
+        room_id = create_room(client)
+        first = run_concurrently(room_id, FIRST_PERIOD, args.threads)
+        reset_room_status(room_id)
+        overlapping = run_concurrently(room_id, OVERLAPPING_PERIOD, args.threads)
+        bookings = active_bookings(room_id)
+        ok = (
+            first['created'] == 1
+            and first[f'400 {CONFLICT_ERROR}'] + first[f'400 {STATUS_ERROR}'] == args.threads - 1
+            and overlapping[f'400 {CONFLICT_ERROR}'] == args.threads
+            and bookings == 1
+        )
+        failures += not ok
+        print(f"round {round_number:3d}: room_id={room_id} same dates={dict(first)} "
+              f"overlapping={dict(overlapping)} bookings={bookings} {'OK' if ok else 'FAIL'}")
+
+    with app.app_context():
+        overlaps = db.session.execute(db.text(OVERLAPS_SQL)).scalar()
+    print(f"Overlapping non-cancelled bookings in database: {overlaps}")
+    if failures or overlaps:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Сравнение построчной загрузки гостей (POST /api/guests на каждую строку) и массовой
+(POST /api/guests/bulk) в JSON, NDJSON и CSV: строк в секунду и ускорение.
+
+Запуск (нужна PostgreSQL со схемой hotel, переменные DB_* как для приложения):
+    python benchmarks/bulk_ingest.py --rows 100000 --single-rows 2000
+Построчный путь медленный, поэтому для него берется меньше строк (--single-rows),
+сравниваются скорости в строках в секунду.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import create_app  # noqa: E402
+
+app = create_app()
+
+TARGET_SPEEDUP = 50
+
+
+def make_guests(count, tag):
+    return [
+        {
+            'passport_number': f"{tag}{i:010d}",
+            'first_name': 'Bulk',
+            'last_name': f'Guest{i}',
+            'phone': f"+7{i:010d}",
+            'email': f"guest{i}@example.com",
+            'address': None
+        }
+        for i in range(count)
+    ]
+
+
+def encode(rows, fmt):
+    if fmt == 'json':
+        return json.dumps(rows), 'application/json'
+    if fmt == 'ndjson':
+        return '\n'.join(json.dumps(row) for row in rows), 'application/x-ndjson'
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue(), 'text/csv'
+
+
+def run_single(client, rows):
+    started = time.perf_counter()
+    for row in rows:
+        response = client.post('/api/guests', json=row)
+        assert response.status_code == 201, response.get_json()
+    return len(rows) / (time.perf_counter() - started)
+
+
+def run_bulk(client, rows, fmt):
+    body, content_type = encode(rows, fmt)
+    started = time.perf_counter()
+    response = client.post('/api/guests/bulk', data=body, content_type=content_type)
+    elapsed = time.perf_counter() - started
+    summary = response.get_json()
+    assert response.status_code == 200 and summary['inserted'] == len(rows), summary
+    return len(rows) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    single = run_single(client, make_guests(args.single_rows, 'S' + uuid.uuid4().hex[:6].upper()))
+    print(f"{'mode':<10}{'rows':>10}{'rows/s':>12}{'speedup':>10}")
+    print(f"{'single':<10}{args.single_rows:>10}{single:>12.0f}{1:>10.1f}")
+    slowest = None
+    for fmt in ('json', 'ndjson', 'csv'):
+        rate = run_bulk(client, make_guests(args.rows, fmt[0].upper() + uuid.uuid4().hex[:6].upper()), fmt)
+        print(f"{fmt:<10}{args.rows:>10}{rate:>12.0f}{rate / single:>10.1f}")
+        slowest = rate if slowest is None else min(slowest, rate)
+    if slowest / single < TARGET_SPEEDUP:
+        print(f"Bulk path is below the {TARGET_SPEEDUP}x target")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
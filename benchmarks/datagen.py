@@ -0,0 +1,348 @@
+"""
+Генератор синтетических данных для бенчмарков: номера, гости, бронирования за
+несколько лет с сезонной загрузкой, услуги и платежи. Данные детерминированы:
+одинаковые профиль, --seed и --today дают одинаковые строки.
+Загрузка идет через COPY в схему hotel.
+
+Запуск (нужна PostgreSQL со схемой hotel; подключение — DATABASE_URL или DB_*):
+    python benchmarks/datagen.py --profile medium --seed 42 --truncate
+Без --truncate данные добавляются к существующим (идентификаторы продолжают текущие).
+Профили: small (тесты), medium (бенчмарки API), huge (проверка планов запросов).
+
+Из других скриптов:
+    from datagen import connect, load
+    with connect() as conn:
+        load(conn, 'small', seed=1)
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import psycopg2
+
+# rooms — число номеров, years — период бронирований (последние полгода периода — будущие
+# брони), guests — число гостей (в среднем несколько бронирований на гостя)
+PROFILES = {
+    'small': {'rooms': 50, 'years': 1, 'guests': 3000},
+    'medium': {'rooms': 500, 'years': 3, 'guests': 80000},
+    'huge': {'rooms': 5000, 'years': 5, 'guests': 1500000},
+}
+
+# Доля занятых ночей по месяцам: пик летом и в новогодние праздники
+MONTH_OCCUPANCY = (0.62, 0.48, 0.52, 0.55, 0.66, 0.82, 0.93, 0.94, 0.74, 0.6, 0.5, 0.71)
+# Заезды в пятницу и субботу вероятнее
+WEEKEND_BOOST = 1.15
+# Дни до конца периода, на которые уже есть брони
+FUTURE_DAYS = 180
+
+# Тип номера: (доля номеров, вместимости, базовая ставка, средняя длительность проживания)
+ROOM_TYPES = {
+    'Basic': (0.4, (1, 2), 2500, 2.5),
+    'Advanced': (0.3, (2, 3), 4000, 3.5),
+    'Business': (0.15, (1, 2), 7000, 2.0),
+    'Dorm': (0.15, (4, 6), 900, 5.0),  # valid_capacity: от 1 до 6
+}
+MAX_STAY = 21
+
+# Услуга: (название, описание, цена, вероятность заказа на бронь, оплачивается за каждую ночь)
+SERVICE_CATALOG = (
+    ('Завтрак', 'Континентальный завтрак', Decimal('500.00'), 0.45, True),
+    ('Прачечная', 'Стирка и глажка одежды', Decimal('300.00'), 0.12, False),
+    ('Экскурсия', 'Обзорная экскурсия по городу', Decimal('1200.00'), 0.08, False),
+    ('Трансфер', 'Трансфер из аэропорта', Decimal('1500.00'), 0.15, False),
+    ('Спа', 'Посещение спа-центра', Decimal('2000.00'), 0.06, False),
+    ('Парковка', 'Место на охраняемой парковке', Decimal('400.00'), 0.2, True),
+)
+
+PAYMENT_METHODS = ('credit_card', 'online', 'cash', 'bank_transfer')
+PAYMENT_METHOD_WEIGHTS = (0.5, 0.3, 0.15, 0.05)
+
+FIRST_NAMES = ('Иван', 'Мария', 'Алексей', 'Елена', 'Дмитрий', 'Анна', 'Сергей', 'Ольга', 'Павел', 'Наталья')
+LAST_NAMES = ('Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Васильев', 'Смирнов', 'Попов', 'Соколов', 'Лебедев',
+              'Новиков', 'Морозов', 'Волков')
+
+# Таблицы в порядке загрузки (внешние ключи) и их столбцы в файлах COPY
+COLUMNS = {
+    'rooms': ('room_id', 'room_number', 'type', 'capacity', 'daily_rate', 'status', 'description'),
+    'guests': ('guest_id', 'passport_number', 'first_name', 'last_name', 'phone', 'email'),
+    'bookings': ('booking_id', 'guest_id', 'room_id', 'check_in_date', 'check_out_date', 'status',
+                 'adults', 'children', 'created_at'),
+    'booking_services': ('booking_service_id', 'booking_id', 'service_id', 'quantity', 'service_date'),
+    'payments': ('payment_id', 'booking_id', 'amount', 'method', 'status', 'transaction_date'),
+    'cleaning_schedule': ('id', 'room_id', 'needs_cleaning', 'next_cleaning_date'),
+}
+PRIMARY_KEYS = {table: columns[0] for table, columns in COLUMNS.items()}
+
+# Триггеры агрегатов аналитики (triggers/04) на время загрузки отключаются,
+# агрегаты пересчитываются одним запросом после нее
+ROLLUP_TABLES = ('bookings', 'payments')
+
+
+def connect():
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        return psycopg2.connect(database_url)
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432'),
+        dbname=os.getenv('DB_NAME', 'hotel_db'),
+        user=os.getenv('DB_USER', 'hotel_user'),
+        password=os.getenv('DB_PASSWORD', '')
+    )
+
+
+def _line(values):
+    """
+    Строка файла COPY в текстовом формате (значения генератора не содержат табуляций
+    и переводов строк, экранировать нужно только NULL).
+    """
+    return '\t'.join('\\N' if value is None else str(value) for value in values) + '\n'
+
+
+def _stay_probability(day, mean_stay):
+    """
+    Вероятность того, что со дня day начнется бронь: подобрана так, чтобы с учетом
+    обязательного свободного дня между бронями доля занятых ночей была близка к сезонной.
+    """
+    target = MONTH_OCCUPANCY[day.month - 1] * (WEEKEND_BOOST if day.weekday() >= 4 else 1)
+    target = min(target, mean_stay / (mean_stay + 1) - 0.01)
+    return 1 / (1 + max(mean_stay / target - mean_stay - 1, 0))
+
+
+def _stays(rnd, start, end, mean_stay):
+    """
+    Непересекающиеся периоды проживания номера с start по end. Соседние брони разделены
+    хотя бы одним днем: ограничение no_overlapping_bookings считает границы включительно.
+    """
+    day = start + timedelta(days=rnd.randint(0, 3))
+    while day < end:
+        if rnd.random() >= _stay_probability(day, mean_stay):
+            day += timedelta(days=1)
+            continue
+        nights = 1 + min(int(rnd.expovariate(1 / (mean_stay - 1))), MAX_STAY - 1)
+        check_out = day + timedelta(days=nights)
+        yield day, check_out, nights
+        day = check_out + timedelta(days=1)
+
+
+def _timestamp(day, rnd):
+    return f"{day.isoformat()} {rnd.randint(8, 22):02d}:{rnd.randint(0, 59):02d}:00+00"
+
+
+class Generator:
+    """
+    Строки всех таблиц для профиля. Идентификаторы начинаются после offsets
+    (максимальных существующих), поэтому данные можно добавлять к уже загруженным.
+    Брони каждого номера генерируются своим Random, производным от seed и номера.
+    """
+
+    def __init__(self, profile, seed, today, offsets, services):
+        self.profile = PROFILES[profile]
+        self.seed = seed
+        self.today = today
+        self.end = today + timedelta(days=FUTURE_DAYS)
+        self.start = self.end - timedelta(days=365 * self.profile['years'])
+        self.offsets = offsets
+        self.ids = dict(offsets)
+        self.services = services  # [(service_id, цена, вероятность, за ночь)]
+
+    def _next_id(self, table):
+        self.ids[table] += 1
+        return self.ids[table]
+
+    def guests(self, out):
+        rnd = random.Random(f"{self.seed}:guests")
+        for _ in range(self.profile['guests']):
+            guest_id = self._next_id('guests')
+            out.write(_line((
+                guest_id,
+                f"DG{guest_id:010d}",
+                rnd.choice(FIRST_NAMES),
+                rnd.choice(LAST_NAMES),
+                f"+79{rnd.randint(0, 999999999):09d}",
+                f"guest{guest_id}@example.com" if rnd.random() < 0.7 else None
+            )))
+
+    def rooms(self, out, cleaning_out):
+        rnd = random.Random(f"{self.seed}:rooms")
+        names = list(ROOM_TYPES)
+        weights = [ROOM_TYPES[name][0] for name in names]
+        rooms = []
+        for _ in range(self.profile['rooms']):
+            room_id = self._next_id('rooms')
+            room_type = rnd.choices(names, weights)[0]
+            _, capacities, rate, mean_stay = ROOM_TYPES[room_type]
+            capacity = rnd.choice(capacities)
+            daily_rate = Decimal(rate + capacity * 200 + rnd.randint(-5, 5) * 50).quantize(Decimal('0.01'))
+            status = 'maintenance' if rnd.random() < 0.02 else 'available'
+            out.write(_line((room_id, f"D{room_id}", room_type, capacity, daily_rate, status, None)))
+            if cleaning_out is not None:
+                cleaning_out.write(_line((
+                    self._next_id('cleaning_schedule'), room_id, 'f', self.today + timedelta(days=rnd.randint(0, 3))
+                )))
+            rooms.append((room_id, capacity, daily_rate, mean_stay))
+        return rooms
+
+    def bookings(self, rooms, out, services_out, payments_out):
+        """
+        Бронирования номеров со статусами по отношению к today, их услуги и платежи.
+        """
+        guests = self.profile['guests']
+        for room_id, capacity, daily_rate, mean_stay in rooms:
+            rnd = random.Random(f"{self.seed}:room:{room_id - self.offsets['rooms']}")
+            for check_in, check_out, nights in _stays(rnd, self.start, self.end, mean_stay):
+                booking_id = self._next_id('bookings')
+                if check_out < self.today:
+                    status = 'cancelled' if rnd.random() < 0.06 else 'checked_out'
+                elif check_in <= self.today:
+                    status = 'checked_in'
+                else:
+                    status = 'cancelled' if rnd.random() < 0.08 else 'confirmed'
+                created = min(check_in - timedelta(days=int(rnd.expovariate(1 / 21))), self.today)
+                adults = rnd.randint(1, capacity)
+                children = rnd.randint(0, capacity - adults) if rnd.random() < 0.2 else 0
+                # Постоянные гости: младшие идентификаторы выбираются чаще
+                guest_id = self.offsets['guests'] + 1 + int(guests * rnd.random() ** 2)
+                out.write(_line((
+                    booking_id, guest_id, room_id, check_in, check_out, status, adults, children,
+                    _timestamp(created, rnd)
+                )))
+
+                total = daily_rate * nights
+                if status != 'cancelled':
+                    for service_id, price, probability, per_night in self.services:
+                        if rnd.random() < probability:
+                            quantity = nights if per_night else rnd.randint(1, 2)
+                            service_date = check_in + timedelta(days=rnd.randint(0, nights - 1))
+                            services_out.write(_line((
+                                self._next_id('booking_services'), booking_id, service_id, quantity,
+                                check_in if per_night else service_date
+                            )))
+                            total += price * quantity
+                self._payments(rnd, payments_out, booking_id, status, check_in, check_out, created, total)
+
+    def _payments(self, rnd, out, booking_id, status, check_in, check_out, created, total):
+        method = rnd.choices(PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS)[0]
+        rows = []
+        if status == 'checked_out':
+            if rnd.random() < 0.03:
+                rows.append((total, 'failed', check_out))
+            rows.append((total, 'completed', check_out))
+        elif status == 'checked_in':
+            rows.append((total, 'completed' if rnd.random() < 0.6 else 'pending', check_in))
+        elif status == 'confirmed' and rnd.random() < 0.5:
+            rows.append((total, 'completed', created))
+        elif status == 'cancelled' and rnd.random() < 0.3:
+            rows.append((total, 'refunded', created))
+        for amount, payment_status, day in rows:
+            out.write(_line((
+                self._next_id('payments'), booking_id, amount.quantize(Decimal('0.01')), method,
+                payment_status, _timestamp(min(day, self.today), rnd)
+            )))
+
+    def generate(self, files):
+        self.guests(files['guests'])
+        rooms = self.rooms(files['rooms'], files.get('cleaning_schedule'))
+        self.bookings(rooms, files['bookings'], files['booking_services'], files['payments'])
+
+
+def _ensure_services(cursor):
+    """
+    Услуги каталога (по названию): недостающие создаются.
+    Возвращает [(service_id, цена, вероятность заказа, за ночь)].
+    """
+    services = []
+    for name, description, price, probability, per_night in SERVICE_CATALOG:
+        cursor.execute("SELECT service_id, price FROM hotel.services WHERE name = %s ORDER BY service_id LIMIT 1",
+                       (name,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO hotel.services (name, description, price, is_active) VALUES (%s, %s, %s, TRUE) "
+                "RETURNING service_id, price",
+                (name, description, price)
+            )
+            row = cursor.fetchone()
+        services.append((row[0], row[1], probability, per_night))
+    return services
+
+
+def load(conn, profile='small', seed=42, today=None, truncate=False):
+    """
+    Генерирует профиль и загружает его через COPY в одной транзакции.
+    Возвращает {таблица: число строк}.
+    """
+    today = today or date.today()
+    with conn.cursor() as cursor:
+        # cleaning_schedule есть только в базе, созданной через create_all (models.py)
+        cursor.execute("SELECT to_regclass('hotel.cleaning_schedule') IS NOT NULL")
+        tables = list(COLUMNS) if cursor.fetchone()[0] else [table for table in COLUMNS if table != 'cleaning_schedule']
+        if truncate:
+            cursor.execute("TRUNCATE hotel.guests, hotel.rooms, hotel.services RESTART IDENTITY CASCADE")
+        offsets = {}
+        for table in COLUMNS:
+            if table in tables:
+                cursor.execute(f"SELECT COALESCE(MAX({PRIMARY_KEYS[table]}), 0) FROM hotel.{table}")
+                offsets[table] = cursor.fetchone()[0]
+            else:
+                offsets[table] = 0
+        services = _ensure_services(cursor)
+
+        files = {table: tempfile.TemporaryFile(mode='w+', encoding='utf-8') for table in tables}
+        try:
+            generator = Generator(profile, seed, today, offsets, services)
+            generator.generate(files)
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"ALTER TABLE hotel.{table} DISABLE TRIGGER USER")
+            counts = {}
+            for table in tables:
+                files[table].seek(0)
+                cursor.copy_expert(
+                    f"COPY hotel.{table} ({', '.join(COLUMNS[table])}) FROM STDIN", files[table]
+                )
+                counts[table] = cursor.rowcount
+                # Последовательности продолжают загруженные идентификаторы
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('hotel.{table}', %s), "
+                    f"(SELECT GREATEST(MAX({PRIMARY_KEYS[table]}), 1) FROM hotel.{table}))",
+                    (PRIMARY_KEYS[table],)
+                )
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"ALTER TABLE hotel.{table} ENABLE TRIGGER USER")
+        finally:
+            for file in files.values():
+                file.close()
+        cursor.execute("SELECT to_regproc('hotel.refresh_analytics_rollups') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT hotel.refresh_analytics_rollups()")
+        for table in tables:
+            cursor.execute(f"ANALYZE hotel.{table}")
+    conn.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PROFILES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--today', type=date.fromisoformat, default=None,
+                        help="date the statuses are relative to (YYYY-MM-DD), default: today")
+    parser.add_argument('--truncate', action='store_true', help="delete all hotel data before loading")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with connect() as conn:
+        counts = load(conn, args.profile, args.seed, args.today, args.truncate)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table:<20}{count:>12}")
+    print(f"{'total':<20}{total:>12}  in {elapsed:.1f} s ({total / elapsed * 60:,.0f} rows/min)")
+
+
+if __name__ == '__main__':
+    main()
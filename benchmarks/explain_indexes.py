@@ -0,0 +1,178 @@
+"""
+Проверка индексов из indexes/01_create_indexes.sql на большом объеме данных:
+для каждого запроса приложения выполняется EXPLAIN (ANALYZE, BUFFERS) и проверяется,
+что в плане есть ожидаемый индекс. Скрипт завершается с кодом 1, если хотя бы
+один запрос выполняется без своего индекса.
+
+Запуск (нужна PostgreSQL со схемой hotel; подключение — DATABASE_URL или DB_*):
+    python benchmarks/explain_indexes.py --profile huge
+--profile предварительно загружает данные генератором datagen.py (к уже существующим);
+без него планы проверяются на уже загруженных данных.
+Флаг --verbose печатает планы целиком.
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import timedelta
+
+from datagen import PROFILES, connect, load
+
+# Совпадает с выражением ограничения no_overlapping_bookings и индекса idx_bookings_period
+OVERLAP = "daterange(b.check_in_date, b.check_out_date, '[]') && daterange(%(check_in)s, %(check_out)s, '[]')"
+
+# (название, запрос, допустимые индексы). Запросы повторяют те, что выполняют
+# маршруты приложения и функции БД
+QUERIES = [
+    (
+        'rooms: free in period (GET /api/rooms?status=available)',
+        f"""
+        SELECT r.room_id FROM hotel.rooms r
+        WHERE NOT EXISTS (
+            SELECT 1 FROM hotel.bookings b
+            WHERE b.room_id = r.room_id AND {OVERLAP} AND b.status <> 'cancelled'
+        )
+        ORDER BY r.room_id LIMIT 100
+        """,
+        ('no_overlapping_bookings', 'idx_bookings_period')
+    ),
+    (
+        'bookings: overlapping period, all rooms',
+        f"""
+        SELECT DISTINCT b.room_id FROM hotel.bookings b
+        WHERE {OVERLAP} AND b.status <> 'cancelled'
+        """,
+        ('idx_bookings_period', 'no_overlapping_bookings')
+    ),
+    (
+        'bookings: room history (full-info)',
+        """
+        SELECT b.* FROM hotel.bookings b
+        WHERE b.room_id = %(room_id)s ORDER BY b.check_in_date
+        """,
+        ('idx_bookings_room_dates',)
+    ),
+    (
+        'booking_services: by booking (full-info)',
+        "SELECT * FROM hotel.booking_services WHERE booking_id = ANY(%(booking_ids)s)",
+        ('idx_booking_services_booking',)
+    ),
+    (
+        'payments: by booking (full-info)',
+        "SELECT * FROM hotel.payments WHERE booking_id = ANY(%(booking_ids)s)",
+        ('idx_payments_booking',)
+    ),
+    (
+        'booking_services: period (/ui/services-by-date)',
+        """
+        SELECT bs.booking_service_id, bs.service_date, r.room_number, s.name, bs.quantity, bs.notes
+        FROM hotel.booking_services bs
+            JOIN hotel.bookings b ON b.booking_id = bs.booking_id
+            JOIN hotel.rooms r ON r.room_id = b.room_id
+            JOIN hotel.services s ON s.service_id = bs.service_id
+        WHERE bs.service_date >= %(check_in)s AND bs.service_date <= %(week_end)s
+        ORDER BY bs.service_date, bs.booking_service_id
+        LIMIT 500
+        """,
+        ('idx_booking_services_date',)
+    ),
+    (
+        'payments: completed in month (revenue)',
+        """
+        SELECT COUNT(*), SUM(amount) FROM hotel.payments
+        WHERE status = 'completed' AND transaction_date >= %(month)s AND transaction_date < %(next_month)s
+        """,
+        ('idx_payments_status_date',)
+    ),
+    (
+        'bookings: by guest (guest_stats)',
+        "SELECT * FROM hotel.bookings WHERE guest_id = %(guest_id)s",
+        ('idx_bookings_guest',)
+    ),
+    (
+        'guests: by passport',
+        "SELECT * FROM hotel.guests WHERE passport_number = %(passport)s",
+        ('guests_passport_number_key',)
+    ),
+]
+
+
+def pick_params(cursor, rnd):
+    """
+    Параметры запросов из существующих данных: номер с бронированиями, его брони, гость, период.
+    """
+    cursor.execute("SELECT MIN(check_in_date), MAX(check_out_date) FROM hotel.bookings")
+    first_day, last_day = cursor.fetchone()
+    if first_day is None:
+        sys.exit("hotel.bookings is empty: run with --profile to generate data")
+    cursor.execute("SELECT MIN(booking_id), MAX(booking_id) FROM hotel.bookings")
+    cursor.execute(
+        "SELECT room_id, guest_id FROM hotel.bookings WHERE booking_id >= %s ORDER BY booking_id LIMIT 1",
+        (rnd.randint(*cursor.fetchone()),)
+    )
+    room_id, guest_id = cursor.fetchone()
+    cursor.execute("SELECT booking_id FROM hotel.bookings WHERE room_id = %s", (room_id,))
+    booking_ids = [booking_id for booking_id, in cursor.fetchall()]
+    cursor.execute("SELECT passport_number FROM hotel.guests WHERE guest_id = %s", (guest_id,))
+    passport, = cursor.fetchone()
+    check_in = first_day + timedelta(days=rnd.randint(0, max((last_day - first_day).days, 0)))
+    month = check_in.replace(day=1)
+    return {
+        'room_id': room_id,
+        'guest_id': guest_id,
+        'passport': passport,
+        'booking_ids': booking_ids,
+        'check_in': check_in,
+        'check_out': check_in + timedelta(days=3),
+        'week_end': check_in + timedelta(days=7),
+        'month': month,
+        'next_month': (month + timedelta(days=32)).replace(day=1)
+    }
+
+
+def plan_indexes(node):
+    """
+    Имена индексов во всех узлах плана.
+    """
+    names = set()
+    if 'Index Name' in node:
+        names.add(node['Index Name'])
+    for child in node.get('Plans', ()):
+        names |= plan_indexes(child)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PROFILES), default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    with connect() as conn, conn.cursor() as cursor:
+        if args.profile:
+            counts = load(conn, args.profile, args.seed)
+            print(f"Loaded profile {args.profile}: {counts['bookings']} bookings")
+        cursor.execute("SELECT COUNT(*) FROM hotel.bookings")
+        print(f"hotel.bookings: {cursor.fetchone()[0]} rows")
+
+        params = pick_params(cursor, random.Random(args.seed))
+        failed = 0
+        print(f"{'query':<58}{'ms':>10}  indexes")
+        for name, sql, expected in QUERIES:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            plan, = cursor.fetchone()[0]
+            used = plan_indexes(plan['Plan'])
+            ok = bool(used & set(expected))
+            failed += not ok
+            print(f"{name:<58}{plan['Execution Time']:>10.2f}  "
+                  f"{', '.join(sorted(used)) or 'seq scan'}{'' if ok else '  <-- expected ' + ' / '.join(expected)}")
+            if args.verbose:
+                print(json.dumps(plan['Plan'], indent=2, default=str))
+
+    if failed:
+        sys.exit(f"{failed} of {len(QUERIES)} queries do not use their index")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Микробенчмарк InputValidator.is_safe_input: стоимость проверки одного тела запроса
+для типичного и большого POST /api/bookings.
+
+Запуск:
+    python benchmarks/input_validator.py
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from input_validator import InputValidator  # noqa: E402
+
+
+def booking_payload(services):
+    return {
+        "room_id": 7,
+        "check_in_date": "2025-07-01",
+        "check_out_date": "2025-07-05",
+        "adults": 2,
+        "children": 1,
+        "guest": {
+            "passport_number": "AB1234567",
+            "first_name": "Иван",
+            "last_name": "Иванов",
+            "phone": "+79990001122",
+            "email": "ivan@example.com",
+            "address": "г. Москва, ул. Ленина, д. 1, кв. 10 — вход со двора, домофон 10"
+        },
+        "payment_method": "credit_card",
+        "services": [
+            {"service_id": i, "quantity": 1 + i % 3, "notes": f"Пожелание гостя номер {i}: поздний завтрак"}
+            for i in range(services)
+        ]
+    }
+
+
+PAYLOADS = {
+    'typical': booking_payload(3),
+    'large': booking_payload(500),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, payload in PAYLOADS.items():
+        assert InputValidator.is_safe_input(payload)
+        number = args.number if name == 'typical' else max(1, args.number // 50)
+        best = min(timeit.repeat(lambda: InputValidator.is_safe_input(payload), number=number, repeat=5))
+        print(f"{name:<8} {best / number * 1e6:10.1f} us per payload")
+
+
+if __name__ == '__main__':
+    main()
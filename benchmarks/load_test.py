@@ -0,0 +1,124 @@
+"""
+Простой генератор HTTP-нагрузки без внешних зависимостей.
+
+Каждый поток держит собственное keep-alive соединение (http.client) и по кругу
+запрашивает заданные маршруты. По окончании выводится число запросов в секунду
+и перцентили задержки p50/p99 по каждому маршруту.
+
+Запуск против работающего сервера (например, gunicorn -c gunicorn.conf.py wsgi:app):
+    python benchmarks/load_test.py --url http://localhost:5000 --concurrency 32 --duration 30
+"""
+import argparse
+import http.client
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/rooms',
+    '/ui/rooms?check_in=2025-06-01&check_out=2025-06-05',
+    '/api/rooms/101/full-info',
+    '/api/services',
+    '/ui/services-by-date?start_date=2025-06-01&end_date=2025-06-30',
+    '/api/guests?limit=100',
+    '/api/bookings?limit=100',
+    '/api/payments?limit=100',
+]
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_load(base_url, paths, concurrency, duration, request_fn=None):
+    """
+    Нагружает сервер в течение duration секунд в concurrency потоков.
+    request_fn(connection, path) -> (status, extra) позволяет подменить способ запроса;
+    непустые extra (например, значения заголовков) собираются по маршрутам.
+    Возвращает (elapsed, {path: [задержки]}, {path: число ошибок}, {path: [extra]}).
+    """
+    target = urlsplit(base_url)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    extras = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def default_request(connection, path):
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status, None
+
+    request_fn = request_fn or default_request
+
+    def worker(offset):
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        local_extras = defaultdict(list)
+        index = offset
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status, extra = request_fn(connection, path)
+            except (OSError, http.client.HTTPException):
+                local_errors[path] += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                continue
+            local_latencies[path].append(time.perf_counter() - started)
+            if extra is not None:
+                local_extras[path].append(extra)
+            if status >= 400:
+                local_errors[path] += 1
+        connection.close()
+        with lock:
+            for path, values in local_latencies.items():
+                latencies[path].extend(values)
+            for path, count in local_errors.items():
+                errors[path] += count
+            for path, values in local_extras.items():
+                extras[path].extend(values)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors, extras
+
+
+def print_report(elapsed, latencies, errors):
+    total = sum(len(values) for values in latencies.values())
+    print(f"{'path':<64}{'req':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for path in sorted(latencies):
+        values = latencies[path]
+        print(f"{path[:63]:<64}{len(values):>8}{errors[path]:>6}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 0.5) * 1000:>9.1f}{percentile(values, 0.99) * 1000:>9.1f}")
+    everything = [value for values in latencies.values() for value in values]
+    print(f"{'TOTAL':<64}{total:>8}{sum(errors.values()):>6}{total / elapsed:>9.1f}"
+          f"{percentile(everything, 0.5) * 1000:>9.1f}{percentile(everything, 0.99) * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--path', action='append', help='маршрут для нагрузки (можно указать несколько раз)')
+    args = parser.parse_args()
+
+    elapsed, latencies, errors, _ = run_load(args.url, args.path or DEFAULT_PATHS, args.concurrency, args.duration)
+    print_report(elapsed, latencies, errors)
+
+
+if __name__ == '__main__':
+    main()
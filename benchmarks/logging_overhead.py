@@ -0,0 +1,176 @@
+"""
+Влияние журналирования на задержку запросов: прежняя настройка (StreamHandler и
+RotatingFileHandler на корневом логгере уровня DEBUG, сообщения f-строками) против
+очереди QueueHandler/QueueListener из app/logger_config.py (JSON, %-формат).
+
+Для каждого режима в отдельном процессе запускается небольшое Flask-приложение
+(многопоточный сервер Werkzeug, без БД), маршруты которого журналируют так же, как
+маршруты app/main.py: /ok — запись INFO и отфильтрованная DEBUG, /error — ERROR
+с трассировкой. Консоль процесса сервера направляется в /dev/null, файл журнала —
+во временный каталог с ротацией по --max-bytes.
+
+Запуск:
+    python benchmarks/logging_overhead.py --concurrency 16 --duration 10
+    python benchmarks/logging_overhead.py --log-requests --max-bytes 65536
+--log-requests включает запись о каждом запросе (LOG_REQUESTS=1) в режиме queue.
+Сквозное сравнение на полном API — benchmarks/api_suite.py с базовым файлом,
+записанным до изменения настройки журналирования.
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from logging.handlers import RotatingFileHandler
+
+from load_test import percentile, run_load
+
+MODES = ('legacy', 'queue')
+# Девять успешных запросов на один с ошибкой
+PATHS = ['/ok'] * 9 + ['/error']
+
+
+def legacy_logger(log_file, max_bytes):
+    """
+    Прежний setup_logger: обработчики вызываются синхронно в потоке запроса.
+    """
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=5)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    return logger
+
+
+def serve(mode, port, log_file, max_bytes):
+    """
+    Процесс сервера с выбранной настройкой журналирования.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from flask import Flask, jsonify, request
+    from werkzeug.serving import make_server
+
+    app = Flask(__name__)
+    room = {'room_id': 101, 'room_number': '101', 'room_type': 'Standard', 'status': 'available'}
+
+    if mode == 'legacy':
+        logger = legacy_logger(log_file, max_bytes)
+
+        @app.route('/ok')
+        def ok():
+            logger.debug(f"Room lookup {request.args.to_dict()} -> {room}")
+            logger.info(f"Rooms requested: {request.path}, {len(room)} fields")
+            return jsonify(room)
+
+        @app.route('/error')
+        def error():
+            try:
+                raise ValueError(f"Invalid date format: {request.args.get('check_in')}")
+            except Exception as e:
+                logger.error(f"Error retrieving rooms: {str(e)}", exc_info=True)
+                return jsonify({"error": "Internal server error"}), 500
+    else:
+        os.environ.update({'LOG_FILE': log_file, 'LOG_FILE_MAX_BYTES': str(max_bytes)})
+        from app.logger_config import init_request_logging, setup_logger
+        logger = setup_logger()
+        init_request_logging(app)
+
+        @app.route('/ok')
+        def ok():
+            logger.debug("Room lookup %s -> %s", request.args.to_dict(), room)
+            logger.info("Rooms requested: %s, %s fields", request.path, len(room))
+            return jsonify(room)
+
+        @app.route('/error')
+        def error():
+            try:
+                raise ValueError(f"Invalid date format: {request.args.get('check_in')}")
+            except Exception as e:
+                logger.error("Error retrieving rooms: %s", e, exc_info=True)
+                return jsonify({"error": "Internal server error"}), 500
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_server(mode, port, log_file, args, timeout=30):
+    env = dict(os.environ, LOG_REQUESTS='1' if args.log_requests else '0')
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+         '--log-file', log_file, '--max-bytes', str(args.max_bytes)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Server ({mode}) exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/ok', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit(f"Server ({mode}) did not start")
+
+
+def measure(mode, args, directory):
+    log_file = os.path.join(directory, f'{mode}.log')
+    process = start_server(mode, args.port, log_file, args)
+    try:
+        run_load(f'http://127.0.0.1:{args.port}', PATHS, args.concurrency, 1)  # Прогрев
+        elapsed, latencies, errors, _ = run_load(
+            f'http://127.0.0.1:{args.port}', PATHS, args.concurrency, args.duration
+        )
+    finally:
+        process.terminate()
+        process.wait()
+    values = [value for path_values in latencies.values() for value in path_values]
+    failed = sum(errors.values()) - len(latencies['/error'])  # /error отвечает 500 намеренно
+    return {
+        'requests': len(values),
+        'failed': failed,
+        'rps': len(values) / elapsed,
+        'p50': percentile(values, 0.5) * 1000,
+        'p95': percentile(values, 0.95) * 1000,
+        'p99': percentile(values, 0.99) * 1000,
+        'max': max(values, default=0.0) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--log-file', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--max-bytes', type=int, default=1024 * 1024)
+    parser.add_argument('--log-requests', action='store_true')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.log_file, args.max_bytes)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {mode: measure(mode, args, directory) for mode in MODES}
+
+    print(f"{'mode':<10}{'req':>9}{'fail':>6}{'rps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['requests']:>9}{result['failed']:>6}{result['rps']:>10.1f}"
+              f"{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}{result['max']:>9.2f}")
+    legacy, queued = results['legacy'], results['queue']
+    print(f"queue vs legacy: p95 {queued['p95'] - legacy['p95']:+.2f} ms, "
+          f"p99 {queued['p99'] - legacy['p99']:+.2f} ms, rps {queued['rps'] / legacy['rps'] - 1:+.1%}")
+
+
+if __name__ == '__main__':
+    main()
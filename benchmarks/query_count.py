@@ -0,0 +1,88 @@
+"""
+Подсчет SQL-запросов на один вызов списочных маршрутов при разном объеме данных.
+
+Количество запросов не должно зависеть от числа строк в ответе: связи, которые
+читают методы to_dict, загружаются в том же запросе (см. models.to_dict_options).
+
+Запуск (нужна PostgreSQL со схемой hotel, переменные DB_* как для приложения):
+    python benchmarks/query_count.py --seed 10000
+--seed N предварительно добавляет N бронирований (и нужные для них номера и гостя).
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.main import create_app  # noqa: E402
+from app.models import db, Guest, Room, Booking  # noqa: E402
+
+app = create_app()
+
+BOOKINGS_PER_ROOM = 100
+ENDPOINTS = ['/api/bookings', '/api/cleaning-schedule', '/api/payments', '/api/guests']
+
+
+def seed(count):
+    """
+    Добавляет count непересекающихся однодневных бронирований.
+    """
+    tag = uuid.uuid4().hex[:8].upper()
+    guest = Guest(passport_number=f"QC{tag}", first_name='Query', last_name='Count', phone='+70000000000')
+    db.session.add(guest)
+    db.session.flush()
+    room_count = (count + BOOKINGS_PER_ROOM - 1) // BOOKINGS_PER_ROOM
+    rooms = db.session.execute(
+        insert(Room).returning(Room.room_id),
+        [{'room_number': f"Q{tag}{i}"[:10], 'type': 'Basic', 'capacity': 2, 'daily_rate': 1000}
+         for i in range(room_count)]
+    ).scalars().all()
+    rows = []
+    start = date(2040, 1, 1)
+    for i in range(count):
+        day = start + timedelta(days=(i % BOOKINGS_PER_ROOM) * 2)
+        rows.append({
+            'guest_id': guest.guest_id,
+            'room_id': rooms[i // BOOKINGS_PER_ROOM],
+            'check_in_date': day,
+            'check_out_date': day + timedelta(days=1),
+            'status': 'checked_out',
+            'adults': 1,
+            'children': 0
+        })
+    db.session.execute(insert(Booking), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--limits', default='10,100,1000,all')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.seed:
+            seed(args.seed)
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+
+    client = app.test_client()
+    print(f"{'endpoint':<28}{'limit':>8}{'rows':>8}{'queries':>9}{'ms':>10}")
+    for endpoint in ENDPOINTS:
+        for limit in args.limits.split(','):
+            url = endpoint if limit == 'all' else f"{endpoint}?limit={limit}"
+            statements.clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            rows = len(response.get_json()) if response.status_code == 200 else response.status_code
+            print(f"{endpoint:<28}{limit:>8}{rows:>8}{len(statements):>9}{elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Сравнение обычного и потокового ответа списочного маршрута: время до первого байта,
+полное время и пиковое потребление памяти Python (tracemalloc) в процессе приложения.
+
+Запуск (нужна PostgreSQL со схемой hotel, переменные DB_* как для приложения):
+    python benchmarks/streaming.py --seed-payments 1000000
+--seed-payments N предварительно добавляет N платежей к первому бронированию.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.main import create_app  # noqa: E402
+from app.models import db, Booking, Payment  # noqa: E402
+
+app = create_app()
+
+SEED_CHUNK = 50000
+
+
+def seed_payments(count):
+    booking_id = db.session.query(Booking.booking_id).order_by(Booking.booking_id).limit(1).scalar()
+    if booking_id is None:
+        raise SystemExit("No bookings to attach payments to")
+    for offset in range(0, count, SEED_CHUNK):
+        rows = [
+            {'booking_id': booking_id, 'amount': 100 + i % 900, 'method': 'cash', 'status': 'completed'}
+            for i in range(offset, min(count, offset + SEED_CHUNK))
+        ]
+        db.session.execute(insert(Payment), rows)
+        db.session.commit()
+        print(f"seeded {offset + len(rows)} payments", end='\r')
+    print()
+
+
+def measure(client, url):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte or total, total, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed-payments', type=int, default=0)
+    parser.add_argument('--endpoint', default='/api/payments')
+    args = parser.parse_args()
+
+    if args.seed_payments:
+        with app.app_context():
+            seed_payments(args.seed_payments)
+
+    client = app.test_client()
+    print(f"{'mode':<10}{'TTFB, s':>10}{'total, s':>10}{'peak MiB':>10}{'body MiB':>10}")
+    for mode, suffix in (('buffered', ''), ('json', '?stream=1'), ('ndjson', '?format=ndjson')):
+        first_byte, total, peak, size = measure(client, args.endpoint + suffix)
+        print(f"{mode:<10}{first_byte:>10.3f}{total:>10.3f}{peak / 2 ** 20:>10.1f}{size / 2 ** 20:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,51 @@
 from PyQt5 import QtCore, QtGui, QtWidgets
 from room_info_window import RoomInfoWindow  # Импортируем окно информации о номере
 from booking import GuestBookingDialog  # Импортируем диалог бронирования
-import requests  # Для HTTP-запросов
+import requests  # Для обработки сетевых ошибок
+from api_client import ApiError, api_client  # Общая сессия и условные GET-запросы
+from workers import api_workers  # Запросы к серверу вне потока интерфейса
+from table_models import RoomsTableModel, ServicesTableModel  # Модели таблиц с подгрузкой и обновлением по разнице
 import traceback  # Для отладки ошибок
 
 # Класс делегата для кастомной отрисовки ячеек таблицы
 class TableItemDelegate(QtWidgets.QStyledItemDelegate):
+    ROW_HEIGHT = 40  # Фиксированная высота строки
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Кисти и перья создаются один раз: paint вызывается для каждой видимой ячейки.
+        # Градиент задан в координатах ячейки (ObjectBoundingMode), поэтому подходит для любой
+        self.selected_brush = QtGui.QBrush(QtGui.QColor(10, 80, 200))
+        gradient = QtGui.QLinearGradient(0, 0, 0, 1)
+        gradient.setCoordinateMode(QtGui.QGradient.ObjectBoundingMode)
+        gradient.setColorAt(0, QtGui.QColor(240, 240, 240))
+        gradient.setColorAt(0.5, QtGui.QColor(250, 250, 250))
+        gradient.setColorAt(1, QtGui.QColor(240, 240, 240))
+        self.row_brush = QtGui.QBrush(gradient)
+        self.selected_pen = QtGui.QPen(QtCore.Qt.white)
+        self.text_pen = QtGui.QPen(QtCore.Qt.black)
+
     def paint(self, painter, option, index):
         """
         Отрисовка ячеек таблицы с градиентом и выделением.
         """
-        if option.state & QtWidgets.QStyle.State_Selected:
-            # Если строка выделена - сплошной цвет
-            painter.fillRect(option.rect, QtGui.QColor(10, 80, 200))
-        else:
-            # Для обычных строк - вертикальный градиент
-            gradient = QtGui.QLinearGradient(option.rect.topLeft(), option.rect.bottomLeft())
-            gradient.setColorAt(0, QtGui.QColor(240, 240, 240))
-            gradient.setColorAt(0.5, QtGui.QColor(250, 250, 250))
-            gradient.setColorAt(1, QtGui.QColor(240, 240, 240))
-            painter.fillRect(option.rect, gradient)
-        
+        selected = option.state & QtWidgets.QStyle.State_Selected
+        # Если строка выделена - сплошной цвет, для обычных строк - вертикальный градиент
+        painter.fillRect(option.rect, self.selected_brush if selected else self.row_brush)
+
         # Отрисовка текста
-        painter.save()
-        text_color = QtCore.Qt.white if option.state & QtWidgets.QStyle.State_Selected else QtCore.Qt.black
-        painter.setPen(text_color)
         text = index.data(QtCore.Qt.DisplayRole)
         if text is not None:
-            painter.drawText(option.rect, QtCore.Qt.AlignCenter | QtCore.Qt.AlignVCenter, str(text))
-        painter.restore()
+            painter.save()
+            painter.setPen(self.selected_pen if selected else self.text_pen)
+            painter.drawText(option.rect, QtCore.Qt.AlignCenter, str(text))
+            painter.restore()
 
     def sizeHint(self, option, index):
         """
         Устанавливает высоту строки таблицы.
         """
-        size = super().sizeHint(option, index)
-        size.setHeight(40)  # Фиксированная высота строки
-        return size
+        return QtCore.QSize(option.rect.width(), self.ROW_HEIGHT)
 
     def createEditor(self, parent, option, index):
         """
@@ -148,9 +157,18 @@ class Ui_MainWindow(object):
         self.rooms_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
         self.rooms_table.verticalHeader().setVisible(False)
         self.rooms_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.rooms_table.setItemDelegate(TableItemDelegate())
+        self.rooms_table.setItemDelegate(TableItemDelegate(self.rooms_table))
         self.rooms_table.setShowGrid(False)
-        self.rooms_table.verticalHeader().setDefaultSectionSize(40)
+        # Фиксированная высота строк: представлению не нужно измерять строки при прокрутке
+        self.rooms_table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.rooms_table.verticalHeader().setDefaultSectionSize(TableItemDelegate.ROW_HEIGHT)
+        # Модель создается один раз; новые результаты поиска применяются к ней по разнице
+        self.rooms_model = RoomsTableModel(self.rooms_table)
+        self.rooms_model.on_loaded = self.on_rooms_loaded
+        self.rooms_model.on_error = lambda e: QtWidgets.QMessageBox.critical(
+            self.main_window, "Ошибка", f"Ошибка при загрузке данных:\n{str(e)}"
+        )
+        self.rooms_table.setModel(self.rooms_model)
 
         layout.addWidget(self.rooms_table)
         self.tabWidget.addTab(self.rooms_tab, "Номера")
@@ -192,9 +210,12 @@ class Ui_MainWindow(object):
         self.service_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
         self.service_table.verticalHeader().setVisible(False)
         self.service_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.service_table.setItemDelegate(TableItemDelegate())
+        self.service_table.setItemDelegate(TableItemDelegate(self.service_table))
         self.service_table.setShowGrid(False)
-        self.service_table.verticalHeader().setDefaultSectionSize(40)
+        self.service_table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.service_table.verticalHeader().setDefaultSectionSize(TableItemDelegate.ROW_HEIGHT)
+        self.services_model = ServicesTableModel(self.service_table)
+        self.service_table.setModel(self.services_model)
 
         service_layout.addWidget(self.service_table)
         self.tabWidget.addTab(self.service_tab, "Услуги")
@@ -278,20 +299,20 @@ class Ui_MainWindow(object):
         self.info_button.clicked.connect(self.show_room_info)
         self.book_button.clicked.connect(self.book_room)
 
-        if self.rooms_table.selectionModel():
-            self.rooms_table.selectionModel().selectionChanged.connect(self.on_room_selected)
+        # Модель номеров не пересоздается, поэтому сигналы подключаются один раз
+        self.rooms_table.selectionModel().selectionChanged.connect(self.on_room_selected)
+        self.rooms_model.dataChanged.connect(self.on_room_selected)  # Статус выбранного номера мог измениться
 
-    def on_room_selected(self, selected, deselected):
+    def on_room_selected(self, *args):
         """
         Обработка выбора строки в таблице номеров.
         """
-        has_selection = len(selected.indexes()) > 0
+        selected = self.rooms_table.selectionModel().selectedRows()
+        has_selection = len(selected) > 0
         self.info_button.setEnabled(has_selection)
 
         if has_selection:
-            row = selected.indexes()[0].row()
-            status_item = self.rooms_table.model().index(row, 3)  # 3 - столбец статуса
-            status = status_item.data()
+            status = self.rooms_model.index(selected[0].row(), RoomsTableModel.STATUS).data()
             is_available = status == "Свободен"
             self.book_button.setEnabled(is_available)
         else:
@@ -305,218 +326,163 @@ class Ui_MainWindow(object):
         if not selected:
             return
         row = selected[0].row()
-        room_number = self.rooms_table.model().index(row, 0).data()
+        room_number = self.rooms_model.index(row, RoomsTableModel.NUMBER).data()
         self.info_window = RoomInfoWindow(room_number, self.main_window)
         self.info_window.exec_()
 
     def fetch_rooms_data(self):
         """
-        Получение данных о номерах с сервера.
+        Запрос списка номеров с сервера. Запрос выполняется в фоне; новый поиск
+        отменяет предыдущий, если ответ на него еще не пришел.
         """
-        try:
-            check_in = self.check_in_date.date()
-            check_out = self.check_out_date.date()
-            if check_out <= check_in:
-                QtWidgets.QMessageBox.warning(self.main_window, "Ошибка дат", "Дата выезда должна быть позже даты заезда")
-                return
-
-            params = {
-                "check_in": check_in.toString("yyyy-MM-dd"),
-                "check_out": check_out.toString("yyyy-MM-dd")
-            }
+        check_in = self.check_in_date.date()
+        check_out = self.check_out_date.date()
+        if check_out <= check_in:
+            QtWidgets.QMessageBox.warning(self.main_window, "Ошибка дат", "Дата выезда должна быть позже даты заезда")
+            return
 
-            status = self.status_combo.currentText()
-            if status != "Все":
-                params["status"] = {
-                    "Свободен": "available",
-                    "Занят": "occupied",
-                    "На обслуживании": "maintenance"
-                }.get(status)
-
-            guests = self.guests_combo.currentText()
-            if guests == "4+":
-                params["min_capacity"] = 4
-            else:
-                params["capacity"] = guests
-
-            response = requests.get("http://localhost:5000/ui/rooms", params=params, timeout=10)
-            response.raise_for_status()
-            rooms_data = response.json()
-
-            model = QtGui.QStandardItemModel()
-            model.setHorizontalHeaderLabels(["Номер", "Тип", "Вместимость", "Статус", "Цена за сутки"])
-
-            type_map = {
-                'Basic': 'Базовый',
-                'Advanced': 'Продвинутый',
-                'Business': 'Бизнес',
-                'Dorm': 'Общий'
-            }
+        params = {
+            "check_in": check_in.toString("yyyy-MM-dd"),
+            "check_out": check_out.toString("yyyy-MM-dd")
+        }
+
+        status = self.status_combo.currentText()
+        if status != "Все":
+            params["status"] = {
+                "Свободен": "available",
+                "Занят": "occupied",
+                "На обслуживании": "maintenance"
+            }.get(status)
+
+        guests = self.guests_combo.currentText()
+        if guests == "4+":
+            params["min_capacity"] = 4
+        else:
+            params["capacity"] = guests
 
-            for room in rooms_data:
-                if not all(k in room for k in ['room_number', 'type', 'capacity', 'status', 'daily_rate']):
-                    continue
-
-                status = room.get('dynamic_status', room['status'])
-                status_text = {
-                    'available': 'Свободен',
-                    'occupied': 'Занят',
-                    'maintenance': 'На обслуживании'
-                }.get(status, 'Неизвестно')
-
-                row = [
-                    QtGui.QStandardItem(str(room['room_number'])),
-                    QtGui.QStandardItem(type_map.get(room['type'], room['type'])),
-                    QtGui.QStandardItem(str(room['capacity'])),
-                    QtGui.QStandardItem(status_text),
-                    QtGui.QStandardItem(f"{room['daily_rate']:,.2f} ₽".replace(",", " "))
-                ]
-                model.appendRow(row)
-
-            self.rooms_table.setModel(model)
-            self.rooms_table.selectionModel().selectionChanged.connect(self.on_room_selected)
-            self.info_button.setEnabled(False)
-            self.book_button.setEnabled(False)
+        # Если страница не изменилась, сервер ответит 304 и вернется сохраненный ответ;
+        # следующие страницы подгружаются при прокрутке
+        self.rooms_model.load(params)
 
-            if model.rowCount() == 0:
-                QtWidgets.QMessageBox.information(self.main_window, "Результаты поиска", "Номера по заданным критериям не найдены")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self.main_window, "Ошибка", f"Ошибка при загрузке данных:\n{str(e)}")
+    def on_rooms_loaded(self):
+        """
+        Список номеров загружен: выделение сохраняется, если номер остался в списке.
+        """
+        self.on_room_selected()
+        if self.rooms_model.rowCount() == 0:
+            QtWidgets.QMessageBox.information(self.main_window, "Результаты поиска", "Номера по заданным критериям не найдены")
 
     def fetch_service_data(self):
         """
-        Получение данных об услугах с сервера.
+        Запрос услуг за период с сервера (в фоне, новый запрос отменяет предыдущий).
         """
-        try:
-            start_date = self.service_start_date.date().toString("yyyy-MM-dd")
-            end_date = self.service_end_date.date().toString("yyyy-MM-dd")
-            if self.service_start_date.date() >= self.service_end_date.date():
-                QtWidgets.QMessageBox.warning(self.main_window, "Ошибка дат", "Дата окончания должна быть позже начала")
-                return
-
-            response = requests.get(
-                "http://localhost:5000/ui/services-by-date",
-                params={"start_date": start_date, "end_date": end_date},
-                timeout=10
-            )
-            response.raise_for_status()
-            services_data = response.json()
+        start_date = self.service_start_date.date().toString("yyyy-MM-dd")
+        end_date = self.service_end_date.date().toString("yyyy-MM-dd")
+        if self.service_start_date.date() >= self.service_end_date.date():
+            QtWidgets.QMessageBox.warning(self.main_window, "Ошибка дат", "Дата окончания должна быть позже начала")
+            return
 
-            model = QtGui.QStandardItemModel()
-            model.setHorizontalHeaderLabels(["Дата", "Номер", "Услуга", "Кол-во", "Примечание"])
+        api_workers.submit(
+            api_client.get_json, "/ui/services-by-date",
+            params={"start_date": start_date, "end_date": end_date}, timeout=10,
+            key="services", on_result=self.show_service_data, on_error=self.on_service_error
+        )
 
-            for service in services_data:
-                model.appendRow([
-                    QtGui.QStandardItem(service.get("date", "—")),
-                    QtGui.QStandardItem(str(service.get("room_number", "—"))),
-                    QtGui.QStandardItem(service.get("service_name", "—")),
-                    QtGui.QStandardItem(str(service.get("quantity", "—"))),
-                    QtGui.QStandardItem(service.get("notes", ""))
-                ])
+    def show_service_data(self, services_data):
+        """
+        Обновление таблицы услуг ответом сервера.
+        """
+        self.services_model.set_rows(services_data)
 
-            self.service_table.setModel(model)
+        if self.services_model.rowCount() == 0:
+            QtWidgets.QMessageBox.information(self.main_window, "Результаты", "Услуги за выбранный период не найдены.")
 
-            if model.rowCount() == 0:
-                QtWidgets.QMessageBox.information(self.main_window, "Результаты", "Услуги за выбранный период не найдены.")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self.main_window, "Ошибка", f"Ошибка при загрузке услуг:\n{str(e)}")
-            print(traceback.format_exc())
+    def on_service_error(self, error):
+        QtWidgets.QMessageBox.critical(self.main_window, "Ошибка", f"Ошибка при загрузке услуг:\n{str(error)}")
+        print("".join(traceback.format_exception(type(error), error, error.__traceback__)))
 
     def book_room(self):
         """
-        Бронирование выбранного номера.
+        Бронирование выбранного номера. Запрос отправляется в фоне;
+        кнопка бронирования недоступна до ответа сервера.
         """
         selected = self.rooms_table.selectionModel().selectedRows()
         if not selected:
             return
 
         row = selected[0].row()
-        room_number = self.rooms_table.model().index(row, 0).data()
-        capacity = int(self.rooms_table.model().index(row, 2).data())
+        room_id = self.rooms_model.key(row)
+        room_number = self.rooms_model.index(row, RoomsTableModel.NUMBER).data()
+        capacity = int(self.rooms_model.index(row, RoomsTableModel.CAPACITY).data())
 
         booking_dialog = GuestBookingDialog(room_number=room_number, room_capacity=capacity)
-        if booking_dialog.exec_() == QtWidgets.QDialog.Accepted:
-            try:
-                # Получаем данные из формы
-                guest_data = booking_dialog.form.get_data()
-                
-                # Получаем room_id через прямой запрос к API
-                response = requests.get(
-                    f"http://localhost:5000/api/rooms?room_number={room_number}",
-                    timeout=5
-                )
-                response.raise_for_status()
-                rooms = response.json()
-                
-                if not rooms or not isinstance(rooms, list) or len(rooms) == 0:
-                    raise Exception("Не удалось получить информацию о номере")
-                
-                room_id = rooms[0].get("room_id")
-                if not room_id:
-                    raise Exception("Номер не найден в базе данных")
-
-                # Формируем данные для отправки
-                booking_data = {
-                    "room_id": room_id,
-                    "check_in_date": guest_data["check_in"],
-                    "check_out_date": guest_data["check_out"],
-                    "adults": booking_dialog.adults_spin.value(),
-                    "children": booking_dialog.children_spin.value(),
-                    "guest": {
-                        "passport_number": guest_data["passport_number"],
-                        "first_name": guest_data["first_name"],
-                        "last_name": guest_data["last_name"],
-                        "phone": guest_data["phone"],
-                        "email": guest_data.get("email"),
-                        "address": None
-                    },
-                    "payment_method": booking_dialog.payment_map.get(
-                        booking_dialog.payment_combo.currentText(),
-                        "cash"  # значение по умолчанию
-                    ),
-                    "services": [
-                        {
-                            "service_id": int(service["service_id"]),
-                            "quantity": int(service["quantity"])
-                        }
-                        for service in booking_dialog.get_selected_services()
-                        if service["quantity"] > 0
-                    ]
+        if booking_dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
+
+        # Получаем данные из формы
+        guest_data = booking_dialog.form.get_data()
+
+        # Формируем данные для отправки; room_id — ключ строки в модели номеров
+        booking_data = {
+            "room_id": room_id,
+            "check_in_date": guest_data["check_in"],
+            "check_out_date": guest_data["check_out"],
+            "adults": booking_dialog.adults_spin.value(),
+            "children": booking_dialog.children_spin.value(),
+            "guest": {
+                "passport_number": guest_data["passport_number"],
+                "first_name": guest_data["first_name"],
+                "last_name": guest_data["last_name"],
+                "phone": guest_data["phone"],
+                "email": guest_data.get("email"),
+                "address": None
+            },
+            "payment_method": booking_dialog.payment_map.get(
+                booking_dialog.payment_combo.currentText(),
+                "cash"  # значение по умолчанию
+            ),
+            "services": [
+                {
+                    "service_id": int(service["service_id"]),
+                    "quantity": int(service["quantity"])
                 }
+                for service in booking_dialog.get_selected_services()
+                if service["quantity"] > 0
+            ]
+        }
 
-                # Отправка запроса
-                response = requests.post(
-                    "http://localhost:5000/api/bookings",
-                    json=booking_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10
-                )
-                
-                # Проверка ответа
-                if response.status_code != 201:
-                    error_msg = response.json().get("error", "Неизвестная ошибка сервера")
-                    raise Exception(f"Ошибка сервера: {error_msg}")
-
-                QtWidgets.QMessageBox.information(
-                    self.main_window,
-                    "Успех",
-                    f"Номер {room_number} успешно забронирован!"
-                )
-                self.fetch_rooms_data()  # Обновляем список номеров
-
-            except requests.exceptions.RequestException as e:
-                QtWidgets.QMessageBox.critical(
-                    self.main_window,
-                    "Ошибка сети",
-                    f"Ошибка соединения с сервером:\n{str(e)}"
-                )
-            except Exception as e:
-                QtWidgets.QMessageBox.critical(
-                    self.main_window,
-                    "Ошибка бронирования",
-                    f"Произошла ошибка:\n{str(e)}\n\nПроверьте данные и повторите попытку."
-                )
-                print("Подробности ошибки:", traceback.format_exc())
+        self.book_button.setEnabled(False)
+        api_workers.submit(
+            api_client.post_json, "/api/bookings", booking_data, timeout=10,
+            key="booking",
+            on_result=lambda _: self.on_room_booked(room_number),
+            on_error=self.on_booking_error
+        )
+
+    def on_room_booked(self, room_number):
+        QtWidgets.QMessageBox.information(
+            self.main_window,
+            "Успех",
+            f"Номер {room_number} успешно забронирован!"
+        )
+        self.fetch_rooms_data()  # Обновляем список номеров
+
+    def on_booking_error(self, error):
+        self.book_button.setEnabled(True)
+        if isinstance(error, requests.exceptions.RequestException):
+            QtWidgets.QMessageBox.critical(
+                self.main_window,
+                "Ошибка сети",
+                f"Ошибка соединения с сервером:\n{str(error)}"
+            )
+            return
+        message = f"Ошибка сервера: {error}" if isinstance(error, ApiError) else str(error)
+        QtWidgets.QMessageBox.critical(
+            self.main_window,
+            "Ошибка бронирования",
+            f"Произошла ошибка:\n{message}\n\nПроверьте данные и повторите попытку."
+        )
+        print("Подробности ошибки:", "".join(traceback.format_exception(type(error), error, error.__traceback__)))
 
 if __name__ == "__main__":
     import sys
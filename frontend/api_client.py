@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_BASE_URL = "http://localhost:5000"
+# Соединений в пуле: по одному на поток workers.ApiWorkers
+POOL_SIZE = 4
+# Сколько последних URL хранится для условных GET-запросов (страницы списков, карточки номеров)
+CACHE_MAX_ENTRIES = 256
+
+
+class ApiError(Exception):
+    """
+    Сервер вернул ошибку; текст берется из поля error ответа.
+    """
+
+
+class ApiClient:
+    """
+    HTTP-клиент приложения: одна сессия requests (keep-alive, общий пул соединений)
+    и условные GET-запросы. Методы потокобезопасны и вызываются из потоков
+    workers.ApiWorkers, а не из потока интерфейса. Для каждого URL запоминаются ETag / Last-Modified и
+    последний ответ; если сервер отвечает 304, возвращается сохраненный ответ.
+    Хранятся ответы CACHE_MAX_ENTRIES последних URL (LRU), как в MemoryBackend сервера.
+    """
+
+    def __init__(self, base_url=API_BASE_URL):
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # url -> (etag, last_modified, payload, next_cursor)
+
+    def get_json(self, path, params=None, timeout=10):
+        """
+        GET-запрос с If-None-Match / If-Modified-Since.
+        Возвращает разобранный JSON (из ответа или из локального кэша при 304).
+        """
+        return self._conditional_get(path, params, timeout)[0]
+
+    def get_page(self, path, params=None, timeout=10):
+        """
+        Страница списка с keyset-пагинацией (?after_id=&limit=).
+        Возвращает (строки, курсор следующей страницы или None).
+        """
+        return self._conditional_get(path, params, timeout)
+
+    def _conditional_get(self, path, params, timeout):
+        url = requests.Request('GET', self.base_url + path, params=params).prepare().url
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached:
+                self._cache.move_to_end(url)
+        headers = {}
+        if cached:
+            etag, last_modified, _, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            return cached[2], cached[3]
+        response.raise_for_status()
+        payload = response.json()
+        next_cursor = response.headers.get("X-Next-Cursor")
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._cache[url] = (etag, last_modified, payload, next_cursor)
+                self._cache.move_to_end(url)
+                while len(self._cache) > CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+        return payload, next_cursor
+
+    def post_json(self, path, payload, timeout=10):
+        """
+        POST с JSON-телом. Возвращает разобранный ответ; при коде ошибки
+        выбрасывает ApiError с сообщением сервера.
+        """
+        response = self.session.post(self.base_url + path, json=payload, timeout=timeout)
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error")
+            except (ValueError, AttributeError):
+                message = None
+            raise ApiError(message or f"HTTP {response.status_code}")
+        return response.json()
+
+    def get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.session.post(self.base_url + path, **kwargs)
+
+
+# Общий клиент для всех окон приложения
+api_client = ApiClient()
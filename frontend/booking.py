@@ -1,5 +1,6 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
-import requests
+from api_client import api_client
+from workers import api_workers
 
 class GuestForm(QtWidgets.QWidget):
     def __init__(self):
@@ -225,16 +226,27 @@ class GuestBookingDialog(QtWidgets.QDialog):
         self.checkout.setMinimumDate(date.addDays(1))
 
     def load_services(self):
-        try:
-            response = requests.get("http://localhost:5000/api/services")
-            services = response.json()
-            for s in services:
-                spin = QtWidgets.QSpinBox()
-                spin.setRange(0, 10)
-                self.services_layout.addRow(f"{s['name']} ({s['price']} ₽)", spin)
-                self.service_inputs[s["service_id"]] = spin
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Ошибка", str(e))
+        # Каталог услуг кэшируется клиентом и перезапрашивается условным GET в фоне;
+        # до ответа список услуг пуст, бронировать можно и без них
+        self.services_group.setTitle("Дополнительные услуги (загрузка...)")
+        api_workers.submit(
+            api_client.get_json, "/api/services", timeout=10,
+            key=(id(self), "services"), on_result=self.show_services,
+            on_error=lambda e: QtWidgets.QMessageBox.critical(self, "Ошибка", str(e)),
+            on_finished=lambda: self.services_group.setTitle("Дополнительные услуги")
+        )
+
+    def show_services(self, services):
+        for s in services:
+            spin = QtWidgets.QSpinBox()
+            spin.setRange(0, 10)
+            self.services_layout.addRow(f"{s['name']} ({s['price']} ₽)", spin)
+            self.service_inputs[s["service_id"]] = spin
+
+    def done(self, result):
+        # Ответ на запрос услуг закрытому диалогу не нужен
+        api_workers.cancel((id(self), "services"))
+        super().done(result)
 
     def confirm_booking(self):
         if not self.form.is_valid():
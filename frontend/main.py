@@ -2,6 +2,7 @@ import sys
 from PyQt5 import QtWidgets
 from MainWindow import Ui_MainWindow  # Импортируем класс главного окна
 from input_gos import Ui_MainWindow as Ui_LoginWindow  # Импортируем класс окна авторизации
+from workers import api_workers  # Пул фоновых запросов к серверу
 
 # Окно авторизации
 class LoginWindow(QtWidgets.QMainWindow):
@@ -55,6 +56,7 @@ def main():
     Точка входа в приложение.
     """
     app = QtWidgets.QApplication(sys.argv)  # Создаем экземпляр приложения PyQt
+    app.aboutToQuit.connect(api_workers.shutdown)  # Дождаться фоновых запросов перед выходом
 
     # Отображаем окно авторизации
     login = LoginWindow()  # Создаем экземпляр окна авторизации
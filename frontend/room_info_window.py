@@ -1,5 +1,7 @@
 from PyQt5 import QtCore, QtGui, QtWidgets
 import requests
+from api_client import api_client
+from workers import api_workers
 
 class RoomInfoWindow(QtWidgets.QDialog):
     def __init__(self, room_number, parent=None):
@@ -77,30 +79,43 @@ class RoomInfoWindow(QtWidgets.QDialog):
 
     def load_data(self):
         """
-        Загрузка данных о номере с сервера.
+        Загрузка данных о номере с сервера (в фоне; окно остается отзывчивым).
         """
-        try:
-            self.show_loading(True)  # Показываем индикатор загрузки
+        self.show_loading(True)  # Показываем индикатор загрузки
 
-            # Запрос данных с сервера
-            response = requests.get(f"http://localhost:5000/api/rooms/{self.room_number}/full-info", timeout=5)
-            response.raise_for_status()  # Проверка статуса ответа
-            room_data = response.json()  # Парсинг JSON-ответа
+        # Условный запрос: при неизменных данных сервер ответит 304
+        api_workers.submit(
+            api_client.get_json, f"/api/rooms/{self.room_number}/full-info", timeout=5,
+            key=(id(self), "full-info"), on_result=self.fill_data, on_error=self.on_load_error,
+            on_finished=lambda: self.show_loading(False)  # Скрываем индикатор загрузки
+        )
 
-            # Заполнение данных во вкладках
+    def fill_data(self, room_data):
+        """
+        Заполнение данных во вкладках ответом сервера.
+        """
+        try:
             self.fill_basic_info(room_data.get('room_info', {}))  # Основная информация
             self.fill_bookings_table(room_data.get('bookings', []))  # Бронирования
             self.fill_service_table(room_data.get('cleaning', []), room_data.get('services', []))  # Обслуживание
             self.fill_payments_table(room_data.get('payments', []))  # Оплата
-
-        except requests.exceptions.RequestException as e:
-            # Обработка ошибок соединения
-            QtWidgets.QMessageBox.warning(self, "Ошибка соединения", f"Не удалось получить данные с сервера: {str(e)}")
         except Exception as e:
-            # Обработка других ошибок
+            # Обработка ошибок в данных
             QtWidgets.QMessageBox.warning(self, "Ошибка", f"Ошибка обработки данных: {str(e)}")
-        finally:
-            self.show_loading(False)  # Скрываем индикатор загрузки
+
+    def on_load_error(self, error):
+        self.show_loading(False)
+        if isinstance(error, requests.exceptions.RequestException):
+            # Обработка ошибок соединения
+            QtWidgets.QMessageBox.warning(self, "Ошибка соединения", f"Не удалось получить данные с сервера: {str(error)}")
+        else:
+            QtWidgets.QMessageBox.warning(self, "Ошибка", f"Ошибка обработки данных: {str(error)}")
+
+    def done(self, result):
+        # Закрытие окна отменяет доставку ответа
+        api_workers.cancel((id(self), "full-info"))
+        self.show_loading(False)
+        super().done(result)
 
     def show_loading(self, show):
         """
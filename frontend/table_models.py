@@ -0,0 +1,266 @@
+from difflib import SequenceMatcher
+
+from PyQt5 import QtCore
+
+from api_client import api_client
+from workers import api_workers
+
+# Строк на страницу при подгрузке списков (сервер ограничивает MAX_PAGE_SIZE)
+PAGE_SIZE = 500
+
+ROOM_TYPES = {
+    'Basic': 'Базовый',
+    'Advanced': 'Продвинутый',
+    'Business': 'Бизнес',
+    'Dorm': 'Общий'
+}
+
+ROOM_STATUSES = {
+    'available': 'Свободен',
+    'occupied': 'Занят',
+    'maintenance': 'На обслуживании'
+}
+
+
+class ColumnTableModel(QtCore.QAbstractTableModel):
+    """
+    Табличная модель только для чтения, хранящая данные по столбцам:
+    список ключей строк и по списку готовых строк отображения на столбец.
+    Ячейки форматируются один раз при загрузке, data() только читает из списка.
+    set_rows() сравнивает новые строки с текущими по ключу и сообщает
+    представлению только о вставленных, удаленных и измененных строках,
+    поэтому выделение и прокрутка сохраняются.
+    """
+
+    headers = ()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys = []
+        self._columns = [[] for _ in self.headers]
+
+    # --- Описание строк (переопределяется в наследниках) ---
+
+    def row_key(self, record):
+        raise NotImplementedError
+
+    def row_values(self, record):
+        """
+        Кортеж строк отображения для записи, по одной на столбец.
+        """
+        raise NotImplementedError
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and index.isValid():
+            return self._columns[index.column()][index.row()]
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def key(self, row):
+        return self._keys[row]
+
+    # --- Обновление данных ---
+
+    def _prepare(self, records):
+        keys, rows = [], []
+        for record in records:
+            values = self.row_values(record)
+            if values is None:
+                continue
+            keys.append(self.row_key(record))
+            rows.append(values)
+        return keys, rows
+
+    def append_rows(self, records):
+        """
+        Добавляет строки в конец (следующая страница списка).
+        """
+        keys, rows = self._prepare(records)
+        if not keys:
+            return
+        first = len(self._keys)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(keys) - 1)
+        self._keys.extend(keys)
+        for column, values in zip(self._columns, zip(*rows)):
+            column.extend(values)
+        self.endInsertRows()
+
+    def set_rows(self, records):
+        """
+        Заменяет содержимое модели, передавая представлению только разницу.
+        """
+        keys, rows = self._prepare(records)
+        if keys == self._keys:
+            self._update_rows(0, rows)
+            return
+        # Изменения применяются с конца, чтобы индексы еще не обработанных блоков не сдвигались
+        opcodes = SequenceMatcher(None, self._keys, keys, autojunk=False).get_opcodes()
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag == 'equal':
+                self._update_rows(i1, rows[j1:j2])
+                continue
+            if tag in ('delete', 'replace'):
+                self.beginRemoveRows(QtCore.QModelIndex(), i1, i2 - 1)
+                del self._keys[i1:i2]
+                for column in self._columns:
+                    del column[i1:i2]
+                self.endRemoveRows()
+            if tag in ('insert', 'replace'):
+                self.beginInsertRows(QtCore.QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self._keys[i1:i1] = keys[j1:j2]
+                for column, values in zip(self._columns, zip(*rows[j1:j2])):
+                    column[i1:i1] = values
+                self.endInsertRows()
+
+    def _update_rows(self, first, rows):
+        """
+        Записывает значения строк, начиная с first, и сообщает об измененном диапазоне.
+        """
+        changed_first = changed_last = None
+        for offset, values in enumerate(rows):
+            row = first + offset
+            for column, value in zip(self._columns, values):
+                if column[row] != value:
+                    column[row] = value
+                    if changed_first is None:
+                        changed_first = row
+                    changed_last = row
+        if changed_first is not None:
+            self.dataChanged.emit(
+                self.index(changed_first, 0),
+                self.index(changed_last, len(self.headers) - 1),
+                [QtCore.Qt.DisplayRole]
+            )
+
+
+class PagedTableModel(ColumnTableModel):
+    """
+    Модель списка с keyset-пагинацией сервера: первая страница загружается
+    при load(), следующие — когда представление прокручено до конца (fetchMore).
+    Запросы выполняются в фоне (workers.api_workers).
+    """
+
+    path = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.params = {}
+        self._next_cursor = None
+        self._loading = False
+        self.on_loaded = None  # Вызывается после загрузки (не подгрузки) списка
+        self.on_error = None
+
+    def load(self, params):
+        """
+        Загружает список с новыми параметрами. При обновлении того же списка
+        загружается столько строк, сколько уже было подгружено, и применяется разница.
+        """
+        count = self.rowCount() if params == self.params else 0
+        self.params = dict(params)
+        api_workers.cancel((id(self), "more"))  # Подгрузка по старым параметрам больше не нужна
+        self._loading = True
+        api_workers.submit(
+            self._load_pages, dict(params), max(count, PAGE_SIZE),
+            key=(id(self), "load"), on_result=self._on_loaded, on_error=self._on_error
+        )
+
+    def _load_pages(self, params, count):
+        """
+        Загружает страницы, пока не наберется count строк (выполняется в рабочем потоке).
+        """
+        records, cursor = [], None
+        while True:
+            page_params = dict(params, limit=PAGE_SIZE)
+            if cursor is not None:
+                page_params['after_id'] = cursor
+            page, cursor = api_client.get_page(self.path, params=page_params, timeout=10)
+            records.extend(page)
+            if cursor is None or len(records) >= count:
+                return records, cursor
+
+    def _on_loaded(self, result):
+        records, self._next_cursor = result
+        self._loading = False
+        self.set_rows(records)
+        if self.on_loaded is not None:
+            self.on_loaded()
+
+    def _on_error(self, error):
+        self._loading = False
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self._next_cursor is not None and not self._loading
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        params = dict(self.params, limit=PAGE_SIZE, after_id=self._next_cursor)
+        api_workers.submit(
+            api_client.get_page, self.path, params=params, timeout=10,
+            key=(id(self), "more"), on_result=self._on_more, on_error=self._on_error
+        )
+
+    def _on_more(self, result):
+        records, self._next_cursor = result
+        self._loading = False
+        self.append_rows(records)
+
+
+class RoomsTableModel(PagedTableModel):
+    """
+    Список номеров (/ui/rooms), ключ строки — room_id.
+    """
+
+    path = "/ui/rooms"
+    headers = ("Номер", "Тип", "Вместимость", "Статус", "Цена за сутки")
+    NUMBER, TYPE, CAPACITY, STATUS, RATE = range(5)
+
+    def row_key(self, room):
+        return room['room_id']
+
+    def row_values(self, room):
+        if not all(k in room for k in ['room_id', 'room_number', 'type', 'capacity', 'status', 'daily_rate']):
+            return None
+        status = room.get('dynamic_status', room['status'])
+        return (
+            str(room['room_number']),
+            ROOM_TYPES.get(room['type'], room['type']),
+            str(room['capacity']),
+            ROOM_STATUSES.get(status, 'Неизвестно'),
+            f"{room['daily_rate']:,.2f} ₽".replace(",", " ")
+        )
+
+
+class ServicesTableModel(ColumnTableModel):
+    """
+    Услуги за период (/ui/services-by-date), ключ строки — booking_service_id.
+    """
+
+    headers = ("Дата", "Номер", "Услуга", "Кол-во", "Примечание")
+
+    def row_key(self, service):
+        return service.get("booking_service_id")
+
+    def row_values(self, service):
+        return (
+            service.get("date", "—"),
+            str(service.get("room_number", "—")),
+            service.get("service_name", "—"),
+            str(service.get("quantity", "—")),
+            service.get("notes", "")
+        )
@@ -0,0 +1,129 @@
+import threading
+
+from PyQt5 import QtCore
+
+# Число одновременных запросов к серверу (и размер пула соединений api_client)
+MAX_THREADS = 4
+
+
+class TaskSignals(QtCore.QObject):
+    """
+    Сигналы задачи. Объект создается в потоке интерфейса, поэтому сигналы,
+    отправленные из рабочего потока, доставляются в поток интерфейса.
+    """
+    result = QtCore.pyqtSignal(object)  # Результат функции
+    error = QtCore.pyqtSignal(object)   # Исключение
+    finished = QtCore.pyqtSignal()      # Задача завершена (успешно, с ошибкой или отменена)
+
+
+class RequestTask(QtCore.QRunnable):
+    """
+    Вызов func(*args, **kwargs) в потоке пула.
+    Отмена не прерывает уже отправленный HTTP-запрос (его ограничивает timeout),
+    но результат отмененной задачи не доставляется.
+    """
+
+    def __init__(self, func, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)  # Временем жизни задачи управляет ApiWorkers
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.func(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self.cancelled:
+                    self.signals.error.emit(e)
+            else:
+                if not self.cancelled:
+                    self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class ApiWorkers:
+    """
+    Выполнение запросов к серверу вне потока интерфейса.
+    Обработчики on_result / on_error / on_finished вызываются в потоке интерфейса.
+    Задачи с одинаковым ключом вытесняют друг друга: новая задача отменяет
+    предыдущую (например, повторный поиск номеров до ответа на первый).
+    """
+
+    def __init__(self, max_threads=MAX_THREADS):
+        self.max_threads = max_threads
+        self._pool = None
+        self._tasks = set()  # Ссылки на задачи до их завершения
+        self._current = {}   # key -> последняя задача с этим ключом
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = QtCore.QThreadPool()
+            self._pool.setMaxThreadCount(self.max_threads)
+        return self._pool
+
+    def submit(self, func, *args, key=None, on_result=None, on_error=None, on_finished=None, **kwargs):
+        """
+        Ставит вызов func(*args, **kwargs) в пул и возвращает задачу (RequestTask).
+        """
+        task = RequestTask(func, args, kwargs)
+        if key is not None:
+            previous = self._current.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._current[key] = task
+
+        # Отмена проверяется и при доставке: сигнал мог быть отправлен до cancel()
+        if on_result is not None:
+            task.signals.result.connect(lambda value: task.cancelled or on_result(value))
+        if on_error is not None:
+            task.signals.error.connect(lambda error: task.cancelled or on_error(error))
+        task.signals.finished.connect(lambda: self._finish(task, key, on_finished))
+
+        self._tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def _finish(self, task, key, on_finished):
+        self._tasks.discard(task)
+        if key is not None and self._current.get(key) is task:
+            del self._current[key]
+        if on_finished is not None and not task.cancelled:
+            on_finished()
+
+    def cancel(self, key):
+        """
+        Отменяет последнюю задачу с ключом key, если она еще не завершилась.
+        """
+        task = self._current.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def shutdown(self, msecs=5000):
+        """
+        Отменяет все задачи и ждет завершения уже идущих запросов (при выходе из приложения).
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        self._current.clear()
+        if self._pool is not None:
+            self._pool.clear()
+            self._pool.waitForDone(msecs)
+
+
+# Общий пул для всех окон приложения
+api_workers = ApiWorkers()
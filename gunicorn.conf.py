@@ -0,0 +1,104 @@
+# Конфигурация gunicorn для продакшен-запуска API:
+#     gunicorn -c gunicorn.conf.py wsgi:app
+# Все параметры настраиваются переменными окружения.
+# Плавный перезапуск воркеров без потери запросов: kill -HUP <pid мастера>.
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+
+# Адрес и порт
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Процессы и потоки: gthread обслуживает несколько запросов в каждом воркере,
+# пока другие потоки ждут ответа PostgreSQL
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+
+# Keep-alive соединений с клиентами (секунды)
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Таймауты: зависший воркер перезапускается через timeout, при остановке/перезапуске
+# воркеры дорабатывают текущие запросы в течение graceful_timeout
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Периодический перезапуск воркеров ограничивает рост памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+# Загрузка приложения в мастере до fork (быстрее старт, но соединения с БД создаются в воркерах)
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+# Журналы gunicorn — в stdout/stderr контейнера
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+# Журнал приложения — строки JSON в stdout каждого воркера. Файл с ротацией (RotatingFileHandler)
+# в нескольких процессах терял бы записи: каждый воркер переименовывает файл сам по себе.
+# Если файл нужен, LOG_FILE задается явно, а ротацию выполняет logrotate (LOG_FILE_MAX_BYTES=0)
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_FILE_MAX_BYTES', '0')
+
+# Схема БД (недостающие таблицы, функции и триггеры агрегатов) создается один раз в on_starting,
+# а не в каждом воркере: одновременные CREATE TABLE / TYPE воркеров мешают друг другу, и ошибка
+# одного воркера при загрузке останавливает весь сервер. DB_CREATE_ALL=0 — не создавать вовсе
+create_schema = os.getenv('DB_CREATE_ALL', '1') == '1'
+os.environ['DB_CREATE_ALL'] = '0'
+
+# Метрики Prometheus воркеров пишутся в файлы этого каталога и суммируются при запросе /metrics.
+# Переменная должна быть задана до импорта приложения (и prometheus_client) в воркерах
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/hotel-prometheus')
+
+
+def on_starting(server):
+    """
+    Метрики прошлого запуска не должны попасть в новые значения: каталог очищается.
+    Схема БД создается в отдельном процессе, чтобы мастер не открывал соединений с БД;
+    если это не удалось, сервер не запускается.
+    """
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    if create_schema:
+        server.log.info("Creating missing database schema objects")
+        env = dict(os.environ, DB_CREATE_ALL='1', METRICS_ENABLED='0')
+        env.pop('PROMETHEUS_MULTIPROC_DIR')
+        subprocess.run(
+            [sys.executable, '-c', 'from app.main import create_app; create_app()'],
+            cwd=server.cfg.chdir, env=env, check=True
+        )
+
+
+def post_fork(server, worker):
+    """
+    После fork воркер не должен использовать соединения с БД, открытые мастером.
+    """
+    if preload_app:
+        from app.models import db
+        from wsgi import app
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """
+    Показатели завершившегося воркера (число выполняющихся запросов, занятость пула)
+    исключаются из суммы; его счетчики и гистограммы сохраняются.
+    """
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """
+    Перед выходом воркер дожидается фоновых задач, уже поставленных в очередь (app/tasks.py).
+    """
+    from app.tasks import task_queue
+    task_queue.shutdown(wait=True)
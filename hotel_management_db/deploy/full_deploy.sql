@@ -11,15 +11,19 @@
 
 -- 3. Создание таблиц
 \i schema/03_tables.sql
+\i schema/04_analytics_rollups.sql
 
 -- 4. Создание индексов для производительности
 \i indexes/01_create_indexes.sql
+\i indexes/02_guest_search_indexes.sql
 
 -- 5. Создание функций для триггеров
 \i triggers/01_update_timestamp_function.sql
+\i triggers/03_analytics_rollup_functions.sql
 
--- 6. Создание триггеров
+-- 6. Создание триггеров (агрегаты для аналитики заполняются триггерами уже при вставке данных)
 \i triggers/02_create_triggers.sql
+\i triggers/04_analytics_rollup_triggers.sql
 
 -- 7. Вставка демонстрационных данных
 \i data/01_insert_guests.sql
@@ -1,9 +1,12 @@
 -- 7. АНАЛИТИЧЕСКИЕ ЗАПРОСЫ
 -- Функции для получения агрегированных данных и отчетов.
+-- Читают предварительно агрегированные таблицы (schema/04_analytics_rollups.sql),
+-- поэтому время ответа не зависит от объема накопленных бронирований и платежей.
 
 -- 1. Функция 'get_occupancy_rate'
 -- Рассчитывает коэффициент загрузки номеров по типам за определенный период.
 -- Коэффициент загрузки = (количество занятых ночей / общее количество доступных ночей) * 100%.
+-- Период — ночи с p_start_date по p_end_date - 1 включительно.
 CREATE OR REPLACE FUNCTION get_occupancy_rate(
     p_start_date 		DATE, 			-- Начальная дата периода.
     p_end_date 			DATE 			-- Конечная дата периода.
@@ -15,42 +18,58 @@ CREATE OR REPLACE FUNCTION get_occupancy_rate(
 ) AS $$
 BEGIN
     RETURN QUERY
-    WITH room_type_stats AS ( -- Временная таблица (CTE) для предварительного расчета статистики по типам номеров.
-        SELECT 
-            r.type,
-            COUNT(r.room_id) AS total_rooms_of_type, -- Общее количество номеров данного типа.
-            SUM(
-                CASE 
-                    WHEN b.booking_id IS NOT NULL -- Если есть бронирование, которое пересекается с периодом.
-                         AND b.status <> 'cancelled' -- И бронирование не отменено.
-                         AND b.check_in_date < p_end_date 
-                         AND b.check_out_date > p_start_date
-                    THEN LEAST(b.check_out_date, p_end_date) - GREATEST(b.check_in_date, p_start_date) -- Вычисляет количество ночей пересечения.
-                    ELSE 0 -- Если нет пересечений или бронирование отменено, то 0 ночей.
-                END
-            ) AS occupied_room_days_in_period, -- Сумма занятых ночей для данного типа номера в периоде.
-            COUNT(DISTINCT b.room_id) FILTER ( -- Подсчет уникальных номеров, которые были забронированы в период.
-                WHERE b.booking_id IS NOT NULL 
-                  AND b.status <> 'cancelled' 
-                  AND b.check_in_date < p_end_date 
-                  AND b.check_out_date > p_start_date
-            ) AS unique_booked_rooms_in_period
-        FROM 
-            rooms r
-            LEFT JOIN bookings b ON r.room_id = b.room_id -- Левое соединение, чтобы включить номера без бронирований.
-        GROUP BY r.type -- Группировка по типу номера.
+    WITH room_counts AS ( -- Количество номеров каждого типа.
+        SELECT r.type, COUNT(*)::INTEGER AS rooms_of_type
+        FROM rooms r
+        GROUP BY r.type
+    ),
+    occupied_nights AS ( -- Занятые ночи в периоде: сумма по дням из occupancy_daily...
+        SELECT t.type, SUM(t.nights) AS nights
+        FROM (
+            SELECT o.room_type AS type, SUM(o.room_nights) AS nights
+            FROM occupancy_daily o
+            WHERE o.day >= p_start_date AND o.day < p_end_date
+            GROUP BY o.room_type
+            UNION ALL
+            -- ...и ночи периода из еще не перенесенного журнала occupancy_changes.
+            SELECT c.room_type, SUM(c.delta * (LEAST(c.check_out_date, p_end_date) - GREATEST(c.check_in_date, p_start_date)))
+            FROM occupancy_changes c
+            WHERE c.check_in_date < p_end_date AND c.check_out_date > p_start_date
+            GROUP BY c.room_type
+        ) t
+        GROUP BY t.type
+    ),
+    booked AS ( -- Номера, у которых есть неотмененное бронирование с ночами внутри периода.
+        SELECT r.type, COUNT(*)::INTEGER AS rooms_booked
+        FROM rooms r
+        WHERE EXISTS (
+            SELECT 1
+            FROM bookings b
+            WHERE b.room_id = r.room_id
+              AND b.status <> 'cancelled'
+              -- Условие ограничения no_overlapping_bookings: поиск идет по его GiST-индексу...
+              -- LEAST/GREATEST: при p_end_date < p_start_date daterange завершился бы ошибкой.
+              AND daterange(b.check_in_date, b.check_out_date, '[]')
+                  && daterange(LEAST(p_start_date, p_end_date), GREATEST(p_start_date, p_end_date), '[]')
+              -- ...а бронирования, лишь касающиеся границ периода, отсекаются здесь.
+              AND b.check_in_date < p_end_date
+              AND b.check_out_date > p_start_date
+        )
+        GROUP BY r.type
     )
-    SELECT 
-        rts.type,
-        rts.total_rooms_of_type,
-        rts.unique_booked_rooms_in_period,
-        COALESCE( -- Используем COALESCE, чтобы избежать деления на ноль, если нет доступных ночей.
-            (rts.occupied_room_days_in_period * 100.0) / -- Занятые ночи * 100
-            (rts.total_rooms_of_type * (p_end_date - p_start_date)), -- Делим на общее количество доступных ночей (количество номеров * дней в периоде).
+    SELECT
+        rc.type,
+        rc.rooms_of_type,
+        COALESCE(bk.rooms_booked, 0),
+        COALESCE( -- NULLIF исключает деление на ноль для пустого периода.
+            (COALESCE(n.nights, 0) * 100.0) / NULLIF(rc.rooms_of_type * (p_end_date - p_start_date), 0),
             0.00
-        )::DECIMAL(5, 2) AS occupancy_rate -- Приводим результат к DECIMAL с 2 знаками после запятой.
-    FROM 
-        room_type_stats rts
-    ORDER BY rts.type; -- Сортировка по типу номера.
+        )::DECIMAL(5, 2)
+    FROM
+        room_counts rc
+        LEFT JOIN occupied_nights n ON n.type = rc.type
+        LEFT JOIN booked bk ON bk.type = rc.type
+    ORDER BY rc.type; -- Сортировка по типу номера.
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql STABLE
+SET search_path = hotel, public; -- Таблицы находятся независимо от search_path вызывающей сессии.
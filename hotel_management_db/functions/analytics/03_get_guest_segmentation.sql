@@ -6,6 +6,8 @@
 -- - Общее количество ночей проживания
 -- - Общие расходы
 -- - Дата последнего визита
+-- Показатели гостей берутся из guest_stats; в отчет попадают гости без бронирований
+-- и гости хотя бы с одним завершенным (checked_out) бронированием.
 CREATE OR REPLACE FUNCTION get_guest_segmentation() 
 RETURNS TABLE (
     guest_id 				INTEGER, 		-- Идентификатор гостя.
@@ -19,45 +21,42 @@ RETURNS TABLE (
 ) AS $$
 BEGIN
     RETURN QUERY
-    WITH guest_stats AS ( -- Временная таблица для сбора основных статистических данных по каждому гостю.
+    WITH guest_data AS ( -- Гости вместе с их агрегированными показателями.
         SELECT
-            g.guest_id,
-            g.first_name || ' ' || g.last_name AS full_name, -- Объединяем имя и фамилию.
-            COUNT(DISTINCT b.booking_id) AS total_bookings, -- Подсчет уникальных бронирований.
-            SUM(b.check_out_date - b.check_in_date) AS total_nights, -- Суммирование количества ночей по всем бронированиям.
-            COALESCE(SUM(p.amount), 0) AS total_spending, -- Суммирование всех завершенных платежей. COALESCE для 0, если платежей нет.
-            MAX(b.check_out_date) AS last_visit -- Последняя дата выезда.
+            g.guest_id AS id,
+            (g.first_name || ' ' || g.last_name)::TEXT AS name, -- Объединяем имя и фамилию.
+            COALESCE(gs.total_bookings, 0) AS bookings,
+            CASE WHEN COALESCE(gs.total_bookings, 0) = 0 THEN NULL ELSE gs.total_nights END AS nights,
+            COALESCE(gs.total_spending, 0) AS spending,
+            gs.last_visit AS visit
         FROM
             guests g
-            LEFT JOIN bookings b ON g.guest_id = b.guest_id -- Левое соединение, чтобы включить гостей, у которых может не быть бронирований.
-            LEFT JOIN payments p ON b.booking_id = p.booking_id AND p.status = 'completed' -- Соединяем с платежами, учитывая только завершенные.
-        WHERE
-            b.status = 'checked_out' OR b.status IS NULL -- Учитываем только завершенные бронирования для статистики, но включаем всех гостей.
-        GROUP BY
-            g.guest_id, g.first_name, g.last_name -- Группируем по гостю.
+            LEFT JOIN guest_stats gs ON gs.guest_id = g.guest_id
+        WHERE gs.guest_id IS NULL OR gs.total_bookings > 0 -- Гости только с незавершенными бронированиями не учитываются.
     )
     SELECT
-        gs.guest_id,
-        gs.full_name,
-        gs.total_bookings,
-        gs.total_nights,
-        gs.total_spending,
+        gd.id,
+        gd.name,
+        gd.bookings,
+        gd.nights,
+        gd.spending::DECIMAL(12, 2),
         CASE 
-            WHEN gs.total_nights IS NULL OR gs.total_nights = 0 THEN 0 -- Избегаем деления на ноль, если ночей нет.
-            ELSE gs.total_spending / gs.total_nights -- Расчет средних расходов за ночь.
-        END::DECIMAL(10, 2) AS avg_spending_per_night,
-        gs.last_visit,
+            WHEN gd.nights IS NULL OR gd.nights = 0 THEN 0 -- Избегаем деления на ноль, если ночей нет.
+            ELSE gd.spending / gd.nights -- Расчет средних расходов за ночь.
+        END::DECIMAL(10, 2),
+        gd.visit,
         CASE
-            WHEN gs.total_bookings >= 3 AND gs.total_spending >= 30000 THEN 'VIP' -- VIP: 3+ бронирований и расходы 30000+
-            WHEN gs.total_bookings >= 2 AND gs.total_spending >= 15000 THEN 'Loyal' -- Лояльный: 2+ бронирований и расходы 15000+
-            WHEN gs.total_bookings = 0 THEN 'No Bookings' -- Нет бронирований: гость есть, но не бронировал.
-            WHEN gs.last_visit < CURRENT_DATE - INTERVAL '1 year' THEN 'Dormant' -- Неактивный: последний визит более года назад.
-            WHEN gs.total_bookings = 1 THEN 'New' -- Новый: только одно бронирование.
+            WHEN gd.bookings >= 3 AND gd.spending >= 30000 THEN 'VIP' -- VIP: 3+ бронирований и расходы 30000+
+            WHEN gd.bookings >= 2 AND gd.spending >= 15000 THEN 'Loyal' -- Лояльный: 2+ бронирований и расходы 15000+
+            WHEN gd.bookings = 0 THEN 'No Bookings' -- Нет бронирований: гость есть, но не бронировал.
+            WHEN gd.visit < CURRENT_DATE - INTERVAL '1 year' THEN 'Dormant' -- Неактивный: последний визит более года назад.
+            WHEN gd.bookings = 1 THEN 'New' -- Новый: только одно бронирование.
             ELSE 'Regular' -- Обычный: все остальные.
-        END AS segment -- Определяем сегмент гостя.
+        END -- Определяем сегмент гостя.
     FROM
-        guest_stats gs
+        guest_data gd
     ORDER BY
-        total_spending DESC; -- Сортировка по убыванию общих расходов.
+        gd.spending DESC; -- Сортировка по убыванию общих расходов.
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql STABLE
+SET search_path = hotel, public;
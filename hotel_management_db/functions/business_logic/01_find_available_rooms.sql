@@ -38,6 +38,10 @@ BEGIN
             SELECT 1 FROM bookings b
             WHERE b.room_id = r.room_id
             AND b.status <> 'cancelled' -- Исключаем отмененные бронирования.
+            -- Условие ограничения no_overlapping_bookings: поиск идет по его GiST-индексу...
+            -- LEAST/GREATEST: при p_check_out < p_check_in daterange завершился бы ошибкой.
+            AND daterange(b.check_in_date, b.check_out_date, '[]') && daterange(LEAST(p_check_in, p_check_out), GREATEST(p_check_in, p_check_out), '[]')
+            -- ...а бронирования, лишь касающиеся границ периода, отсекаются здесь.
             AND b.check_in_date < p_check_out -- Проверка на пересечение дат: заезд текущего бронирования до выезда искомого периода.
             AND b.check_out_date > p_check_in -- И выезд текущего бронирования после заезда искомого периода.
         )
@@ -1,9 +1,26 @@
 -- 2. ИНДЕКСЫ ДЛЯ ПРОИЗВОДИТЕЛЬНОСТИ
 -- Индексы создаются для ускорения операций поиска и фильтрации данных.
+-- Каждый индекс подобран под конкретный запрос приложения или функции БД;
+-- то, что индекс используется, проверяет benchmarks/explain_indexes.py.
+--
+-- Отдельные индексы не нужны там, где они уже есть:
+--   guests(passport_number)  — индекс ограничения UNIQUE (guests_passport_number_key);
+--   bookings(room_id, период) для неотмененных броней — GiST-индекс ограничения
+--   no_overlapping_bookings. Проверки пересечения периодов записываются тем же выражением
+--   daterange(check_in_date, check_out_date, '[]') && ..., что и ограничение, иначе индекс не используется.
 
-CREATE INDEX idx_guests_passport ON guests(passport_number); 				-- Индекс для быстрого поиска гостей по номеру паспорта.
 CREATE INDEX idx_rooms_status ON rooms(status); 							-- Индекс для быстрого фильтрации номеров по статусу.
-CREATE INDEX idx_bookings_dates ON bookings(check_in_date, check_out_date); -- Индекс для эффективного поиска бронирований по диапазону дат.
+
+-- Бронирования неотмененных броней, пересекающие период, без условия на номер
+-- (номера, занятые в период; get_occupancy_rate). Частичный, как и ограничение no_overlapping_bookings.
+CREATE INDEX idx_bookings_period ON bookings
+    USING gist (daterange(check_in_date, check_out_date, '[]'))
+    WHERE status <> 'cancelled';
+CREATE INDEX idx_bookings_room_dates ON bookings(room_id, check_in_date); 	-- Все бронирования номера по дате заезда (full-info, включая отмененные), внешний ключ на rooms.
 CREATE INDEX idx_bookings_guest ON bookings(guest_id); 						-- Индекс для быстрого поиска бронирований по гостю.
-CREATE INDEX idx_bookings_room ON bookings(room_id); 						-- Индекс для быстрого поиска бронирований по номеру.
+
+CREATE INDEX idx_booking_services_date ON booking_services(service_date, booking_service_id); -- Услуги за период (/ui/services-by-date) сразу в порядке выдачи, без сортировки.
+CREATE INDEX idx_booking_services_booking ON booking_services(booking_id); 	-- Услуги бронирования (full-info, фоновые задачи), внешний ключ на bookings.
+
 CREATE INDEX idx_payments_booking ON payments(booking_id); 					-- Индекс для быстрого поиска платежей по бронированию.
+CREATE INDEX idx_payments_status_date ON payments(status, transaction_date); -- Платежи в статусе за период (завершенные за месяц для отчета о доходах, зависшие ожидающие).
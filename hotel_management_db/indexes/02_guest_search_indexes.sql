@@ -0,0 +1,26 @@
+-- 2. ИНДЕКСЫ ДЛЯ ПРОИЗВОДИТЕЛЬНОСТИ
+-- Индексы для поиска гостей (GET /api/guests/search): по фамилии, имени, телефону,
+-- email и части номера паспорта.
+
+-- Функция 'guest_search_text'
+-- Строка, по которой ищутся гости: фамилия и имя, паспорт, цифры телефона и email в нижнем регистре.
+-- Функция IMMUTABLE, поэтому по ней можно построить индекс; приложение вызывает ее
+-- с теми же аргументами, и планировщик использует индекс.
+CREATE OR REPLACE FUNCTION guest_search_text(
+    p_first_name 		VARCHAR, 		-- Имя.
+    p_last_name 		VARCHAR, 		-- Фамилия.
+    p_passport_number 	VARCHAR, 		-- Номер паспорта.
+    p_phone 			VARCHAR, 		-- Телефон (в строку попадают только цифры).
+    p_email 			VARCHAR 		-- Email (необязательно).
+) RETURNS TEXT AS $$
+    SELECT lower(p_last_name || ' ' || p_first_name || ' ' || p_passport_number) || ' '
+        || regexp_replace(p_phone, '[^0-9]', '', 'g') || ' '
+        || coalesce(lower(p_email), '');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Триграммный GIN-индекс: поиск подстроки (LIKE '%...%') в любой части строки поиска.
+CREATE INDEX idx_guests_search_trgm ON guests
+    USING gin (guest_search_text(first_name, last_name, passport_number, phone, email) gin_trgm_ops);
+
+-- Поиск по началу фамилии для коротких запросов (1-2 символа), по которым триграммы не строятся.
+CREATE INDEX idx_guests_last_name_prefix ON guests (lower(last_name) text_pattern_ops, guest_id);
@@ -0,0 +1,24 @@
+-- Обновление индексов уже развернутой базы до набора из indexes/01_create_indexes.sql.
+-- Индексы создаются и удаляются CONCURRENTLY, без блокировки записи в таблицы,
+-- поэтому скрипт выполняется вне транзакции (psql без --single-transaction).
+-- Повторный запуск безопасен.
+
+SET search_path TO hotel, public;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_period ON bookings
+    USING gist (daterange(check_in_date, check_out_date, '[]'))
+    WHERE status <> 'cancelled';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_room_dates ON bookings(room_id, check_in_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_booking_services_date ON booking_services(service_date, booking_service_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_booking_services_booking ON booking_services(booking_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payments_status_date ON payments(status, transaction_date);
+
+-- Дублирует индекс ограничения UNIQUE на passport_number.
+DROP INDEX CONCURRENTLY IF EXISTS idx_guests_passport;
+-- Заменены idx_bookings_room_dates и idx_bookings_period.
+DROP INDEX CONCURRENTLY IF EXISTS idx_bookings_room;
+DROP INDEX CONCURRENTLY IF EXISTS idx_bookings_dates;
+
+ANALYZE bookings;
+ANALYZE booking_services;
+ANALYZE payments;
@@ -5,3 +5,10 @@ CREATE SCHEMA hotel;
 -- Установка пути поиска по умолчанию для текущей сессии.
 -- Это позволяет обращаться к таблицам схемы 'hotel' без префикса 'hotel.'.
 SET search_path TO hotel, public;
+
+-- Расширение btree_gist нужно для ограничения-исключения на bookings:
+-- оно позволяет использовать оператор '=' для room_id в GiST-индексе.
+CREATE EXTENSION IF NOT EXISTS btree_gist WITH SCHEMA public;
+
+-- Расширение pg_trgm нужно для поиска гостей по подстроке (indexes/02_guest_search_indexes.sql).
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
@@ -41,7 +41,11 @@ CREATE TABLE bookings (
     children 			SMALLINT NOT NULL DEFAULT 0, 						-- Количество детей в бронировании.
     created_at 			TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, -- Дата и время создания записи о бронировании.
     CONSTRAINT valid_dates CHECK (check_out_date > check_in_date), 			-- Ограничение: дата выезда должна быть строго позже даты заезда.
-    CONSTRAINT valid_occupants CHECK (adults + children > 0) 				-- Ограничение: общее количество проживающих (взрослых + детей) должно быть больше нуля.
+    CONSTRAINT valid_occupants CHECK (adults + children > 0), 				-- Ограничение: общее количество проживающих (взрослых + детей) должно быть больше нуля.
+    CONSTRAINT no_overlapping_bookings EXCLUDE USING gist ( 				-- Ограничение: у номера не может быть двух неотмененных бронирований с пересекающимися датами.
+        room_id WITH =, 													-- Тот же номер...
+        daterange(check_in_date, check_out_date, '[]') WITH && 				-- ...и пересекающийся период (границы включительно, как в проверке приложения).
+    ) WHERE (status <> 'cancelled')
 );
 
 -- Таблица 'services' (Услуги)
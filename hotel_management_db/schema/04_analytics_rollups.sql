@@ -0,0 +1,51 @@
+-- Таблицы предварительно агрегированных данных для аналитических функций.
+-- Поддерживаются триггерами на bookings, payments и rooms (triggers/03_analytics_rollup_functions.sql)
+-- и могут быть полностью пересчитаны функцией refresh_analytics_rollups().
+-- Для уже развернутой базы — schema/upgrade_02_analytics_rollups.sql (выполняет этот же файл,
+-- поэтому таблицы создаются с IF NOT EXISTS).
+
+-- Таблица 'occupancy_daily' (Загрузка по дням)
+-- Количество занятых номеро-ночей каждого типа номера за каждый день.
+-- Ночь d занята бронированием, если check_in_date <= d < check_out_date; отмененные не учитываются.
+CREATE TABLE IF NOT EXISTS occupancy_daily (
+    day 				DATE NOT NULL, 						-- Дата ночи.
+    room_type 			room_type NOT NULL, 				-- Тип номера.
+    room_nights 		INTEGER NOT NULL DEFAULT 0, 		-- Количество занятых номеров этого типа в эту ночь.
+    PRIMARY KEY (day, room_type)
+);
+
+-- Таблица 'occupancy_changes' (Изменения загрузки)
+-- Журнал изменений занятости, еще не перенесенных в occupancy_daily.
+-- Триггер бронирований только добавляет сюда строку, не обновляя общие строки occupancy_daily:
+-- конкурентные бронирования номеров одного типа не ждут друг друга на их блокировках.
+-- Переносит журнал в occupancy_daily функция fold_occupancy_changes(); get_occupancy_rate
+-- учитывает и еще не перенесенные строки.
+CREATE TABLE IF NOT EXISTS occupancy_changes (
+    change_id 			BIGSERIAL PRIMARY KEY,
+    room_type 			room_type NOT NULL, 				-- Тип номера.
+    check_in_date 		DATE NOT NULL, 						-- Первая ночь.
+    check_out_date 		DATE NOT NULL, 						-- День выезда (ночь не входит).
+    delta 				SMALLINT NOT NULL 					-- +1 — ночи заняты, -1 — освобождены.
+);
+
+-- Таблица 'revenue_monthly' (Доходы по месяцам)
+-- Суммы завершенных платежей по месяцу транзакции с разделением на проживание и услуги
+-- (та же формула, что и в get_revenue_report).
+CREATE TABLE IF NOT EXISTS revenue_monthly (
+    month 				DATE PRIMARY KEY, 					-- Первый день месяца.
+    room_revenue 		DECIMAL(14, 2) NOT NULL DEFAULT 0, 	-- Доход от проживания.
+    service_revenue 	DECIMAL(14, 2) NOT NULL DEFAULT 0, 	-- Доход от дополнительных услуг.
+    total_revenue 		DECIMAL(14, 2) NOT NULL DEFAULT 0, 	-- Общий доход.
+    payments_count 		INTEGER NOT NULL DEFAULT 0 			-- Количество завершенных платежей (месяцы без платежей в отчет не попадают).
+);
+
+-- Таблица 'guest_stats' (Статистика гостей)
+-- Показатели гостя по завершенным (checked_out) бронированиям.
+-- Строка есть у каждого гостя, у которого есть хотя бы одно бронирование в любом статусе.
+CREATE TABLE IF NOT EXISTS guest_stats (
+    guest_id 			INTEGER PRIMARY KEY REFERENCES guests(guest_id) ON DELETE CASCADE,
+    total_bookings 		INTEGER NOT NULL DEFAULT 0, 		-- Количество завершенных бронирований.
+    total_nights 		INTEGER NOT NULL DEFAULT 0, 		-- Количество ночей по завершенным бронированиям.
+    total_spending 		DECIMAL(12, 2) NOT NULL DEFAULT 0, 	-- Сумма завершенных платежей по завершенным бронированиям.
+    last_visit 			DATE 								-- Последняя дата выезда.
+);
@@ -0,0 +1,55 @@
+-- Добавление ограничения no_overlapping_bookings (schema/03_tables.sql) в уже развернутую базу.
+-- Приложение больше не проверяет пересечение дат отдельным SELECT: от двойного бронирования
+-- защищает только это ограничение, поэтому без скрипта старая база остается без защиты.
+--
+-- Если в bookings уже есть пересекающиеся неотмененные брони, ограничение не создается
+-- и скрипт завершается ошибкой со списком пар. Такие брони нужно отменить или исправить
+-- вручную и запустить скрипт повторно. Повторный запуск безопасен.
+--
+-- ADD CONSTRAINT строит GiST-индекс под блокировкой ACCESS EXCLUSIVE: на время построения
+-- запись и чтение bookings останавливаются, поэтому скрипт лучше запускать в тихое время.
+
+SET search_path TO hotel, public;
+
+-- Для оператора '=' по room_id в GiST-индексе
+CREATE EXTENSION IF NOT EXISTS btree_gist WITH SCHEMA public;
+
+DO $$
+DECLARE
+    v_overlaps TEXT;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'no_overlapping_bookings' AND conrelid = 'hotel.bookings'::regclass
+    ) THEN
+        RAISE NOTICE 'no_overlapping_bookings already exists';
+        RETURN;
+    END IF;
+
+    -- Пересечения в том же смысле, что и в ограничении: тот же номер, границы включительно
+    SELECT string_agg(format('room %s: bookings %s and %s', room_id, booking_id, other_booking_id), E'\n')
+    INTO v_overlaps
+    FROM (
+        SELECT a.room_id, a.booking_id, b.booking_id AS other_booking_id
+        FROM bookings a
+            JOIN bookings b
+              ON b.room_id = a.room_id
+             AND b.booking_id > a.booking_id
+             AND daterange(a.check_in_date, a.check_out_date, '[]') && daterange(b.check_in_date, b.check_out_date, '[]')
+        WHERE a.status <> 'cancelled' AND b.status <> 'cancelled'
+        ORDER BY a.room_id, a.booking_id
+        LIMIT 100
+    ) pairs;
+
+    IF v_overlaps IS NOT NULL THEN
+        RAISE EXCEPTION 'Overlapping non-cancelled bookings must be resolved first (up to 100 pairs):%', E'\n' || v_overlaps;
+    END IF;
+
+    ALTER TABLE bookings ADD CONSTRAINT no_overlapping_bookings EXCLUDE USING gist (
+        room_id WITH =,
+        daterange(check_in_date, check_out_date, '[]') WITH &&
+    ) WHERE (status <> 'cancelled');
+END
+$$;
+
+ANALYZE bookings;
@@ -0,0 +1,31 @@
+-- Добавление агрегатов для аналитики (schema/04_analytics_rollups.sql) в уже развернутую базу:
+-- таблицы, функции и триггеры, которые их поддерживают, аналитические функции, которые их читают,
+-- и заполнение агрегатов по уже существующим бронированиям и платежам.
+-- Запускается из каталога hotel_management_db (пути \i — относительно него). Повторный запуск
+-- безопасен: таблицы создаются с IF NOT EXISTS, триггеры пересоздаются, агрегаты пересчитываются.
+--
+-- Заполнение (refresh_analytics_rollups) держит блокировку SHARE на rooms, bookings и payments:
+-- запись в эти таблицы ждет до конца скрипта, поэтому его лучше запускать в тихое время.
+
+SET search_path TO hotel, public;
+
+BEGIN;
+
+\i schema/04_analytics_rollups.sql
+
+\i triggers/03_analytics_rollup_functions.sql
+
+DROP TRIGGER IF EXISTS bookings_rollup ON bookings;
+DROP TRIGGER IF EXISTS payments_rollup ON payments;
+DROP TRIGGER IF EXISTS rooms_rollup ON rooms;
+\i triggers/04_analytics_rollup_triggers.sql
+
+\i functions/analytics/01_get_occupancy_rate.sql
+\i functions/analytics/02_get_revenue_report.sql
+\i functions/analytics/03_get_guest_segmentation.sql
+
+SELECT refresh_analytics_rollups();
+
+COMMIT;
+
+ANALYZE occupancy_daily, occupancy_changes, revenue_monthly, guest_stats;
@@ -0,0 +1,313 @@
+-- 3. ТРИГГЕРЫ ДЛЯ ПОДДЕРЖКИ АНАЛИТИЧЕСКИХ АГРЕГАТОВ
+-- Таблицы occupancy_daily, revenue_monthly и guest_stats (schema/04_analytics_rollups.sql)
+-- обновляются в той же транзакции, что и исходные данные:
+-- доходы — приращениями, статистика гостя — пересчетом строки одного гостя.
+-- Занятость записывается в журнал occupancy_changes и переносится в occupancy_daily отдельно
+-- (fold_occupancy_changes): строки occupancy_daily общие для всех номеров типа, и их
+-- обновление в триггере выстраивало бы конкурентные бронирования в очередь.
+-- Доходы по-прежнему обновляют строку месяца в транзакции платежа: завершенные платежи
+-- одного месяца ждут друг друга, но создаются они фоновой задачей, а не в запросе брони.
+
+-- Функция 'rollup_add_occupancy'
+-- Записывает в журнал изменение p_delta (+1 или -1) занятости типа номера за ночи [p_check_in, p_check_out).
+CREATE OR REPLACE FUNCTION rollup_add_occupancy(
+    p_room_type 		room_type,
+    p_check_in 			DATE,
+    p_check_out 		DATE,
+    p_delta 			INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO occupancy_changes (room_type, check_in_date, check_out_date, delta)
+    VALUES (p_room_type, p_check_in, p_check_out, p_delta);
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public; -- Таблицы находятся независимо от search_path вызывающей сессии.
+
+-- Функция 'fold_occupancy_changes'
+-- Переносит журнал occupancy_changes в occupancy_daily и возвращает число перенесенных строк.
+-- Вызывается приложением перед расчетом отчета о загрузке (app/analytics.py) и может
+-- выполняться по расписанию. Одновременно работает один перенос: остальные вызовы сразу
+-- возвращают 0. Строки, добавленные во время переноса, остаются до следующего вызова.
+CREATE OR REPLACE FUNCTION fold_occupancy_changes()
+RETURNS INTEGER AS $$
+DECLARE
+    v_count 			INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('hotel.fold_occupancy_changes')) THEN
+        RETURN 0;
+    END IF;
+    WITH moved AS (
+        DELETE FROM occupancy_changes
+        RETURNING room_type, check_in_date, check_out_date, delta
+    ), folded AS (
+        INSERT INTO occupancy_daily (day, room_type, room_nights)
+        SELECT m.check_in_date + n, m.room_type, SUM(m.delta)
+        FROM moved m, LATERAL generate_series(0, m.check_out_date - m.check_in_date - 1) AS n
+        GROUP BY 1, 2
+        ORDER BY 1, 2 -- Блокировки строк берутся в одном порядке.
+        ON CONFLICT (day, room_type) DO UPDATE
+            SET room_nights = occupancy_daily.room_nights + EXCLUDED.room_nights
+    )
+    SELECT COUNT(*) INTO v_count FROM moved;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'rollup_add_revenue'
+-- Добавляет (p_sign = 1) или вычитает (p_sign = -1) завершенный платеж в доходах месяца.
+-- Разделение на проживание и услуги — как в get_revenue_report: до стоимости проживания
+-- платеж считается оплатой номера, остаток — оплатой услуг.
+CREATE OR REPLACE FUNCTION rollup_add_revenue(
+    p_transaction_date 	TIMESTAMP WITH TIME ZONE,
+    p_amount 			DECIMAL,
+    p_room_cost 		DECIMAL,
+    p_sign 				INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_transaction_date IS NULL THEN
+        RETURN; -- Платеж без даты не относится ни к одному месяцу.
+    END IF;
+    INSERT INTO revenue_monthly (month, room_revenue, service_revenue, total_revenue, payments_count)
+    VALUES (
+        date_trunc('month', p_transaction_date)::DATE,
+        p_sign * LEAST(p_amount, p_room_cost),
+        p_sign * GREATEST(p_amount - p_room_cost, 0),
+        p_sign * p_amount,
+        p_sign
+    )
+    ON CONFLICT (month) DO UPDATE SET
+        room_revenue = revenue_monthly.room_revenue + EXCLUDED.room_revenue,
+        service_revenue = revenue_monthly.service_revenue + EXCLUDED.service_revenue,
+        total_revenue = revenue_monthly.total_revenue + EXCLUDED.total_revenue,
+        payments_count = revenue_monthly.payments_count + EXCLUDED.payments_count;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'booking_room_cost'
+-- Стоимость проживания по бронированию: ежедневная ставка номера * количество ночей.
+CREATE OR REPLACE FUNCTION booking_room_cost(p_booking_id INTEGER)
+RETURNS DECIMAL AS $$
+    SELECT r.daily_rate * (b.check_out_date - b.check_in_date)
+    FROM bookings b
+    JOIN rooms r ON r.room_id = b.room_id
+    WHERE b.booking_id = p_booking_id;
+$$ LANGUAGE sql STABLE
+SET search_path = hotel, public;
+
+-- Функция 'refresh_guest_stats'
+-- Пересчитывает строку guest_stats одного гостя по его бронированиям и платежам.
+CREATE OR REPLACE FUNCTION refresh_guest_stats(p_guest_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_guest_id IS NULL THEN
+        RETURN;
+    END IF;
+    -- Блокировка гостя упорядочивает конкурентные пересчеты: следующий запрос
+    -- выполняется уже после фиксации чужой транзакции и видит ее изменения.
+    -- FOR NO KEY UPDATE не конфликтует с блокировками внешних ключей при вставке бронирований.
+    PERFORM 1 FROM guests WHERE guest_id = p_guest_id FOR NO KEY UPDATE;
+
+    INSERT INTO guest_stats (guest_id, total_bookings, total_nights, total_spending, last_visit)
+    SELECT
+        b.guest_id,
+        COUNT(*) FILTER (WHERE b.status = 'checked_out'),
+        COALESCE(SUM(b.check_out_date - b.check_in_date) FILTER (WHERE b.status = 'checked_out'), 0),
+        COALESCE(SUM(paid.amount) FILTER (WHERE b.status = 'checked_out'), 0),
+        MAX(b.check_out_date) FILTER (WHERE b.status = 'checked_out')
+    FROM
+        bookings b
+        LEFT JOIN LATERAL ( -- Платежи суммируются по бронированию отдельно, чтобы ночи не умножались на число платежей.
+            SELECT SUM(p.amount) AS amount
+            FROM payments p
+            WHERE p.booking_id = b.booking_id AND p.status = 'completed'
+        ) paid ON TRUE
+    WHERE b.guest_id = p_guest_id
+    GROUP BY b.guest_id
+    ON CONFLICT (guest_id) DO UPDATE SET
+        total_bookings = EXCLUDED.total_bookings,
+        total_nights = EXCLUDED.total_nights,
+        total_spending = EXCLUDED.total_spending,
+        last_visit = EXCLUDED.last_visit;
+
+    IF NOT FOUND THEN
+        DELETE FROM guest_stats WHERE guest_id = p_guest_id; -- У гостя не осталось бронирований.
+    END IF;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'bookings_rollup_trigger'
+-- Поддерживает occupancy_daily, revenue_monthly и guest_stats при изменении бронирований.
+CREATE OR REPLACE FUNCTION bookings_rollup_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_type 			room_type;
+    v_new_type 			room_type;
+BEGIN
+    -- Занятость: старое бронирование вычитается, новое добавляется (отмененные не учитываются).
+    IF TG_OP = 'UPDATE'
+       AND OLD.room_id = NEW.room_id
+       AND OLD.check_in_date = NEW.check_in_date
+       AND OLD.check_out_date = NEW.check_out_date
+       AND (OLD.status = 'cancelled') = (NEW.status = 'cancelled') THEN
+        NULL; -- Ночи не изменились (например, confirmed -> checked_in).
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status <> 'cancelled' THEN
+            SELECT type INTO v_old_type FROM rooms WHERE room_id = OLD.room_id;
+            PERFORM rollup_add_occupancy(v_old_type, OLD.check_in_date, OLD.check_out_date, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status <> 'cancelled' THEN
+            SELECT type INTO v_new_type FROM rooms WHERE room_id = NEW.room_id;
+            PERFORM rollup_add_occupancy(v_new_type, NEW.check_in_date, NEW.check_out_date, 1);
+        END IF;
+    END IF;
+
+    -- Доходы: смена номера или дат меняет стоимость проживания, а с ней и разделение платежей.
+    IF TG_OP = 'UPDATE'
+       AND (OLD.room_id <> NEW.room_id
+            OR OLD.check_in_date <> NEW.check_in_date
+            OR OLD.check_out_date <> NEW.check_out_date) THEN
+        INSERT INTO revenue_monthly (month, room_revenue, service_revenue, total_revenue, payments_count)
+        SELECT
+            date_trunc('month', p.transaction_date)::DATE,
+            SUM(LEAST(p.amount, new_cost.value) - LEAST(p.amount, old_cost.value)),
+            SUM(GREATEST(p.amount - new_cost.value, 0) - GREATEST(p.amount - old_cost.value, 0)),
+            0,
+            0
+        FROM
+            payments p,
+            (SELECT daily_rate * (OLD.check_out_date - OLD.check_in_date) AS value FROM rooms WHERE room_id = OLD.room_id) old_cost,
+            (SELECT daily_rate * (NEW.check_out_date - NEW.check_in_date) AS value FROM rooms WHERE room_id = NEW.room_id) new_cost
+        WHERE p.booking_id = NEW.booking_id AND p.status = 'completed' AND p.transaction_date IS NOT NULL
+        GROUP BY 1
+        ON CONFLICT (month) DO UPDATE SET
+            room_revenue = revenue_monthly.room_revenue + EXCLUDED.room_revenue,
+            service_revenue = revenue_monthly.service_revenue + EXCLUDED.service_revenue;
+    END IF;
+
+    -- Статистика гостей: пересчет строк затронутых гостей.
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_guest_stats(OLD.guest_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.guest_id <> OLD.guest_id) THEN
+        PERFORM refresh_guest_stats(NEW.guest_id);
+    END IF;
+    RETURN NULL; -- AFTER-триггер: возвращаемое значение не используется.
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'payments_rollup_trigger'
+-- Поддерживает revenue_monthly и guest_stats при изменении платежей.
+CREATE OR REPLACE FUNCTION payments_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'completed' THEN
+        PERFORM rollup_add_revenue(OLD.transaction_date, OLD.amount, booking_room_cost(OLD.booking_id), -1);
+        PERFORM refresh_guest_stats((SELECT guest_id FROM bookings WHERE booking_id = OLD.booking_id));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'completed' THEN
+        PERFORM rollup_add_revenue(NEW.transaction_date, NEW.amount, booking_room_cost(NEW.booking_id), 1);
+        IF TG_OP = 'INSERT' OR OLD.status <> 'completed' OR OLD.booking_id <> NEW.booking_id
+           OR OLD.amount <> NEW.amount THEN
+            PERFORM refresh_guest_stats((SELECT guest_id FROM bookings WHERE booking_id = NEW.booking_id));
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'rooms_rollup_trigger'
+-- Смена типа номера переносит его ночи в другой тип; смена ставки меняет разделение платежей.
+CREATE OR REPLACE FUNCTION rooms_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.type <> OLD.type THEN
+        -- Приращения складываются, поэтому еще не перенесенные строки старого типа учитываются верно.
+        INSERT INTO occupancy_changes (room_type, check_in_date, check_out_date, delta)
+        SELECT t.room_type, b.check_in_date, b.check_out_date, t.delta
+        FROM
+            bookings b,
+            (VALUES (OLD.type, -1), (NEW.type, 1)) AS t(room_type, delta)
+        WHERE b.room_id = NEW.room_id AND b.status <> 'cancelled';
+    END IF;
+
+    IF NEW.daily_rate <> OLD.daily_rate THEN
+        INSERT INTO revenue_monthly (month, room_revenue, service_revenue, total_revenue, payments_count)
+        SELECT
+            date_trunc('month', p.transaction_date)::DATE,
+            SUM(LEAST(p.amount, NEW.daily_rate * (b.check_out_date - b.check_in_date))
+                - LEAST(p.amount, OLD.daily_rate * (b.check_out_date - b.check_in_date))),
+            SUM(GREATEST(p.amount - NEW.daily_rate * (b.check_out_date - b.check_in_date), 0)
+                - GREATEST(p.amount - OLD.daily_rate * (b.check_out_date - b.check_in_date), 0)),
+            0,
+            0
+        FROM
+            payments p
+            JOIN bookings b ON b.booking_id = p.booking_id
+        WHERE b.room_id = NEW.room_id AND p.status = 'completed' AND p.transaction_date IS NOT NULL
+        GROUP BY 1
+        ON CONFLICT (month) DO UPDATE SET
+            room_revenue = revenue_monthly.room_revenue + EXCLUDED.room_revenue,
+            service_revenue = revenue_monthly.service_revenue + EXCLUDED.service_revenue;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
+
+-- Функция 'refresh_analytics_rollups'
+-- Полный пересчет агрегатов из исходных таблиц: после первичной загрузки данных в обход
+-- триггеров (например, COPY с отключенными триггерами) или как периодическая сверка.
+-- На время пересчета запись в rooms, bookings и payments блокируется.
+CREATE OR REPLACE FUNCTION refresh_analytics_rollups()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE rooms, bookings, payments IN SHARE MODE;
+    TRUNCATE occupancy_daily, occupancy_changes, revenue_monthly, guest_stats;
+
+    INSERT INTO occupancy_daily (day, room_type, room_nights)
+    SELECT b.check_in_date + n, r.type, COUNT(*)
+    FROM
+        bookings b
+        JOIN rooms r ON r.room_id = b.room_id,
+        LATERAL generate_series(0, b.check_out_date - b.check_in_date - 1) AS n
+    WHERE b.status <> 'cancelled'
+    GROUP BY 1, 2;
+
+    INSERT INTO revenue_monthly (month, room_revenue, service_revenue, total_revenue, payments_count)
+    SELECT
+        date_trunc('month', p.transaction_date)::DATE,
+        SUM(LEAST(p.amount, r.daily_rate * (b.check_out_date - b.check_in_date))),
+        SUM(GREATEST(p.amount - r.daily_rate * (b.check_out_date - b.check_in_date), 0)),
+        SUM(p.amount),
+        COUNT(*)
+    FROM
+        payments p
+        JOIN bookings b ON p.booking_id = b.booking_id
+        JOIN rooms r ON b.room_id = r.room_id
+    WHERE p.status = 'completed' AND p.transaction_date IS NOT NULL
+    GROUP BY 1;
+
+    INSERT INTO guest_stats (guest_id, total_bookings, total_nights, total_spending, last_visit)
+    SELECT
+        b.guest_id,
+        COUNT(*) FILTER (WHERE b.status = 'checked_out'),
+        COALESCE(SUM(b.check_out_date - b.check_in_date) FILTER (WHERE b.status = 'checked_out'), 0),
+        COALESCE(SUM(paid.amount) FILTER (WHERE b.status = 'checked_out'), 0),
+        MAX(b.check_out_date) FILTER (WHERE b.status = 'checked_out')
+    FROM
+        bookings b
+        LEFT JOIN (
+            SELECT p.booking_id, SUM(p.amount) AS amount
+            FROM payments p
+            WHERE p.status = 'completed'
+            GROUP BY p.booking_id
+        ) paid ON paid.booking_id = b.booking_id
+    GROUP BY b.guest_id;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = hotel, public;
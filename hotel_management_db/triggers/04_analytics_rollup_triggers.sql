@@ -0,0 +1,19 @@
+-- 3. ТРИГГЕРЫ ДЛЯ ПОДДЕРЖКИ АНАЛИТИЧЕСКИХ АГРЕГАТОВ
+
+-- Триггер 'bookings_rollup'
+-- Изменения бронирований отражаются в occupancy_changes, revenue_monthly и guest_stats.
+CREATE TRIGGER bookings_rollup
+AFTER INSERT OR UPDATE OR DELETE ON bookings
+FOR EACH ROW EXECUTE FUNCTION bookings_rollup_trigger();
+
+-- Триггер 'payments_rollup'
+-- Изменения платежей отражаются в revenue_monthly и guest_stats.
+CREATE TRIGGER payments_rollup
+AFTER INSERT OR UPDATE OR DELETE ON payments
+FOR EACH ROW EXECUTE FUNCTION payments_rollup_trigger();
+
+-- Триггер 'rooms_rollup'
+-- Срабатывает только при изменении типа номера или ежедневной ставки.
+CREATE TRIGGER rooms_rollup
+AFTER UPDATE OF type, daily_rate ON rooms
+FOR EACH ROW EXECUTE FUNCTION rooms_rollup_trigger();
@@ -0,0 +1,133 @@
+"""
+Количество SQL-запросов на один вызов full-info и списочных маршрутов не зависит
+от числа бронирований, услуг и платежей (связи загружаются заранее, без N+1).
+
+Нужна PostgreSQL со схемой hotel (переменные DB_* как для приложения); без DB_NAME
+тесты пропускаются. Тесты добавляют свои строки и удаляют их после себя.
+    DB_HOST=localhost DB_USER=hotel_user DB_PASSWORD=... DB_NAME=hotel_db python -m pytest tests
+"""
+import os
+import sys
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+if not os.getenv('DB_NAME'):
+    pytest.skip("DB_NAME is not set", allow_module_level=True)
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.main import create_app  # noqa: E402
+from app.models import (  # noqa: E402
+    db, Guest, Room, Booking, Service, BookingService, Payment, CleaningSchedule
+)
+
+# Карточка номера с уборкой, бронирования с гостями, услуги с их справочником, платежи
+FULL_INFO_STATEMENTS = 4
+LIST_ENDPOINTS = ['/api/bookings', '/api/payments', '/api/cleaning-schedule', '/api/guests']
+LARGE_BOOKINGS = 30
+
+
+@pytest.fixture(scope='module')
+def app():
+    # Без кэша каждый вызов выполняет все свои запросы
+    os.environ['CACHE_ENABLED'] = '0'
+    os.environ.setdefault('METRICS_ENABLED', '0')
+    return create_app()
+
+
+@pytest.fixture(scope='module')
+def rooms(app):
+    """
+    Два номера: с одним бронированием (одна услуга, один платеж) и с LARGE_BOOKINGS
+    бронированиями (по две услуги и два платежа на каждое). Возвращает их room_number.
+    """
+    tag = uuid.uuid4().hex[:6].upper()
+    with app.app_context():
+        guest = Guest(passport_number=f"QC{tag}", first_name='Query', last_name='Count', phone='+70000000000')
+        service = Service(name=f"Query count {tag}", price=100)
+        db.session.add_all([guest, service])
+        db.session.flush()
+        room_ids = db.session.execute(
+            insert(Room).returning(Room.room_id),
+            [{'room_number': f"Q{tag}{size}", 'type': 'Basic', 'capacity': 2, 'daily_rate': 1000}
+             for size in ('S', 'L')]
+        ).scalars().all()
+        db.session.execute(
+            insert(CleaningSchedule), [{'room_id': room_id, 'needs_cleaning': False} for room_id in room_ids]
+        )
+        start = date(2041, 1, 1)
+        for room_id, count in zip(room_ids, (1, LARGE_BOOKINGS)):
+            booking_ids = db.session.execute(
+                insert(Booking).returning(Booking.booking_id),
+                [{'guest_id': guest.guest_id, 'room_id': room_id,
+                  'check_in_date': start + timedelta(days=i * 3), 'check_out_date': start + timedelta(days=i * 3 + 1),
+                  'status': 'checked_out', 'adults': 1, 'children': 0}
+                 for i in range(count)]
+            ).scalars().all()
+            per_booking = 1 if count == 1 else 2
+            db.session.execute(insert(BookingService), [
+                {'booking_id': booking_id, 'service_id': service.service_id, 'quantity': 1, 'service_date': start}
+                for booking_id in booking_ids for _ in range(per_booking)
+            ])
+            db.session.execute(insert(Payment), [
+                {'booking_id': booking_id, 'amount': 1000, 'method': 'cash', 'status': 'completed',
+                 'transaction_date': datetime(2041, 1, 1)}
+                for booking_id in booking_ids for _ in range(per_booking)
+            ])
+        db.session.commit()
+        guest_id, service_id = guest.guest_id, service.service_id
+
+    yield {'small': f"Q{tag}S", 'large': f"Q{tag}L"}
+
+    with app.app_context():
+        booking_ids = db.session.query(Booking.booking_id).filter(Booking.room_id.in_(room_ids))
+        Payment.query.filter(Payment.booking_id.in_(booking_ids)).delete(synchronize_session=False)
+        BookingService.query.filter(BookingService.booking_id.in_(booking_ids)).delete(synchronize_session=False)
+        Booking.query.filter(Booking.room_id.in_(room_ids)).delete(synchronize_session=False)
+        CleaningSchedule.query.filter(CleaningSchedule.room_id.in_(room_ids)).delete(synchronize_session=False)
+        Room.query.filter(Room.room_id.in_(room_ids)).delete(synchronize_session=False)
+        Service.query.filter_by(service_id=service_id).delete()
+        Guest.query.filter_by(guest_id=guest_id).delete()
+        db.session.commit()
+
+
+def count_statements(app, url):
+    """
+    Выполняет GET url и возвращает количество выполненных SQL-запросов.
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'after_cursor_execute', count)
+    try:
+        response = app.test_client().get(url)
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements), response.get_json()
+
+
+def test_full_info_statement_count_is_constant(app, rooms):
+    small, small_body = count_statements(app, f"/api/rooms/{rooms['small']}/full-info")
+    large, large_body = count_statements(app, f"/api/rooms/{rooms['large']}/full-info")
+    assert len(small_body['bookings']) == 1
+    assert len(large_body['bookings']) == LARGE_BOOKINGS
+    assert len(large_body['services']) == len(large_body['payments']) == 2 * LARGE_BOOKINGS
+    assert small == large == FULL_INFO_STATEMENTS
+
+
+@pytest.mark.parametrize('endpoint', LIST_ENDPOINTS)
+def test_list_statement_count_does_not_depend_on_limit(app, rooms, endpoint):
+    one, one_body = count_statements(app, f"{endpoint}?limit=1")
+    many, many_body = count_statements(app, f"{endpoint}?limit=50")
+    assert len(one_body) == 1
+    assert len(many_body) > 1
+    assert one == many
@@ -0,0 +1,40 @@
+"""
+Проверка числовых параметров запроса: цифры Юникода (например, '²') отклоняются
+как некорректный ввод (400), а не приводят к ValueError в int() (500). БД не нужна.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from werkzeug.datastructures import MultiDict  # noqa: E402
+
+from app.pagination import PaginationError, is_digits, parse_page_args  # noqa: E402
+from app.search import SearchError, parse_search_args  # noqa: E402
+
+NOT_DIGITS = ['', '-1', '1.5', ' 1', '²', '1²', '١٢', '５']
+
+
+@pytest.mark.parametrize('value', NOT_DIGITS)
+def test_is_digits_rejects_non_ascii_digits(value):
+    assert not is_digits(value)
+
+
+def test_is_digits_accepts_ascii_digits():
+    assert is_digits('0') and is_digits('120')
+
+
+@pytest.mark.parametrize('name', ['after_id', 'limit'])
+@pytest.mark.parametrize('value', ['²', '١٢'])
+def test_page_args_reject_unicode_digits(name, value):
+    with pytest.raises(PaginationError):
+        parse_page_args(MultiDict({name: value}))
+
+
+@pytest.mark.parametrize('name', ['limit', 'offset'])
+@pytest.mark.parametrize('value', ['²', '١٢'])
+def test_search_args_reject_unicode_digits(name, value):
+    with pytest.raises(SearchError):
+        parse_search_args(MultiDict({'q': 'ivanov', name: value}))
@@ -0,0 +1,5 @@
+# Точка входа WSGI для продакшен-сервера:
+#     gunicorn -c gunicorn.conf.py wsgi:app
+from app.main import create_app
+
+app = create_app()